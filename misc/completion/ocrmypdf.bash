@@ -14,6 +14,9 @@ __ocrmypdf_arguments()
 --sidecar                       (write OCR to text file)
 --version                       (print program version and exit)
 --jobs                          (how many worker processes to use)
+--scheduler                     (select how work on pages is scheduled)
+--max-memory                    (memory in MB that pages being processed may use)
+--checkpoint-folder             (folder to record finished pages in, to resume from)
 --quiet                         (suppress INFO messages)
 --verbose                       (set verbosity level)
 --title                         (set metadata)
@@ -42,7 +45,9 @@ __ocrmypdf_arguments()
 --pages                         (apply OCR to only the specified pages)
 --max-image-mpixels             (image decompression bomb threshold)
 --pdf-renderer                  (select PDF renderer options)
+--intermediate-image-format     (select format of temporary page images)
 --rotate-pages-threshold        (page rotation confidence)
+--rotate-pages-single-render    (detect rotation from the page image)
 --pdfa-image-compression        (set PDF/A image compression options)
 --fast-web-view                 (if file size if above this amount in MB linearize PDF)
 --plugin                        (name of plugin to import)
@@ -52,10 +57,14 @@ __ocrmypdf_arguments()
 --tesseract-oem                 (set tesseract --oem)
 --tesseract-thresholding        (set tesseract image thresholding)
 --tesseract-timeout             (maximum number of seconds to wait for OCR)
+--tesseract-batch-size          (number of pages per tesseract process)
+--tesseract-backend             (run tesseract as a program or library)
 --user-words                    (specify location of user words file)
 --user-patterns                 (specify location of user patterns file)
 --no-progress-bar               (disable the progress bar)
 --color-conversion-strategy     (select color conversion strategy)
+--render-ahead                  (number of pages to render ahead with ghostscript)
+--render-server                 (pages each long-lived ghostscript process renders)
 "
 
     COMPREPLY=( $( compgen -W "$arguments" -- "$cur") )
@@ -127,6 +136,33 @@ sandwich  (use sandwich renderer)"
     fi
 }
 
+__ocrmypdf_scheduler()
+{
+    local choices="page  (run every step of a page in one worker)
+stage (run rasterizing, OCR and text rendering on separate workers)"
+
+    COMPREPLY=( $( compgen -W "$choices" -- "$cur") )
+
+    # Remove description if only one completion exists
+    if [[ ${#COMPREPLY[*]} -eq 1 ]]; then
+        COMPREPLY=( ${COMPREPLY[0]%% *} )
+    fi
+}
+
+__ocrmypdf_intermediate-image-format()
+{
+    local choices="png          (fully compressed PNG)
+fast         (PNG with the fastest compression)
+uncompressed (uncompressed TIFF and PNM)"
+
+    COMPREPLY=( $( compgen -W "$choices" -- "$cur") )
+
+    # Remove description if only one completion exists
+    if [[ ${#COMPREPLY[*]} -eq 1 ]]; then
+        COMPREPLY=( ${COMPREPLY[0]%% *} )
+    fi
+}
+
 __ocrmypdf_pdfa-image-compression()
 {
     local choices="auto     (let Ghostscript decide how to compress images)
@@ -195,6 +231,18 @@ sauvola       (use Sauvola thresholding)"
     fi
 }
 
+__ocrmypdf_tesseract-backend()
+{
+    local choices="cli     (run the tesseract program for each page)
+library (call libtesseract in-process, needs tesserocr)"
+
+    COMPREPLY=( $( compgen -W "$choices" -- "$cur") )
+    # Remove description if only one completion exists
+    if [[ ${#COMPREPLY[*]} -eq 1 ]]; then
+        COMPREPLY=( ${COMPREPLY[0]%% *} )
+    fi
+}
+
 __ocrmypdf_color-conversion-strategy()
 {
     local choices="LeaveColorUnchanged (default)
@@ -229,6 +277,10 @@ __ocrmypdf_check_previous()
             COMPREPLY=( $( compgen -W '{1..'$( _ncpus )'}' -- "$cur" ) )
             return 0
             ;;
+        --scheduler)
+            __ocrmypdf_scheduler
+            return 0
+            ;;
         -v|--verbose)
             __ocrmypdf_verbose
             return 0
@@ -241,6 +293,10 @@ __ocrmypdf_check_previous()
             __ocrmypdf_pdf-renderer
             return 0
             ;;
+        --intermediate-image-format)
+            __ocrmypdf_intermediate-image-format
+            return 0
+            ;;
         --pdfa-image-compression)
             __ocrmypdf_pdfa-image-compression
             return 0
@@ -257,10 +313,15 @@ __ocrmypdf_check_previous()
             __ocrmypdf_tesseract-thresholding
             return 0
             ;;
+        --tesseract-backend)
+            __ocrmypdf_tesseract-backend
+            return 0
+            ;;
 
         --title|--author|--subject|--keywords|--unpaper-args|--pages|--plugin|\
         --jpeg-quality|--png-quality|--image-dpi|--oversample|--skip-big|--max-image-mpixels|\
-        --tesseract-timeout|--rotate-pages-threshold|--fast-web-view)
+        --tesseract-timeout|--tesseract-batch-size|--rotate-pages-threshold|\
+        --fast-web-view|--render-ahead|--render-server|--max-memory)
             # argument required but no completions available
             return 0
             ;;
@@ -268,6 +329,10 @@ __ocrmypdf_check_previous()
             _filedir
             return 0
             ;;
+        --checkpoint-folder)
+            _filedir -d
+            return 0
+            ;;
         --color-conversion-strategy)
             __ocrmypdf_color-conversion-strategy
             return 0
@@ -49,6 +49,13 @@ function __fish_ocrmypdf_pdf_renderer
 end
 complete -c ocrmypdf -x -l pdf-renderer -a '(__fish_ocrmypdf_pdf_renderer)' -d "select PDF renderer options"
 
+function __fish_ocrmypdf_intermediate_image_format
+    echo -e "png\t"(_ "fully compressed PNG")
+    echo -e "fast\t"(_ "PNG with the fastest compression")
+    echo -e "uncompressed\t"(_ "uncompressed TIFF and PNM")
+end
+complete -c ocrmypdf -x -l intermediate-image-format -a '(__fish_ocrmypdf_intermediate_image_format)' -d "select format of temporary page images"
+
 function __fish_ocrmypdf_optimize
     echo -e "0\t"(_ "do not optimize")
     echo -e "1\t"(_ "do safe, lossless optimizations (default)")
@@ -74,6 +81,15 @@ end
 complete -c ocrmypdf -x -l pdfa-image-compression -a '(__fish_ocrmypdf_pdfa_compression)' -d "set PDF/A image compression options"
 
 complete -c ocrmypdf -x -s j -l jobs -d "how many worker processes to use"
+
+function __fish_ocrmypdf_scheduler
+    echo -e "page\t"(_ "run every step of a page in one worker")
+    echo -e "stage\t"(_ "run rasterizing, OCR and text rendering on separate workers")
+end
+complete -c ocrmypdf -x -l scheduler -a '(__fish_ocrmypdf_scheduler)' -d "select how work on pages is scheduled"
+complete -c ocrmypdf -x -l max-memory -d "memory in MB that pages being processed may use"
+complete -c ocrmypdf -r -l checkpoint-folder -d "folder to record finished pages in, to resume from"
+
 complete -c ocrmypdf -x -l title -d "set metadata"
 complete -c ocrmypdf -x -l author -d "set metadata"
 complete -c ocrmypdf -x -l subject -d "set metadata"
@@ -124,7 +140,15 @@ end
 complete -c ocrmypdf -x -l tesseract-thresholding -a '(__fish_ocrmypdf_tesseract_thresholding)' -d "set tesseract thresholding method (needs Tesseract 5.x)"
 
 complete -c ocrmypdf -x -l tesseract-timeout -d "maximum number of seconds to wait for OCR"
+complete -c ocrmypdf -x -l tesseract-batch-size -d "number of pages per tesseract process"
+
+function __fish_ocrmypdf_tesseract_backend
+    echo -e "cli\t"(_ "run the tesseract program for each page")
+    echo -e "library\t"(_ "call libtesseract in-process (needs tesserocr)")
+end
+complete -c ocrmypdf -x -l tesseract-backend -a '(__fish_ocrmypdf_tesseract_backend)' -d "run tesseract as a program or library"
 complete -c ocrmypdf -x -l rotate-pages-threshold -d "page rotation confidence"
+complete -c ocrmypdf -l rotate-pages-single-render -d "detect rotation from the page image"
 
 complete -c ocrmypdf -r -l user-words -d "specify location of user words file"
 complete -c ocrmypdf -r -l user-patterns -d "specify location of user patterns file"
@@ -139,6 +163,8 @@ function __fish_ocrmypdf_color_conversion_strategy
 end
 
 complete -c ocrmypdf -x -l color-conversion-strategy -a '(__fish_ocrmypdf_color_conversion_strategy)' -d "set color conversion strategy"
+complete -c ocrmypdf -x -l render-ahead -d "number of pages to render ahead with ghostscript"
+complete -c ocrmypdf -x -l render-server -d "pages each long-lived ghostscript process renders"
 
 function __fish_ocrmypdf_input_file_given
     set -l tokens (commandline -opc)
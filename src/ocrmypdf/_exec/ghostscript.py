@@ -5,14 +5,21 @@
 
 from __future__ import annotations
 
+import atexit
 import logging
 import os
+import queue
 import re
+import threading
 from collections import deque
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager, suppress
 from io import BytesIO
 from os import fspath
 from pathlib import Path
-from subprocess import PIPE, CalledProcessError
+from subprocess import PIPE, STDOUT, CalledProcessError, TimeoutExpired
+from tempfile import TemporaryDirectory, TemporaryFile
+from typing import IO
 
 from packaging.version import Version
 from PIL import Image, UnidentifiedImageError
@@ -23,7 +30,7 @@ from ocrmypdf.exceptions import (
     SubprocessOutputError,
 )
 from ocrmypdf.helpers import Resolution
-from ocrmypdf.subprocess import get_version, run, run_polling_stderr
+from ocrmypdf.subprocess import get_version, popen, run, run_polling_stderr
 
 COLOR_CONVERSION_STRATEGIES = frozenset(
     [
@@ -95,24 +102,18 @@ def _gs_devicen_reported(stream) -> bool:
     return bool(match)
 
 
-def rasterize_pdf(
+def _rasterize_args(
     input_file: os.PathLike,
     output_file: os.PathLike,
     *,
     raster_device: str,
     raster_dpi: Resolution,
-    pageno: int = 1,
-    page_dpi: Resolution | None = None,
-    rotation: int | None = None,
-    filter_vector: bool = False,
-    stop_on_error: bool = False,
-):
-    """Rasterize one page of a PDF at resolution raster_dpi in canvas units."""
-    raster_dpi = raster_dpi.round(6)
-    if not page_dpi:
-        page_dpi = raster_dpi
-
-    args_gs = (
+    first_page: int,
+    last_page: int,
+    filter_vector: bool,
+    stop_on_error: bool,
+) -> list[str]:
+    return (
         [
             GS,
             '-dSAFER',
@@ -120,8 +121,8 @@ def rasterize_pdf(
             '-dNOPAUSE',
             '-dInterpolateControl=-1',
             f'-sDEVICE={raster_device}',
-            f'-dFirstPage={pageno}',
-            f'-dLastPage={pageno}',
+            f'-dFirstPage={first_page}',
+            f'-dLastPage={last_page}',
             f'-r{raster_dpi.x:f}x{raster_dpi.y:f}',
         ]
         + (['-dFILTERVECTOR'] if filter_vector else [])
@@ -136,6 +137,11 @@ def rasterize_pdf(
         ]
     )
 
+
+def _run_rasterize(input_file, output_file, *, stop_on_error: bool, **kwargs) -> None:
+    args_gs = _rasterize_args(
+        input_file, output_file, stop_on_error=stop_on_error, **kwargs
+    )
     try:
         p = run(args_gs, stdout=PIPE, stderr=PIPE, check=True)
     except CalledProcessError as e:
@@ -155,8 +161,432 @@ def rasterize_pdf(
                 "input and output files to check for visual differences or errors."
             )
 
+
+def _ps_string(s: os.PathLike | str) -> str:
+    """Quote a string or path as a PostScript string literal."""
+    escaped = fspath(s).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f'({escaped})'
+
+
+class RenderServer:
+    """A long-lived Ghostscript process that rasterizes PDF pages on request.
+
+    Starting Ghostscript, loading its initialization files and setting up its
+    font map takes longer than rasterizing a typical page. A render server pays
+    that cost once, then renders one page per request, given as PostScript on
+    its standard input. Each request ends by printing a marker line, so we know
+    when the page is done and what Ghostscript printed while rendering it.
+
+    Under ``-dSAFER``, the server may only read and write files in ``folder``,
+    the work folder of one document, so it is never shared between documents.
+    """
+
+    DONE = 'OCRMYPDF-RENDER-DONE'
+    FAILED = 'OCRMYPDF-RENDER-FAILED'
+
+    def __init__(self, *, folder: Path, stop_on_error: bool):
+        self.folder = folder
+        self.stop_on_error = stop_on_error
+        self.pages = 0
+        args_gs = (
+            [
+                GS,
+                '-q',
+                '-dSAFER',
+                '-dNOPAUSE',
+                '-dInterpolateControl=-1',
+                '-dAutoRotatePages=/None',
+                '-sDEVICE=nullpage',
+                f'--permit-file-all={fspath(folder)}{os.sep}*',
+            ]
+            + (['-dPDFSTOPONERROR'] if stop_on_error else [])
+            + ['-']
+        )
+        self.proc = popen(
+            args_gs,
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+        )
+        self.lines: queue.Queue[str | None] = queue.Queue()
+        self.reader = threading.Thread(
+            target=self._read, name='gs-render-server', daemon=True
+        )
+        self.reader.start()
+
+    def _read(self) -> None:
+        assert self.proc.stdout is not None
+        for line in self.proc.stdout:
+            self.lines.put(line)
+        self.lines.put(None)  # Ghostscript exited
+
+    def render(
+        self,
+        input_file: os.PathLike,
+        output_file: os.PathLike,
+        *,
+        raster_device: str,
+        raster_dpi: Resolution,
+        pageno: int,
+    ) -> bool:
+        """Rasterize one page, as :func:`rasterize_pdf` would without rotation.
+
+        Returns:
+            ``False`` if the page could not be rendered, if Ghostscript reported
+            errors, or if it took longer than ``RENDER_SERVER_TIMEOUT``. The server
+            should not be used again in that case.
+        """
+        self.pages += 1
+        # save/restore releases everything the page allocated, and restoring
+        # the null device closes the output file
+        request = (
+            'save {\n'
+            f'  {_ps_string(raster_device)} selectdevice\n'
+            f'  << /HWResolution [{raster_dpi.x:f} {raster_dpi.y:f}]'
+            f' /OutputFile {_ps_string(output_file)} >> setpagedevice\n'
+            f'  {_ps_string(input_file)} (r) file runpdfbegin\n'
+            f'  {pageno} pdfgetpage pdfshowpage\n'
+            '  runpdfend\n'
+            f'}} stopped {{ ({self.FAILED}) = flush quit }} if\n'
+            f'restore ({self.DONE}) = flush\n'
+        )
+        try:
+            assert self.proc.stdin is not None
+            self.proc.stdin.write(request)
+            self.proc.stdin.flush()
+        except OSError:
+            log.debug("Ghostscript render server is gone")
+            return False
+
+        output = []
+        while True:
+            try:
+                line = self.lines.get(timeout=RENDER_SERVER_TIMEOUT)
+            except queue.Empty:
+                log.debug("Ghostscript render server timed out")
+                return False
+            if line is None or line.strip() == self.FAILED:
+                log.debug("Ghostscript render server failed: %s", ''.join(output))
+                return False
+            if line.strip() == self.DONE:
+                break
+            output.append(line)
+        if _gs_error_reported(''.join(output)):
+            log.debug("Ghostscript render server reported errors")
+            return False
+        return Path(output_file).exists()
+
+    def close(self) -> None:
+        """Let Ghostscript exit, killing it if it does not."""
+        with suppress(OSError):
+            if self.proc.stdin is not None:
+                self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=5)
+        except TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+# Seconds a render server may take for one page before it is presumed stuck
+RENDER_SERVER_TIMEOUT = 600
+
+# Render servers kept running in this process between pages. The pool grows to
+# the number of threads rendering at once, but this many at most stay idle.
+MAX_IDLE_RENDER_SERVERS = 4
+
+_idle_render_servers: list[RenderServer] = []
+_render_servers_lock = threading.Lock()
+_render_server = threading.local()
+
+
+@contextmanager
+def render_server(server_pages: int) -> Iterator[None]:
+    """Rasterize pages with render servers in the current thread, in this block.
+
+    Pages rasterized by :func:`rasterize_pdf` are rendered by a
+    :class:`RenderServer` that is replaced after ``server_pages`` pages, or by a
+    new Ghostscript process for each page if ``server_pages`` is 0. The setting
+    belongs to the current thread, so that concurrent documents may differ.
+    """
+    previous = getattr(_render_server, 'pages', 0)
+    _render_server.pages = server_pages
+    try:
+        yield
+    finally:
+        _render_server.pages = previous
+
+
+@atexit.register
+def _close_render_servers() -> None:
+    with _render_servers_lock:
+        servers = list(_idle_render_servers)
+        _idle_render_servers.clear()
+    for server in servers:
+        server.close()
+
+
+def _render_with_server(
+    input_file: os.PathLike,
+    output_file: os.PathLike,
+    *,
+    raster_device: str,
+    raster_dpi: Resolution,
+    pageno: int,
+    stop_on_error: bool,
+    server_pages: int,
+) -> bool:
+    """Rasterize one page with a render server from this process's pool.
+
+    Each server may only access the folder of ``output_file``, the work folder
+    of the document, and is only reused for pages in that folder. It is replaced
+    after rendering ``server_pages`` pages, and whenever it fails. Returns
+    ``False`` if the page was not rendered, so that the caller can run
+    Ghostscript as usual and report any errors.
+    """
+    folder = Path(output_file).parent.resolve()
+    if not Path(input_file).resolve().is_relative_to(folder):
+        return False
+    with _render_servers_lock:
+        server = next(
+            (
+                s
+                for s in _idle_render_servers
+                if s.folder == folder and s.stop_on_error == stop_on_error
+            ),
+            None,
+        )
+        if server is not None:
+            _idle_render_servers.remove(server)
+        # Servers of documents whose work folder is gone are of no further use
+        stale = [s for s in _idle_render_servers if not s.folder.is_dir()]
+        for s in stale:
+            _idle_render_servers.remove(s)
+    for s in stale:
+        s.close()
+    if server is None:
+        try:
+            server = RenderServer(folder=folder, stop_on_error=stop_on_error)
+        except OSError:
+            log.debug("Could not start Ghostscript render server", exc_info=True)
+            return False
+
+    ok = server.render(
+        input_file,
+        output_file,
+        raster_device=raster_device,
+        raster_dpi=raster_dpi,
+        pageno=pageno,
+    )
+    retired = None
+    if ok and server.pages < server_pages:
+        with _render_servers_lock:
+            _idle_render_servers.append(server)
+            if len(_idle_render_servers) > MAX_IDLE_RENDER_SERVERS:
+                retired = _idle_render_servers.pop(0)
+    else:
+        retired = server
+    if retired is not None:
+        retired.close()
+    if not ok:
+        Path(output_file).unlink(missing_ok=True)
+    return ok
+
+
+def prerendered_file(
+    output_file: os.PathLike,
+    raster_device: str,
+    raster_dpi: Resolution,
+    filter_vector: bool = False,
+) -> Path:
+    """Name of a page image rendered ahead of time for :func:`rasterize_pdf`.
+
+    The name records the settings used, so that an image is only picked up by a
+    call to :func:`rasterize_pdf` with the same settings.
+    """
+    raster_dpi = raster_dpi.round(6)
+    output_file = Path(output_file)
+    tag = f'{raster_device}.{raster_dpi.x:f}x{raster_dpi.y:f}'
+    if filter_vector:
+        tag += '.filtervector'
+    return output_file.with_name(f'{output_file.name}.{tag}.prerender')
+
+
+def rasterize_pdf_pages(
+    input_file: os.PathLike,
+    output_files: Sequence[os.PathLike],
+    *,
+    raster_device: str,
+    raster_dpi: Resolution,
+    first_page: int,
+    filter_vector: bool = False,
+) -> bool:
+    """Rasterize consecutive pages of a PDF with one Ghostscript process.
+
+    Ghostscript interprets the shared resources of the PDF once for all pages,
+    instead of once per page. Page ``first_page + n`` is rendered for
+    ``output_files[n]`` and saved under the name given by
+    :func:`prerendered_file`, where :func:`rasterize_pdf` will pick it up.
+
+    Returns:
+        ``False`` if Ghostscript failed or reported errors. No images are kept in
+        that case, so each page is rendered on its own and reports its own errors.
+    """
+    raster_dpi = raster_dpi.round(6)
+    with TemporaryDirectory(dir=Path(output_files[0]).parent) as tmpdir:
+        args_gs = _rasterize_args(
+            input_file,
+            Path(tmpdir) / '%06d',  # Ghostscript numbers output pages from 1
+            raster_device=raster_device,
+            raster_dpi=raster_dpi,
+            first_page=first_page,
+            last_page=first_page + len(output_files) - 1,
+            filter_vector=filter_vector,
+            stop_on_error=False,
+        )
+        try:
+            p = run(args_gs, stdout=PIPE, stderr=PIPE, check=True)
+        except CalledProcessError:
+            log.debug("Ghostscript failed to render pages ahead")
+            return False
+        if _gs_error_reported(p.stderr.decode(errors='replace')):
+            log.debug("Ghostscript reported errors while rendering pages ahead")
+            return False
+
+        rendered = [Path(tmpdir) / f'{n:06d}' for n in range(1, len(output_files) + 1)]
+        if not all(image.exists() for image in rendered):
+            return False
+        for image, output_file in zip(rendered, output_files):
+            image.replace(
+                prerendered_file(output_file, raster_device, raster_dpi, filter_vector)
+            )
+    return True
+
+
+@contextmanager
+def rasterize_pdf_to_pipe(
+    input_file: os.PathLike,
+    *,
+    raster_device: str,
+    raster_dpi: Resolution,
+    pageno: int = 1,
+    stop_on_error: bool = False,
+) -> Iterator[IO[bytes]]:
+    """Rasterize one page of a PDF into a pipe, without writing a file.
+
+    Yields the read end of a pipe that Ghostscript writes the page image to, so
+    that another program can be given the pipe as its standard input and read
+    the image while it is rendered. Unlike :func:`rasterize_pdf`, the image is
+    never rotated, and its resolution is always ``raster_dpi``.
+
+    Raises:
+        SubprocessOutputError: After the caller is done with the pipe, if
+            Ghostscript failed or reported errors. Whatever read the pipe
+            should not be trusted then; rasterize the page with
+            :func:`rasterize_pdf` instead, which reports the errors.
+    """
+    raster_dpi = raster_dpi.round(6)
+    args_gs = _rasterize_args(
+        input_file,
+        '-',
+        raster_device=raster_device,
+        raster_dpi=raster_dpi,
+        first_page=pageno,
+        last_page=pageno,
+        filter_vector=False,
+        stop_on_error=stop_on_error,
+    )
+    args_gs.insert(1, '-q')  # Nothing but the image may go to stdout
+    # Messages go to a file, since a full stderr pipe would stall Ghostscript
+    # before it finishes the image
+    with TemporaryFile() as stderr:
+        proc = popen(args_gs, stdout=PIPE, stderr=stderr)
+        assert proc.stdout is not None
+        try:
+            yield proc.stdout
+        finally:
+            # If the reader gave up early, closing the pipe stops Ghostscript
+            proc.stdout.close()
+            proc.wait()
+        stderr.seek(0)
+        messages = stderr.read().decode(errors='replace')
+    if proc.returncode != 0 or _gs_error_reported(messages):
+        log.debug(messages)
+        raise SubprocessOutputError("Ghostscript rasterizing to a pipe failed")
+
+
+def rasterize_pdf(
+    input_file: os.PathLike,
+    output_file: os.PathLike,
+    *,
+    raster_device: str,
+    raster_dpi: Resolution,
+    pageno: int = 1,
+    page_dpi: Resolution | None = None,
+    rotation: int | None = None,
+    filter_vector: bool = False,
+    stop_on_error: bool = False,
+    server_pages: int | None = None,
+):
+    """Rasterize one page of a PDF at resolution raster_dpi in canvas units.
+
+    If the page was already rendered by :func:`rasterize_pdf_pages` with the same
+    settings, that image is used instead of running Ghostscript. Otherwise, if
+    ``server_pages`` is nonzero, the page is rendered by a :class:`RenderServer`
+    that is replaced after that many pages. If ``server_pages`` is None, the
+    setting of the enclosing :func:`render_server` block is used.
+    """
+    if server_pages is None:
+        server_pages = getattr(_render_server, 'pages', 0)
+    raster_dpi = raster_dpi.round(6)
+    if not page_dpi:
+        page_dpi = raster_dpi
+
+    try:
+        prerendered_file(output_file, raster_device, raster_dpi, filter_vector).replace(
+            output_file
+        )
+    except FileNotFoundError:
+        # Filtering vector objects is set up when Ghostscript starts, so those
+        # pages are not sent to a render server
+        if (
+            server_pages
+            and not filter_vector
+            and _render_with_server(
+                input_file,
+                output_file,
+                raster_device=raster_device,
+                raster_dpi=raster_dpi,
+                pageno=pageno,
+                stop_on_error=stop_on_error,
+                server_pages=server_pages,
+            )
+        ):
+            log.debug("Page rendered by Ghostscript render server")
+        else:
+            _run_rasterize(
+                input_file,
+                output_file,
+                raster_device=raster_device,
+                raster_dpi=raster_dpi,
+                first_page=pageno,
+                last_page=pageno,
+                filter_vector=filter_vector,
+                stop_on_error=stop_on_error,
+            )
+    else:
+        log.debug("Using page image rendered ahead")
+
     try:
         with Image.open(output_file) as im:
+            if not rotation and Resolution(*im.info.get('dpi', (0, 0))) == page_dpi:
+                # Nothing to change, so check the image without decoding and
+                # saving it again
+                im.verify()
+                return
             if rotation is not None:
                 log.debug("Rotating output by %i", rotation)
                 # rotation is a clockwise angle and Image.ROTATE_* is
@@ -176,7 +606,7 @@ def rasterize_pdf(
             "an invalid page image file."
         )
         raise
-    except OSError as e:
+    except (OSError, SyntaxError) as e:  # Image.verify() raises SyntaxError
         log.error(
             f"Ghostscript (using {raster_device} at {raster_dpi} dpi) produced "
             "an invalid page image file."
@@ -6,12 +6,16 @@
 from __future__ import annotations
 
 import logging
+import os
 import re
-from contextlib import suppress
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
 from math import pi
-from os import fspath
+from os import PathLike, fspath
 from pathlib import Path
 from subprocess import PIPE, STDOUT, CalledProcessError, TimeoutExpired
+from typing import IO
 
 from packaging.version import Version
 
@@ -34,6 +38,34 @@ TESSERACT_THRESHOLDING_METHODS: dict[str, int] = {
 }
 
 
+_thread_limit = threading.local()
+
+
+@contextmanager
+def thread_limit(threads: int) -> Iterator[None]:
+    """Limit Tesseract processes started by the current thread to some threads.
+
+    The limit is passed to each Tesseract process in its ``OMP_THREAD_LIMIT``
+    environment variable, so that concurrent Tesseract processes may have
+    different limits. It does not apply if ``OMP_THREAD_LIMIT`` is already set
+    in the environment, since that is the user's choice.
+    """
+    previous = getattr(_thread_limit, 'threads', None)
+    _thread_limit.threads = threads
+    try:
+        yield
+    finally:
+        _thread_limit.threads = previous
+
+
+def _env() -> dict[str, str] | None:
+    """Environment for a Tesseract process, or None for the OS environment."""
+    threads = getattr(_thread_limit, 'threads', None)
+    if threads is None or os.environ.get('OMP_THREAD_LIMIT', '').isnumeric():
+        return None
+    return dict(os.environ, OMP_THREAD_LIMIT=str(threads))
+
+
 class TesseractLoggerAdapter(logging.LoggerAdapter):
     """Prepend [tesseract] to messages emitted from tesseract."""
 
@@ -165,7 +197,14 @@ def get_orientation(
     ]
 
     try:
-        p = run(args_tesseract, stdout=PIPE, stderr=STDOUT, timeout=timeout, check=True)
+        p = run(
+            args_tesseract,
+            env=_env(),
+            stdout=PIPE,
+            stderr=STDOUT,
+            timeout=timeout,
+            check=True,
+        )
     except TimeoutExpired:
         return OrientationConfidence(angle=0, confidence=0.0)
     except CalledProcessError as e:
@@ -198,7 +237,14 @@ def get_deskew(
     ]
 
     try:
-        p = run(args_tesseract, stdout=PIPE, stderr=STDOUT, timeout=timeout, check=True)
+        p = run(
+            args_tesseract,
+            env=_env(),
+            stdout=PIPE,
+            stderr=STDOUT,
+            timeout=timeout,
+            check=True,
+        )
     except TimeoutExpired:
         return 0.0
     except CalledProcessError as e:
@@ -259,6 +305,10 @@ def tesseract_log_output(stream: bytes) -> None:
             tlog.info(line.strip())
 
 
+# Sidecar text of a page that Tesseract gave up on, such as after a timeout
+SKIPPED_PAGE_TEXT = '[skipped page]'
+
+
 def page_timedout(timeout: float) -> None:
     if timeout == 0:
         return
@@ -271,26 +321,17 @@ def _generate_null_hocr(output_hocr: Path, output_text: Path, image: Path) -> No
     Ensures page is the same size as the input image.
     """
     output_hocr.write_text('', encoding='utf-8')
-    output_text.write_text('[skipped page]', encoding='utf-8')
+    output_text.write_text(SKIPPED_PAGE_TEXT, encoding='utf-8')
 
 
-def generate_hocr(
-    *,
-    input_file: Path,
-    output_hocr: Path,
-    output_text: Path,
+def _hocr_base_args(
     languages: list[str],
     engine_mode: int,
-    tessconfig: list[str],
-    timeout: float,
     pagesegmode: int,
     thresholding: int,
     user_words,
     user_patterns,
-) -> None:
-    """Generate a hOCR file, which must be converted to PDF."""
-    prefix = output_hocr.with_suffix('')
-
+) -> list[str]:
     args_tesseract = tess_base_args(languages, engine_mode)
 
     if pagesegmode is not None:
@@ -304,13 +345,60 @@ def generate_hocr(
 
     if user_patterns:
         args_tesseract.extend(['--user-patterns', user_patterns])
+    return args_tesseract
+
+
+def _input_args(input_file: Path | IO[bytes]) -> tuple[str, IO[bytes] | None]:
+    """Tesseract's input file argument, and its standard input if it needs one.
+
+    Tesseract reads its image from standard input if the input file is named
+    ``stdin``.
+    """
+    if isinstance(input_file, (str, PathLike)):
+        return fspath(input_file), None
+    return 'stdin', input_file
+
+
+def generate_hocr(
+    *,
+    input_file: Path | IO[bytes],
+    output_hocr: Path,
+    output_text: Path,
+    languages: list[str],
+    engine_mode: int,
+    tessconfig: list[str],
+    timeout: float,
+    pagesegmode: int,
+    thresholding: int,
+    user_words,
+    user_patterns,
+) -> None:
+    """Generate a hOCR file, which must be converted to PDF.
+
+    ``input_file`` may also be a binary stream, such as a pipe, that Tesseract
+    reads the image from.
+    """
+    prefix = output_hocr.with_suffix('')
+    input_arg, stdin = _input_args(input_file)
+
+    args_tesseract = _hocr_base_args(
+        languages, engine_mode, pagesegmode, thresholding, user_words, user_patterns
+    )
 
     # Reminder: test suite tesseract test plugins will break after any changes
     # to the number of order parameters here
-    args_tesseract.extend([fspath(input_file), fspath(prefix), 'hocr', 'txt'])
+    args_tesseract.extend([input_arg, fspath(prefix), 'hocr', 'txt'])
     args_tesseract.extend(tessconfig)
     try:
-        p = run(args_tesseract, stdout=PIPE, stderr=STDOUT, timeout=timeout, check=True)
+        p = run(
+            args_tesseract,
+            env=_env(),
+            stdin=stdin,
+            stdout=PIPE,
+            stderr=STDOUT,
+            timeout=timeout,
+            check=True,
+        )
         stdout = p.stdout
     except TimeoutExpired:
         # Generate a HOCR file with no recognized text if tesseract times out
@@ -333,8 +421,94 @@ def generate_hocr(
             prefix.with_suffix('.txt').replace(output_text)
 
 
+def split_hocr_pages(hocr: str) -> list[str]:
+    """Split a multipage hOCR document into one hOCR document per page.
+
+    Each page keeps the head of the original document. Returns an empty list
+    if the document has no pages or no body.
+    """
+    starts = [m.start() for m in re.finditer(r'<div class=[\'"]ocr_page[\'"]', hocr)]
+    end = hocr.rfind('</body>')
+    if not starts or end < starts[-1]:
+        return []
+    head, tail = hocr[: starts[0]], hocr[end:]
+    bounds = starts + [end]
+    return [head + hocr[a:b] + tail for a, b in zip(bounds, bounds[1:])]
+
+
+def generate_hocr_batch(
+    *,
+    input_files: list[Path],
+    output_hocrs: list[Path],
+    output_texts: list[Path],
+    languages: list[str],
+    engine_mode: int,
+    tessconfig: list[str],
+    timeout: float,
+    pagesegmode: int,
+    thresholding: int,
+    user_words,
+    user_patterns,
+) -> bool:
+    """Generate hOCR files for several page images with one Tesseract process.
+
+    Tesseract is given a list file naming each image, so it loads its language
+    models once for the whole batch. Its multipage hOCR and text output are split
+    back into one file per page. The timeout applies to each page.
+
+    Returns:
+        ``False`` if Tesseract failed, timed out or produced output that could
+        not be split into pages, in which case the caller should OCR each page
+        on its own.
+    """
+    prefix = output_hocrs[0].with_name(f'{output_hocrs[0].stem}_batch')
+    list_file = prefix.with_suffix('.list')
+    list_file.write_text(
+        ''.join(f'{fspath(input_file)}\n' for input_file in input_files),
+        encoding='utf-8',
+    )
+
+    args_tesseract = _hocr_base_args(
+        languages, engine_mode, pagesegmode, thresholding, user_words, user_patterns
+    )
+    args_tesseract.extend([fspath(list_file), fspath(prefix), 'hocr', 'txt'])
+    args_tesseract.extend(tessconfig)
+    try:
+        p = run(
+            args_tesseract,
+            env=_env(),
+            stdout=PIPE,
+            stderr=STDOUT,
+            timeout=timeout * len(input_files),
+            check=True,
+        )
+    except (TimeoutExpired, CalledProcessError):
+        log.debug("Tesseract batch of %d pages failed", len(input_files))
+        return False
+
+    pages = split_hocr_pages(prefix.with_suffix('.hocr').read_text(encoding='utf-8'))
+    texts = prefix.with_suffix('.txt').read_text(encoding='utf-8').split('\f')
+    if texts and not texts[-1]:
+        texts.pop()  # Form feed after the last page
+    if len(pages) != len(input_files) or len(texts) != len(input_files):
+        log.debug(
+            "Tesseract batch output has %d pages, expected %d",
+            len(pages),
+            len(input_files),
+        )
+        return False
+
+    tesseract_log_output(p.stdout)
+    for page, text, output_hocr, output_text in zip(
+        pages, texts, output_hocrs, output_texts
+    ):
+        output_hocr.write_text(page, encoding='utf-8')
+        output_text.write_text(text + '\f', encoding='utf-8')
+    return True
+
+
 def use_skip_page(output_pdf: Path, output_text: Path) -> None:
-    output_text.write_text('[skipped page]', encoding='utf-8')
+    output_text.write_text(SKIPPED_PAGE_TEXT, encoding='utf-8')
 
     # A 0 byte file to the output to indicate a skip
     output_pdf.write_bytes(b'')
@@ -342,7 +516,7 @@ def use_skip_page(output_pdf: Path, output_text: Path) -> None:
 
 def generate_pdf(
     *,
-    input_file: Path,
+    input_file: Path | IO[bytes],
     output_pdf: Path,
     output_text: Path,
     languages: list[str],
@@ -357,8 +531,10 @@ def generate_pdf(
     """Generate a PDF using Tesseract's internal PDF generator.
 
     We specifically a text-only PDF which is more suitable for combining with
-    the input page.
+    the input page. ``input_file`` may also be a binary stream, as for
+    :func:`generate_hocr`.
     """
+    input_arg, stdin = _input_args(input_file)
     args_tesseract = tess_base_args(languages, engine_mode)
 
     if pagesegmode is not None:
@@ -380,10 +556,18 @@ def generate_pdf(
     # Reminder: test suite tesseract test plugins might break after any changes
     # to the number of order parameters here
 
-    args_tesseract.extend([fspath(input_file), fspath(prefix), 'pdf', 'txt'])
+    args_tesseract.extend([input_arg, fspath(prefix), 'pdf', 'txt'])
     args_tesseract.extend(tessconfig)
     try:
-        p = run(args_tesseract, stdout=PIPE, stderr=STDOUT, timeout=timeout, check=True)
+        p = run(
+            args_tesseract,
+            env=_env(),
+            stdin=stdin,
+            stdout=PIPE,
+            stderr=STDOUT,
+            timeout=timeout,
+            check=True,
+        )
         stdout = p.stdout
         with suppress(FileNotFoundError):
             prefix.with_suffix('.txt').replace(output_text)
@@ -0,0 +1,141 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+"""Page images passed between page processing stages."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from PIL import Image
+
+from ocrmypdf.helpers import Resolution
+
+# File formats for page images: suffix and Pillow save parameters
+IMAGE_FORMATS: dict[str, tuple[str, dict[str, Any]]] = {
+    'png': ('.png', {}),
+    'fast-png': ('.png', {'compress_level': 1}),
+    'tiff': ('.tif', {'compression': 'raw'}),
+    'pnm': ('.pnm', {}),
+}
+
+# Formats each consumer of page image files accepts, in order of preference, for
+# each --intermediate-image-format. The OCR engine needs the resolution in the
+# file, which PNM cannot store. img2pdf copies PNG data into the output PDF as
+# is, so the visible page image is always saved with full compression.
+CONSUMER_FORMATS: dict[str, dict[str, list[str]]] = {
+    'png': {
+        'ocr': ['png'],
+        'unpaper': ['png'],
+        'pdf': ['png'],
+    },
+    'fast': {
+        'ocr': ['fast-png', 'png'],
+        'unpaper': ['fast-png', 'png'],
+        'pdf': ['png'],
+    },
+    'uncompressed': {
+        'ocr': ['tiff', 'fast-png', 'png'],
+        'unpaper': ['pnm', 'fast-png', 'png'],
+        'pdf': ['png'],
+    },
+}
+
+
+def consumer_formats(intermediate_image_format: str, consumer: str) -> list[str]:
+    """Formats to give a consumer of page image files, best first.
+
+    Args:
+        intermediate_image_format: The --intermediate-image-format setting.
+        consumer: ``'ocr'`` for the OCR engine, ``'unpaper'``, or ``'pdf'`` for
+            the visible page image that img2pdf puts in the output PDF.
+    """
+    return CONSUMER_FORMATS[intermediate_image_format][consumer]
+
+
+class PageImage:
+    """A page image, decoded in memory, saved to files, or both.
+
+    Stages that transform the image with Pillow take the decoded image and pass
+    a new decoded image on, without saving it. Stages that run an external
+    program or call a hook with a filename take a file, in a format the program
+    accepts. The image is only decoded from its file, or saved in a format, when
+    a stage asks for that form, and at most once.
+
+    Args:
+        path: The file holding the image, or if ``image`` is given, where to save
+            the image when a file is needed. The suffix is replaced to suit the
+            file format.
+        image: The decoded image, if there is one.
+        dpi: Resolution to save the image with. Defaults to the resolution in
+            the image's metadata.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        image: Image.Image | None = None,
+        *,
+        dpi: Resolution | None = None,
+    ):
+        self.path = path
+        self._image = image
+        self._dpi = dpi
+        self._files: dict[str, Path] = {}
+        if image is None:
+            # Files from Ghostscript and unpaper count as fully compressed
+            self._files['pnm' if path.suffix == '.pnm' else 'png'] = path
+
+    def __repr__(self):
+        return f'PageImage({self.path!r}, files={sorted(self._files)})'
+
+    @property
+    def image(self) -> Image.Image:
+        """The decoded image.
+
+        Stages must not modify it in place, since other stages may share it.
+        """
+        if self._image is None:
+            with Image.open(self.path) as im:
+                im.load()
+            self._image = im
+        return self._image
+
+    @property
+    def dpi(self) -> Resolution | None:
+        """The resolution of the image, if known."""
+        if self._dpi is not None:
+            return self._dpi
+        if 'dpi' in self.image.info:
+            return Resolution(*self.image.info['dpi'])
+        return None
+
+    def file_for(self, formats: Sequence[str]) -> Path:
+        """A file holding the image in one of ``formats``, in order of preference.
+
+        An existing file in any of the formats is used. Otherwise the image is
+        saved in the first format.
+        """
+        for fmt in formats:
+            if fmt in self._files:
+                return self._files[fmt]
+
+        fmt = formats[0]
+        suffix, params = IMAGE_FORMATS[fmt]
+        image = self.image  # Decode first, in case we are about to overwrite
+        dpi = self.dpi
+        if dpi is not None and fmt != 'pnm':
+            params = dict(params, dpi=dpi)
+        path = self.path.with_suffix(suffix)
+        image.save(path, **params)
+        # Forget any file in another format we just overwrote
+        self._files = {k: v for k, v in self._files.items() if v != path}
+        self._files[fmt] = path
+        return path
+
+    @property
+    def file(self) -> Path:
+        """A PNG file holding the image, saved now if there was none."""
+        return self.file_for(['png'])
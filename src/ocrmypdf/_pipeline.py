@@ -15,16 +15,17 @@ from contextlib import suppress
 from io import BytesIO
 from pathlib import Path
 from shutil import copyfileobj
-from typing import Any, BinaryIO, TypeVar, cast
+from typing import IO, Any, BinaryIO, TypeVar, cast
 
 import img2pdf
 import pikepdf
 from PIL import Image, ImageColor, ImageDraw
 
 from ocrmypdf._concurrent import Executor
-from ocrmypdf._exec import unpaper
+from ocrmypdf._exec import ghostscript, unpaper
 from ocrmypdf._jobcontext import PageContext, PdfContext
 from ocrmypdf._metadata import repair_docinfo_nuls
+from ocrmypdf._pageimage import PageImage, consumer_formats
 from ocrmypdf.exceptions import (
     DigitalSignatureError,
     DpiError,
@@ -387,6 +388,58 @@ def is_ocr_required(page_context: PageContext) -> bool:
     return ocr_required
 
 
+def estimate_page_cost(page_context: PageContext) -> float:
+    """Estimate the relative cost of processing a page, for scheduling.
+
+    Rasterizing, preprocessing and OCR all take time roughly in proportion to
+    the number of pixels in the page image, so the estimate is the number of
+    pixels the page will be rasterized to. Pages that will obviously be skipped
+    cost nothing. The estimate only uses what :class:`PageInfo` knows before
+    any page is processed.
+    """
+    pageinfo = page_context.pageinfo
+    options = page_context.options
+    if options.pages and pageinfo.pageno not in options.pages:
+        return 0.0
+    if pageinfo.has_text and options.skip_text:
+        return 0.0
+    dpi = get_canvas_square_dpi(page_context, calculate_image_dpi(page_context))
+    return float(pageinfo.width_inches) * dpi.x * float(pageinfo.height_inches) * dpi.y
+
+
+# Bytes per pixel that Pillow uses for images from each Ghostscript device
+RASTER_DEVICE_BYTES_PER_PIXEL = {'pngmono': 1, 'pnggray': 1, 'png256': 1, 'png16m': 4}
+# Copies of the page image held at once: as rasterized, as preprocessed, and the
+# image prepared for OCR
+PAGE_IMAGE_COPIES = 3
+# Bytes per pixel that the OCR engine uses for its own grayscale and
+# thresholded copies of the image and its layout analysis
+OCR_BYTES_PER_PIXEL = 4
+# Memory a page needs regardless of its size, for Ghostscript and the OCR engine
+# and its language models
+PAGE_BASE_MEMORY = 150 * 1024**2
+
+
+def estimate_page_memory(page_context: PageContext) -> int:
+    """Estimate the peak memory in bytes needed to process a page.
+
+    The estimate follows from the number of pixels the page will be rasterized
+    to, as in :func:`estimate_page_cost`, and the color depth Ghostscript will
+    rasterize the page with. It is deliberately generous, since it is used to
+    decide how many pages may be processed at once without running out of
+    memory.
+    """
+    pixels = estimate_page_cost(page_context)
+    if not pixels:
+        return 0
+    bytes_per_pixel = RASTER_DEVICE_BYTES_PER_PIXEL[
+        get_raster_device(page_context.pageinfo)
+    ]
+    return PAGE_BASE_MEMORY + int(
+        pixels * (PAGE_IMAGE_COPIES * bytes_per_pixel + OCR_BYTES_PER_PIXEL)
+    )
+
+
 def rasterize_preview(input_file: Path, page_context: PageContext) -> Path:
     """Generate a lower quality preview image."""
     output_file = page_context.get_path('rasterize_preview.jpg')
@@ -394,20 +447,62 @@ def rasterize_preview(input_file: Path, page_context: PageContext) -> Path:
         [get_canvas_square_dpi(page_context)]
     )
     page_dpi = Resolution(300.0, 300.0).take_min([get_page_square_dpi(page_context)])
-    page_context.plugin_manager.hook.rasterize_pdf_page(
-        input_file=input_file,
-        output_file=output_file,
-        raster_device='jpeggray',
-        raster_dpi=canvas_dpi,
-        pageno=page_context.pageinfo.pageno + 1,
-        page_dpi=page_dpi,
-        rotation=0,
-        filter_vector=False,
-        stop_on_soft_error=not page_context.options.continue_on_soft_render_error,
-    )
+    with ghostscript.render_server(page_context.options.render_server):
+        page_context.plugin_manager.hook.rasterize_pdf_page(
+            input_file=input_file,
+            output_file=output_file,
+            raster_device='jpeggray',
+            raster_dpi=canvas_dpi,
+            pageno=page_context.pageinfo.pageno + 1,
+            page_dpi=page_dpi,
+            rotation=0,
+            filter_vector=False,
+            stop_on_soft_error=not page_context.options.continue_on_soft_render_error,
+        )
     return output_file
 
 
+def derive_preview(page_image: PageImage, page_context: PageContext) -> Path:
+    """Generate the preview image from a page image, without rendering again.
+
+    The page image must have been rasterized without orientation correction. Like
+    :func:`rasterize_preview`, the preview is grayscale at no more than 300 DPI.
+    """
+    output_file = page_context.get_path('rasterize_preview.jpg')
+    im = page_image.image
+    dpi = page_image.dpi or Resolution(300.0, 300.0)
+    scale = min(1.0, 300.0 / max(dpi.x, dpi.y))
+    preview = im.convert('L')
+    if scale < 1.0:
+        preview = preview.resize(
+            (max(1, round(im.width * scale)), max(1, round(im.height * scale))),
+            resample=Image.Resampling.BOX,
+        )
+    preview.save(output_file, dpi=(dpi.x * scale, dpi.y * scale))
+    return output_file
+
+
+def rotate_page_image(page_image: PageImage, correction: int) -> PageImage:
+    """Apply an orientation correction to a page image rasterized without it.
+
+    The result is the same as rasterizing with the correction, since cardinal
+    rotations are lossless.
+    """
+    if correction == 0:
+        return page_image
+    # correction is a clockwise angle and Image.ROTATE_* is counterclockwise
+    # so this cancels out the rotation
+    transpose = {
+        90: Image.Transpose.ROTATE_90,
+        180: Image.Transpose.ROTATE_180,
+        270: Image.Transpose.ROTATE_270,
+    }[correction]
+    dpi = page_image.dpi
+    if dpi is not None and correction % 180 == 90:
+        dpi = dpi.flip_axis()
+    return PageImage(page_image.path, page_image.image.transpose(transpose), dpi=dpi)
+
+
 def describe_rotation(
     page_context: PageContext, orient_conf: OrientationConfidence, correction: int
 ) -> str:
@@ -499,6 +594,32 @@ def calculate_raster_dpi(page_context: PageContext):
     return canvas_dpi, page_dpi
 
 
+def get_raster_device(pageinfo: PageInfo) -> str:
+    """Choose the Ghostscript PNG device that preserves the page's colors."""
+    colorspaces = ['pngmono', 'pnggray', 'png256', 'png16m']
+    device_idx = 0
+
+    def at_least(colorspace):
+        return max(device_idx, colorspaces.index(colorspace))
+
+    for image in pageinfo.images:
+        if image.type_ != 'image':
+            continue  # ignore masks
+        if image.bpc > 1:
+            if image.color == Colorspace.index:
+                device_idx = at_least('png256')
+            elif image.color == Colorspace.gray:
+                device_idx = at_least('pnggray')
+            else:
+                device_idx = at_least('png16m')
+
+    if pageinfo.has_vector:
+        log.debug("Page has vector content, using png16m")
+        device_idx = at_least('png16m')
+
+    return colorspaces[device_idx]
+
+
 def rasterize(
     input_file: Path,
     page_context: PageContext,
@@ -520,54 +641,35 @@ def rasterize(
     Returns:
         Path: The output PNG file path.
     """
-    colorspaces = ['pngmono', 'pnggray', 'png256', 'png16m']
-    device_idx = 0
-
     if remove_vectors is None:
         remove_vectors = page_context.options.remove_vectors
 
     output_file = page_context.get_path(f'rasterize{output_tag}.png')
     pageinfo = page_context.pageinfo
-
-    def at_least(colorspace):
-        return max(device_idx, colorspaces.index(colorspace))
-
-    for image in pageinfo.images:
-        if image.type_ != 'image':
-            continue  # ignore masks
-        if image.bpc > 1:
-            if image.color == Colorspace.index:
-                device_idx = at_least('png256')
-            elif image.color == Colorspace.gray:
-                device_idx = at_least('pnggray')
-            else:
-                device_idx = at_least('png16m')
-
-    if pageinfo.has_vector:
-        log.debug("Page has vector content, using png16m")
-        device_idx = at_least('png16m')
-
-    device = colorspaces[device_idx]
+    device = get_raster_device(pageinfo)
 
     log.debug(f"Rasterize with {device}, rotation {correction}")
 
     canvas_dpi, page_dpi = calculate_raster_dpi(page_context)
 
-    page_context.plugin_manager.hook.rasterize_pdf_page(
-        input_file=input_file,
-        output_file=output_file,
-        raster_device=device,
-        raster_dpi=canvas_dpi,
-        page_dpi=page_dpi,
-        pageno=pageinfo.pageno + 1,
-        rotation=correction,
-        filter_vector=remove_vectors,
-        stop_on_soft_error=not page_context.options.continue_on_soft_render_error,
-    )
+    with ghostscript.render_server(page_context.options.render_server):
+        page_context.plugin_manager.hook.rasterize_pdf_page(
+            input_file=input_file,
+            output_file=output_file,
+            raster_device=device,
+            raster_dpi=canvas_dpi,
+            page_dpi=page_dpi,
+            pageno=pageinfo.pageno + 1,
+            rotation=correction,
+            filter_vector=remove_vectors,
+            stop_on_soft_error=not page_context.options.continue_on_soft_render_error,
+        )
     return output_file
 
 
-def preprocess_remove_background(input_file: Path, page_context: PageContext) -> Path:
+def preprocess_remove_background(
+    page_image: PageImage, page_context: PageContext
+) -> PageImage:
     """Remove the background from the input image (temporarily disabled)."""
     if any(image.bpc > 1 for image in page_context.pageinfo.images):
         raise NotImplementedError("--remove-background is temporarily not implemented")
@@ -575,51 +677,63 @@ def preprocess_remove_background(input_file: Path, page_context: PageContext) ->
         # leptonica.remove_background(input_file, output_file)
         # return output_file
     log.info("background removal skipped on mono page")
-    return input_file
+    return page_image
 
 
-def preprocess_deskew(input_file: Path, page_context: PageContext) -> Path:
-    """Deskews the input image using the OCR engine and saves the output to a file.
+def preprocess_deskew(page_image: PageImage, page_context: PageContext) -> PageImage:
+    """Deskews the input image using the OCR engine.
 
     Args:
-        input_file: The input image file to deskew.
+        page_image: The input image to deskew.
         page_context: The context of the page being processed.
 
     Returns:
-        Path: The path to the deskewed image file.
+        PageImage: The deskewed image, saved as ``pp_deskew.png`` if a later stage
+        needs a file.
     """
     output_file = page_context.get_path('pp_deskew.png')
     dpi = get_page_square_dpi(page_context, calculate_image_dpi(page_context))
 
+    options = page_context.options
     ocr_engine = page_context.plugin_manager.hook.get_ocr_engine()
-    deskew_angle_degrees = ocr_engine.get_deskew(input_file, page_context.options)
-
-    with Image.open(input_file) as im:
-        # According to Pillow docs, .rotate() will automatically use Image.NEAREST
-        # resampling if image is mode '1' or 'P'
-        deskewed = im.rotate(
-            deskew_angle_degrees,
-            resample=Image.Resampling.BICUBIC,
-            fillcolor=ImageColor.getcolor('white', mode=im.mode),  # type: ignore
-        )
-        deskewed.save(output_file, dpi=dpi)
+    deskew_angle_degrees = ocr_engine.get_deskew(
+        page_image.file_for(consumer_formats(options.intermediate_image_format, 'ocr')),
+        options,
+    )
 
-    return output_file
+    im = page_image.image
+    # According to Pillow docs, .rotate() will automatically use Image.NEAREST
+    # resampling if image is mode '1' or 'P'
+    deskewed = im.rotate(
+        deskew_angle_degrees,
+        resample=Image.Resampling.BICUBIC,
+        fillcolor=ImageColor.getcolor('white', mode=im.mode),  # type: ignore
+    )
+    return PageImage(output_file, deskewed, dpi=dpi)
 
 
-def preprocess_clean(input_file: Path, page_context: PageContext) -> Path:
+def preprocess_clean(page_image: PageImage, page_context: PageContext) -> PageImage:
     """Clean the input image using unpaper."""
+    options = page_context.options
     output_file = page_context.get_path('pp_clean.png')
+    if options.intermediate_image_format != 'png':
+        # unpaper produces PNM, so keep that instead of compressing it
+        output_file = output_file.with_suffix('.pnm')
     dpi = get_page_square_dpi(page_context, calculate_image_dpi(page_context))
-    return unpaper.clean(
-        input_file,
+    cleaned = unpaper.clean(
+        page_image.file_for(
+            consumer_formats(options.intermediate_image_format, 'unpaper')
+        ),
         output_file,
         dpi=dpi.to_scalar(),
-        unpaper_args=page_context.options.unpaper_args,
+        unpaper_args=options.unpaper_args,
     )
+    if cleaned != output_file:
+        return page_image  # Image too large for unpaper
+    return PageImage(cleaned, dpi=dpi)
 
 
-def create_ocr_image(image: Path, page_context: PageContext) -> Path:
+def create_ocr_image(page_image: PageImage, page_context: PageContext) -> Path:
     """Create the image we send for OCR.
 
     Might not be the same as the display image depending on preprocessing.
@@ -627,7 +741,10 @@ def create_ocr_image(image: Path, page_context: PageContext) -> Path:
     """
     output_file = page_context.get_path('ocr.png')
     options = page_context.options
-    with Image.open(image) as im:
+    # Copy, since we draw on the image, and so may the filter_ocr_image hook
+    with page_image.image.copy() as im:
+        if page_image.dpi is not None:
+            im.info['dpi'] = tuple(page_image.dpi)
         log.debug('resolution %r', im.info['dpi'])
 
         if not options.force_ocr:
@@ -663,12 +780,15 @@ def create_ocr_image(image: Path, page_context: PageContext) -> Path:
             im = filter_im
 
         # Pillow requires integer DPI
-        dpi = tuple(round(coord) for coord in im.info['dpi'])
-        im.save(output_file, dpi=dpi)
-    return output_file
+        dpi = Resolution(*im.info['dpi']).to_int()
+        return PageImage(output_file, im, dpi=dpi).file_for(
+            consumer_formats(options.intermediate_image_format, 'ocr')
+        )
 
 
-def ocr_engine_hocr(input_file: Path, page_context: PageContext) -> tuple[Path, Path]:
+def ocr_engine_hocr(
+    input_file: Path | IO[bytes], page_context: PageContext
+) -> tuple[Path, Path]:
     """Run the OCR engine and generate hOCR output."""
     hocr_out = page_context.get_path('ocr_hocr.hocr')
     hocr_text_out = page_context.get_path('ocr_hocr.txt')
@@ -684,6 +804,28 @@ def ocr_engine_hocr(input_file: Path, page_context: PageContext) -> tuple[Path,
     return hocr_out, hocr_text_out
 
 
+def ocr_engine_hocr_batch(
+    input_files: Sequence[Path], page_contexts: Sequence[PageContext]
+) -> list[tuple[Path, Path]]:
+    """Run the OCR engine on several pages at once and generate hOCR output."""
+    hocr_outs = [
+        page_context.get_path('ocr_hocr.hocr') for page_context in page_contexts
+    ]
+    hocr_text_outs = [
+        page_context.get_path('ocr_hocr.txt') for page_context in page_contexts
+    ]
+    options = page_contexts[0].options
+
+    ocr_engine = page_contexts[0].plugin_manager.hook.get_ocr_engine()
+    ocr_engine.generate_hocr_batch(
+        input_files=input_files,
+        output_hocrs=hocr_outs,
+        output_texts=hocr_text_outs,
+        options=options,
+    )
+    return list(zip(hocr_outs, hocr_text_outs))
+
+
 def should_visible_page_image_use_jpg(pageinfo: PageInfo) -> bool:
     """Determines whether the visible page image should be saved as a JPEG.
 
@@ -700,26 +842,23 @@ def should_visible_page_image_use_jpg(pageinfo: PageInfo) -> bool:
     )
 
 
-def create_visible_page_jpg(image: Path, page_context: PageContext) -> Path:
+def create_visible_page_jpg(page_image: PageImage, page_context: PageContext) -> Path:
     """Create a visible page image in JPEG format.
 
     This is intended to be used when all images on the page were originally JPEGs.
     """
     output_file = page_context.get_path('visible.jpg')
-    with Image.open(image) as im:
-        # At this point the image should be a .png, but deskew, unpaper
-        # might have removed the DPI information. In this case, fall back to
-        # square DPI used to rasterize. When the preview image was
-        # rasterized, it was also converted to square resolution, which is
-        # what we want to give to the OCR engine, so keep it square.
-        if 'dpi' in im.info:
-            dpi = Resolution(*im.info['dpi'])
-        else:
-            # Fallback to page-implied DPI
-            dpi = get_page_square_dpi(page_context, calculate_image_dpi(page_context))
-
-        # Pillow requires integer DPI
-        im.save(output_file, format='JPEG', dpi=dpi.to_int())
+    # Deskew or unpaper might have removed the DPI information. In this case,
+    # fall back to square DPI used to rasterize. When the preview image was
+    # rasterized, it was also converted to square resolution, which is
+    # what we want to give to the OCR engine, so keep it square.
+    dpi = page_image.dpi
+    if dpi is None:
+        # Fallback to page-implied DPI
+        dpi = get_page_square_dpi(page_context, calculate_image_dpi(page_context))
+
+    # Pillow requires integer DPI
+    page_image.image.save(output_file, format='JPEG', dpi=dpi.to_int())
     return output_file
 
 
@@ -803,7 +942,7 @@ def render_hocr_page(hocr: Path, page_context: PageContext) -> Path:
 
 
 def ocr_engine_textonly_pdf(
-    input_image: Path, page_context: PageContext
+    input_image: Path | IO[bytes], page_context: PageContext
 ) -> tuple[Path, Path]:
     """Run the OCR engine and generate a text-only PDF (will look blank)."""
     output_pdf = page_context.get_path('ocr_tess.pdf')
@@ -0,0 +1,205 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+"""Resume an interrupted run from the pages it finished."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections.abc import Collection
+from pathlib import Path
+
+from ocrmypdf._pipelines._common import (
+    HOCRResultDecoder,
+    HOCRResultEncoder,
+    PageResult,
+)
+from ocrmypdf._version import __version__
+from ocrmypdf.exceptions import BadArgsError
+
+log = logging.getLogger(__name__)
+
+MANIFEST = 'checkpoint.jsonl'
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Options that change how a run is carried out, but not the pages it produces
+RUN_OPTIONS = frozenset(
+    {
+        'checkpoint_folder',
+        'input_file',
+        'jobs',
+        'keep_temporary_files',
+        'max_memory',
+        'output_file',
+        'progress_bar',
+        'quiet',
+        'render_ahead',
+        'render_server',
+        'scheduler',
+        'sidecar',
+        'use_threads',
+        'verbose',
+    }
+)
+
+# Files in the work folder that belong to the run rather than to its pages
+RUN_FILES = frozenset({MANIFEST, 'debug.log'})
+
+
+def checkpoint_work_folder(folder: Path) -> Path:
+    """Create the work folder for a checkpointed run, or check it may be resumed.
+
+    The folder must be empty or hold the checkpoint of an earlier run, since its
+    other files are deleted when the run starts.
+    """
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        raise BadArgsError(f"Cannot create the checkpoint folder {folder}: {e}") from e
+    if any(folder.iterdir()) and not (folder / MANIFEST).exists():
+        raise BadArgsError(
+            f"The checkpoint folder {folder} is not empty and holds no checkpoint"
+        )
+    return folder.resolve()
+
+
+def run_fingerprint(input_file: Path, options: argparse.Namespace) -> str:
+    """Identify the input file, OCRmyPDF version and settings of a run.
+
+    Only a run with the same fingerprint may reuse the pages of a checkpoint.
+    """
+    h = hashlib.sha256()
+    with open(input_file, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    settings = {
+        name: value for name, value in vars(options).items() if name not in RUN_OPTIONS
+    }
+    h.update(__version__.encode())
+    h.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _relative(path: Path | None, folder: Path) -> Path | None:
+    if path is None or not path.is_relative_to(folder):
+        return path
+    return path.relative_to(folder)
+
+
+class Checkpoint:
+    """A manifest of the pages of a run that are finished, in its work folder.
+
+    The manifest starts with the fingerprint of the run, followed by one line for
+    each finished page, which names the page's files relative to the work folder.
+    A line is appended as soon as a page is finished, so that if the run is
+    interrupted, a run started with the same work folder, input file and settings
+    finishes only the remaining pages.
+    """
+
+    def __init__(self, folder: Path, fingerprint: str):
+        self.folder = folder
+        self.fingerprint = fingerprint
+        self.finished: dict[int, PageResult] = {}
+
+    @property
+    def manifest(self) -> Path:
+        """The manifest file."""
+        return self.folder / MANIFEST
+
+    @classmethod
+    def resume(
+        cls,
+        folder: Path,
+        input_file: Path,
+        options: argparse.Namespace,
+        *,
+        keep: Collection[str] = (),
+    ) -> Checkpoint:
+        """Load the finished pages of an earlier run from its work folder.
+
+        Pages are only reused from a run with the same fingerprint, and only if
+        their files still exist. All other files in the folder, except those
+        named in ``keep``, are deleted, since they may be incomplete.
+        """
+        checkpoint = cls(folder, run_fingerprint(input_file, options))
+        try:
+            lines = checkpoint.manifest.read_text(encoding='utf-8').splitlines()
+        except FileNotFoundError:
+            lines = []
+        if lines and checkpoint._header() == lines[0]:
+            checkpoint._load(lines[1:])
+        elif lines:
+            log.warning(
+                "The checkpoint in %s was made with another input file, version "
+                "or settings; starting over",
+                folder,
+            )
+        checkpoint._start(keep)
+        return checkpoint
+
+    def _header(self) -> str:
+        return json.dumps({'fingerprint': self.fingerprint})
+
+    def _load(self, lines: list[str]) -> None:
+        for line in lines:
+            try:
+                fields = json.loads(line, cls=HOCRResultDecoder)
+                result = PageResult(**fields)
+            except (ValueError, TypeError):
+                break  # The last line was cut short when the run was interrupted
+            result = result._replace(
+                **{
+                    field: self.folder / path
+                    for field in ('pdf_page_from_image', 'ocr', 'text')
+                    if (path := getattr(result, field)) is not None
+                }
+            )
+            if all(
+                path is None or path.exists()
+                for path in (result.pdf_page_from_image, result.ocr, result.text)
+            ):
+                self.finished[result.pageno] = result
+
+    def _start(self, keep: Collection[str]) -> None:
+        keep = set(keep) | RUN_FILES
+        for result in self.finished.values():
+            for path in (result.pdf_page_from_image, result.ocr, result.text):
+                if path is not None and path.parent == self.folder:
+                    keep.add(path.name)
+        for path in self.folder.iterdir():
+            if path.name in keep:
+                continue
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+        staging = self.manifest.with_suffix('.tmp')
+        with open(staging, 'w', encoding='utf-8') as f:
+            print(self._header(), file=f)
+            for result in self.finished.values():
+                print(self._line(result), file=f)
+        os.replace(staging, self.manifest)
+
+    def _line(self, result: PageResult) -> str:
+        fields = result._replace(
+            pdf_page_from_image=_relative(result.pdf_page_from_image, self.folder),
+            ocr=_relative(result.ocr, self.folder),
+            text=_relative(result.text, self.folder),
+            timings=None,
+        )._asdict()
+        return json.dumps(fields, cls=HOCRResultEncoder)
+
+    def page_finished(self, result: PageResult) -> None:
+        """Record that a page is finished, with the files it produced."""
+        with open(self.manifest, 'a', encoding='utf-8') as f:
+            print(self._line(result), file=f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.finished[result.pageno] = result
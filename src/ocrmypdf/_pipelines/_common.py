@@ -11,7 +11,8 @@ import os
 import shutil
 import sys
 import threading
-from collections.abc import Callable, Sequence
+import time
+from collections.abc import Callable, Iterator, Sequence
 from concurrent.futures.process import BrokenProcessPool
 from concurrent.futures.thread import BrokenThreadPool
 from contextlib import contextmanager
@@ -27,11 +28,14 @@ from ocrmypdf._concurrent import Executor, setup_executor
 from ocrmypdf._jobcontext import PageContext, PdfContext
 from ocrmypdf._logging import PageNumberFilter
 from ocrmypdf._metadata import metadata_fixup
+from ocrmypdf._pageimage import PageImage, consumer_formats
 from ocrmypdf._pipeline import (
     convert_to_pdfa,
     create_ocr_image,
     create_pdf_page_from_image,
     create_visible_page_jpg,
+    derive_preview,
+    estimate_page_cost,
     generate_postscript_stub,
     get_orientation_correction,
     get_pdf_save_settings,
@@ -42,9 +46,17 @@ from ocrmypdf._pipeline import (
     preprocess_remove_background,
     rasterize,
     rasterize_preview,
+    rotate_page_image,
     should_linearize,
     should_visible_page_image_use_jpg,
 )
+from ocrmypdf._pipelines._memory import MemoryBudget, set_worker_memory_budget
+from ocrmypdf._pipelines._ocr_threads import (
+    TesseractThreads,
+    set_worker_tesseract_threads,
+    tesseract_threads_allocated,
+)
+from ocrmypdf._pipelines._stages import StageLimits, set_worker_stage_limits
 from ocrmypdf._plugin_manager import OcrmypdfPluginManager
 from ocrmypdf._validation import (
     report_output_file_size,
@@ -105,6 +117,53 @@ class PageResult(NamedTuple):
     orientation_correction: int = 0
     """Orientation correction in degrees."""
 
+    timings: dict[str, float] | None = None
+    """Seconds spent in each stage of processing the page."""
+
+    ocr_image: Path | None = None
+    """Image prepared for OCR, while the page waits for batched OCR."""
+
+    hocr: Path | None = None
+    """hOCR output, while the page waits for its text layer to be rendered."""
+
+
+@contextmanager
+def timed_stage(timings: dict[str, float] | None, stage: str) -> Iterator[None]:
+    """Add the time spent in the block to ``timings[stage]``.
+
+    Does nothing if *timings* is ``None``. Time is only recorded if the block
+    succeeds.
+    """
+    start = time.perf_counter()
+    yield
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def reported_stage(
+    plugin_manager: OcrmypdfPluginManager, stage: str, pageno: int | None = None
+) -> Iterator[None]:
+    """Report the time spent in the block to the report_stage_timing hook.
+
+    Must be used in the main process.
+    """
+    start = time.perf_counter()
+    yield
+    plugin_manager.hook.report_stage_timing(
+        stage=stage, seconds=time.perf_counter() - start, pageno=pageno
+    )
+
+
+def report_page_timings(
+    plugin_manager: OcrmypdfPluginManager, pageno: int, timings: dict[str, float]
+) -> None:
+    """Report stage timings collected while a page was processed by a worker."""
+    for stage, seconds in timings.items():
+        plugin_manager.hook.report_stage_timing(
+            stage=stage, seconds=seconds, pageno=pageno
+        )
+
 
 class HOCRResultEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -182,13 +241,21 @@ def configure_debug_logging(
     return log_file_handler, remover
 
 
-def worker_init(max_pixels: int | None) -> None:
+def worker_init(
+    max_pixels: int | None,
+    memory_budget: MemoryBudget | None = None,
+    tesseract_threads: TesseractThreads | None = None,
+    stage_limits: StageLimits | None = None,
+) -> None:
     """Initialize a worker thread or process."""
     # In Windows, child process will not inherit our change to this value in
     # the parent process, so ensure workers get it set. Not needed when running
     # threaded, but harmless to set again.
     PIL.Image.MAX_IMAGE_PIXELS = max_pixels
     pikepdf_enable_mmap()
+    set_worker_memory_budget(memory_budget)
+    set_worker_tesseract_threads(tesseract_threads)
+    set_worker_stage_limits(stage_limits)
 
 
 @contextmanager
@@ -231,11 +298,21 @@ def _print_temp_folder_location(work_folder: Path):
 
 
 @contextmanager
-def manage_work_folder(*, work_folder: Path, retain: bool, print_location: bool):
+def manage_work_folder(
+    *,
+    work_folder: Path,
+    retain: bool,
+    print_location: bool,
+    retain_on_error: bool = False,
+):
+    failed = False
     try:
         yield work_folder
+    except BaseException:
+        failed = True
+        raise
     finally:
-        if retain:
+        if retain or (failed and retain_on_error):
             if print_location:
                 _print_temp_folder_location(work_folder)
         else:
@@ -326,36 +403,65 @@ def do_get_pdfinfo(
     )
 
 
+def costliest_pages_first(context: PdfContext) -> list[tuple[PageContext]]:
+    """Page context arguments, with the pages that cost most to process first.
+
+    Pages are started in this order, so that a large page is not left for last
+    with one worker processing it while the others are idle. Pages that cost
+    the same stay in page order.
+    """
+    return sorted(
+        context.get_page_context_args(),
+        key=lambda args: estimate_page_cost(args[0]),
+        reverse=True,
+    )
+
+
 def preprocess(
     page_context: PageContext,
-    image: Path,
+    image: PageImage,
     remove_background: bool,
     deskew: bool,
     clean: bool,
-) -> Path:
+) -> PageImage:
     """Preprocess an image."""
     if remove_background:
         image = preprocess_remove_background(image, page_context)
     if deskew:
-        image = preprocess_deskew(image, page_context)
+        with tesseract_threads_allocated():
+            image = preprocess_deskew(image, page_context)
     if clean:
         image = preprocess_clean(image, page_context)
     return image
 
 
 def make_intermediate_images(
-    page_context: PageContext, orientation_correction: int
-) -> tuple[Path, Path | None]:
-    """Create intermediate and preprocessed images for OCR."""
+    page_context: PageContext,
+    orientation_correction: int,
+    unrotated_image: PageImage | None = None,
+) -> tuple[PageImage, PageImage | None]:
+    """Create intermediate and preprocessed images for OCR.
+
+    If *unrotated_image* is given, it is the page already rasterized without
+    orientation correction, and it is rotated instead of rasterizing again.
+
+    Images are handed from stage to stage in memory, and only saved to files
+    when a stage needs a file.
+    """
     options = page_context.options
 
     ocr_image = preprocess_out = None
-    rasterize_out = rasterize(
-        page_context.origin,
-        page_context,
-        correction=orientation_correction,
-        remove_vectors=False,
-    )
+    if unrotated_image is not None:
+        rasterize_out = rotate_page_image(unrotated_image, orientation_correction)
+    else:
+        rasterize_out = PageImage(
+            rasterize(
+                page_context.origin,
+                page_context,
+                correction=orientation_correction,
+                remove_vectors=False,
+            )
+        )
 
     if not any([options.clean, options.clean_final, options.remove_vectors]):
         ocr_image = preprocess_out = preprocess(
@@ -375,19 +481,21 @@ def make_intermediate_images(
                 clean=options.clean_final,
             )
         if options.remove_vectors:
-            rasterize_ocr_out = rasterize(
-                page_context.origin,
-                page_context,
-                correction=orientation_correction,
-                remove_vectors=True,
-                output_tag='_ocr',
+            rasterize_ocr_out = PageImage(
+                rasterize(
+                    page_context.origin,
+                    page_context,
+                    correction=orientation_correction,
+                    remove_vectors=True,
+                    output_tag='_ocr',
+                )
             )
         else:
             rasterize_ocr_out = rasterize_out
 
         if (
             preprocess_out
-            and rasterize_ocr_out == rasterize_out
+            and rasterize_ocr_out is rasterize_out
             and options.clean == options.clean_final
         ):
             # Optimization: image for OCR is identical to presentation image
@@ -403,28 +511,62 @@ def make_intermediate_images(
     return ocr_image, preprocess_out
 
 
-def process_page(page_context: PageContext) -> tuple[Path, Path | None, int]:
-    """Process page to create OCR image, visible page image and orientation."""
+def process_page(
+    page_context: PageContext, timings: dict[str, float] | None = None
+) -> tuple[Path, Path | None, int]:
+    """Process page to create OCR image, visible page image and orientation.
+
+    If *timings* is given, the time spent in each stage is added to it.
+    """
     options = page_context.options
     orientation_correction = 0
+    unrotated_image = None
     if options.rotate_pages:
-        # Rasterize
-        rasterize_preview_out = rasterize_preview(page_context.origin, page_context)
-        orientation_correction = get_orientation_correction(
-            rasterize_preview_out, page_context
+        with timed_stage(timings, 'orientation'):
+            # Rasterize
+            if options.rotate_pages_single_render:
+                unrotated_image = PageImage(
+                    rasterize(page_context.origin, page_context, remove_vectors=False)
+                )
+                rasterize_preview_out = derive_preview(unrotated_image, page_context)
+            else:
+                rasterize_preview_out = rasterize_preview(
+                    page_context.origin, page_context
+                )
+            with tesseract_threads_allocated():
+                orientation_correction = get_orientation_correction(
+                    rasterize_preview_out, page_context
+                )
+
+    with timed_stage(timings, 'rasterize'):
+        ocr_image, preprocess_out = make_intermediate_images(
+            page_context, orientation_correction, unrotated_image
         )
+        ocr_image_out = create_ocr_image(ocr_image, page_context)
+
+    with timed_stage(timings, 'page_image'):
+        pdf_page_from_image_out = _make_pdf_page_from_image(
+            page_context, preprocess_out, orientation_correction
+        )
+    return ocr_image_out, pdf_page_from_image_out, orientation_correction
 
-    ocr_image, preprocess_out = make_intermediate_images(
-        page_context, orientation_correction
-    )
-    ocr_image_out = create_ocr_image(ocr_image, page_context)
 
+def _make_pdf_page_from_image(
+    page_context: PageContext,
+    preprocess_out: PageImage | None,
+    orientation_correction: int,
+) -> Path | None:
+    """Create the visible page image, unless lossless reconstruction is used."""
+    options = page_context.options
     pdf_page_from_image_out = None
     if not options.lossless_reconstruction:
         assert preprocess_out
-        visible_image_out = preprocess_out
         if should_visible_page_image_use_jpg(page_context.pageinfo):
-            visible_image_out = create_visible_page_jpg(visible_image_out, page_context)
+            visible_image_out = create_visible_page_jpg(preprocess_out, page_context)
+        else:
+            visible_image_out = preprocess_out.file_for(
+                consumer_formats(options.intermediate_image_format, 'pdf')
+            )
         filtered_image = page_context.plugin_manager.hook.filter_page_image(
             page=page_context, image_filename=visible_image_out
         )
@@ -433,7 +575,7 @@ def process_page(page_context: PageContext) -> tuple[Path, Path | None, int]:
         pdf_page_from_image_out = create_pdf_page_from_image(
             visible_image_out, page_context, orientation_correction
         )
-    return ocr_image_out, pdf_page_from_image_out, orientation_correction
+    return pdf_page_from_image_out
 
 
 def postprocess(
@@ -448,16 +590,20 @@ def postprocess(
             pdf_out = fix_annots
         else:
             pdf_out = pdf_file
+    plugin_manager = context.plugin_manager
     if context.options.output_type.startswith('pdfa'):
-        ps_stub_out = generate_postscript_stub(context)
-        pdf_out = convert_to_pdfa(pdf_out, ps_stub_out, context)
+        with reported_stage(plugin_manager, 'pdfa'):
+            ps_stub_out = generate_postscript_stub(context)
+            pdf_out = convert_to_pdfa(pdf_out, ps_stub_out, context)
 
-    optimizing = context.plugin_manager.hook.is_optimization_enabled(context=context)
+    optimizing = plugin_manager.hook.is_optimization_enabled(context=context)
     save_settings = get_pdf_save_settings(context.options.output_type)
     save_settings['linearize'] = not optimizing and should_linearize(pdf_out, context)
 
-    pdf_out = metadata_fixup(pdf_out, context, pdf_save_settings=save_settings)
-    return optimize_pdf(pdf_out, context, executor)
+    with reported_stage(plugin_manager, 'metadata'):
+        pdf_out = metadata_fixup(pdf_out, context, pdf_save_settings=save_settings)
+    with reported_stage(plugin_manager, 'optimize'):
+        return optimize_pdf(pdf_out, context, executor)
 
 
 def report_output_pdf(options, start_input_file, optimize_messages) -> ExitCode:
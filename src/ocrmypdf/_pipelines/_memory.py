@@ -0,0 +1,114 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+"""Admit pages to processing while their estimated memory fits a budget."""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import logging
+import multiprocessing
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from ocrmypdf._jobcontext import PageContext
+from ocrmypdf._pipeline import estimate_page_memory
+from ocrmypdf.helpers import available_memory
+
+log = logging.getLogger(__name__)
+
+# Share of the available memory that pages may use when no budget is given; the
+# rest is left for the main process and everything else running
+AUTOMATIC_BUDGET_SHARE = 0.75
+
+
+class MemoryBudget:
+    """Bytes of memory that the pages being processed may use between them.
+
+    Page workers reserve a page's estimated memory before processing it, and
+    wait while the reservation does not fit in what is left of the budget. Large
+    pages are thus processed with less parallelism than small pages.
+
+    A budget made with ``use_threads=False`` may be passed to worker processes
+    when they are created, such as through a worker initializer.
+    """
+
+    def __init__(self, limit: int, *, use_threads: bool):
+        self.limit = limit
+        if use_threads:
+            self._condition = threading.Condition()
+            self._used = ctypes.c_int64(0)
+        else:
+            self._condition = multiprocessing.Condition()
+            self._used = multiprocessing.RawValue(ctypes.c_int64, 0)
+
+    @property
+    def used(self) -> int:
+        """Bytes currently reserved."""
+        return self._used.value
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        """Wait until ``nbytes`` fit in what is left of the budget, and hold them.
+
+        A reservation larger than the whole budget waits until nothing else is
+        reserved, and then holds the whole budget.
+        """
+        nbytes = min(nbytes, self.limit)
+        with self._condition:
+            self._condition.wait_for(lambda: self._used.value + nbytes <= self.limit)
+            self._used.value += nbytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._used.value -= nbytes
+                self._condition.notify_all()
+
+
+def page_memory_budget(options: argparse.Namespace) -> MemoryBudget | None:
+    """The memory budget for page workers, or None if there is no budget.
+
+    The budget is ``--max-memory`` if given, or else a share of the memory
+    available to the process, which accounts for container memory limits.
+    """
+    if options.max_memory is not None:
+        limit = options.max_memory * 1024**2
+    else:
+        available = available_memory()
+        limit = int(available * AUTOMATIC_BUDGET_SHARE) if available else 0
+    if not limit:
+        return None
+    log.debug("Page workers may use %d MB of memory", limit // 1024**2)
+    try:
+        return MemoryBudget(limit, use_threads=options.use_threads)
+    except (ImportError, OSError):
+        # Some platforms, like AWS Lambda, do not support process synchronization
+        log.debug("Cannot share a memory budget with page workers")
+        return None
+
+
+_worker_budget: MemoryBudget | None = None
+
+
+def set_worker_memory_budget(budget: MemoryBudget | None) -> None:
+    """Set the memory budget that pages processed by this worker reserve from."""
+    global _worker_budget  # pylint: disable=global-statement
+    _worker_budget = budget
+
+
+@contextmanager
+def page_memory_reserved(*page_contexts: PageContext) -> Iterator[None]:
+    """Reserve the estimated memory of pages from the worker's budget.
+
+    Pages that are processed together, such as a batch OCRed at once, are
+    reserved together.
+    """
+    if _worker_budget is None:
+        yield
+        return
+    nbytes = sum(estimate_page_memory(page_context) for page_context in page_contexts)
+    with _worker_budget.reserve(nbytes):
+        yield
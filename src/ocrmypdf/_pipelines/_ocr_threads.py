@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+"""Share CPU cores between Tesseract processes as the pages of a document finish."""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import logging
+import multiprocessing
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from ocrmypdf._exec import tesseract
+from ocrmypdf.helpers import clamp
+
+log = logging.getLogger(__name__)
+
+# As of Tesseract 4.1, 3 threads is the most effective on a 4 core/8 thread system
+MAX_TESSERACT_THREADS = 3
+
+
+class TesseractThreads:
+    """Decides how many threads each Tesseract process may use.
+
+    Performance testing shows we're better off parallelizing ocrmypdf and
+    forcing Tesseract to be single threaded. But once fewer pages remain than
+    there are jobs, the cores of the idle workers are better given to the
+    Tesseract processes of the remaining pages, subject to the constraint:
+    (Tesseract threads in use) <= jobs.
+
+    The count of unfinished pages and of threads in use is shared between
+    workers. An instance made with ``use_threads=False`` may be passed to worker
+    processes when they are created, such as through a worker initializer.
+    """
+
+    def __init__(self, jobs: int, pages: int, *, use_threads: bool):
+        self.jobs = jobs
+        if use_threads:
+            self._lock = threading.Lock()
+            self._pending = ctypes.c_int64(pages)
+            self._in_use = ctypes.c_int64(0)
+        else:
+            self._lock = multiprocessing.Lock()
+            self._pending = multiprocessing.RawValue(ctypes.c_int64, pages)
+            self._in_use = multiprocessing.RawValue(ctypes.c_int64, 0)
+
+    def page_finished(self) -> None:
+        """Count a page of the document as finished."""
+        with self._lock:
+            self._pending.value -= 1
+
+    @contextmanager
+    def allocate(self) -> Iterator[int]:
+        """Reserve threads for a Tesseract process, while it runs.
+
+        A process gets an even share of the jobs between the pages that are not
+        finished, but no more than the jobs that other Tesseract processes
+        leave free, and always at least one thread.
+        """
+        with self._lock:
+            share = self.jobs // max(self._pending.value, 1)
+            free = self.jobs - self._in_use.value
+            threads = clamp(min(share, free), 1, MAX_TESSERACT_THREADS)
+            self._in_use.value += threads
+        try:
+            yield threads
+        finally:
+            with self._lock:
+                self._in_use.value -= threads
+
+
+class FixedTesseractThreads(TesseractThreads):
+    """Gives every Tesseract process of a document the same number of threads.
+
+    An even share of the jobs between the pages of the document, from 1 to
+    ``MAX_TESSERACT_THREADS``. Nothing is shared between workers, so this is
+    used where :class:`TesseractThreads` cannot be.
+    """
+
+    def __init__(self, jobs: int, pages: int):
+        self.jobs = jobs
+        self.threads = clamp(jobs // max(pages, 1), 1, MAX_TESSERACT_THREADS)
+
+    def page_finished(self) -> None:
+        """Pages finishing do not change the number of threads."""
+
+    @contextmanager
+    def allocate(self) -> Iterator[int]:
+        """Give a Tesseract process the document's number of threads."""
+        yield self.threads
+
+
+def page_tesseract_threads(options: argparse.Namespace, pages: int) -> TesseractThreads:
+    """Allocator of Tesseract threads for the page workers of a document.
+
+    If counts cannot be shared with the page workers, each Tesseract process
+    gets a fixed share of the jobs instead.
+    """
+    try:
+        return TesseractThreads(options.jobs, pages, use_threads=options.use_threads)
+    except (ImportError, OSError):
+        # Some platforms, like AWS Lambda, do not support process synchronization
+        log.debug("Cannot share Tesseract thread counts with page workers")
+        return FixedTesseractThreads(options.jobs, pages)
+
+
+_worker_threads: TesseractThreads | None = None
+
+
+def set_worker_tesseract_threads(tesseract_threads: TesseractThreads | None) -> None:
+    """Set what allocates threads to Tesseract processes started by this worker."""
+    global _worker_threads  # pylint: disable=global-statement
+    _worker_threads = tesseract_threads
+
+
+@contextmanager
+def tesseract_threads_allocated() -> Iterator[None]:
+    """Limit the threads of Tesseract processes started in this block."""
+    if _worker_threads is None:
+        yield
+        return
+    with _worker_threads.allocate() as threads, tesseract.thread_limit(threads):
+        yield
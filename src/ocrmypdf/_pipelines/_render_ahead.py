@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+"""Render page images ahead of the page workers."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Collection, Iterator
+from pathlib import Path
+
+from ocrmypdf._exec import ghostscript
+from ocrmypdf._jobcontext import PageContext, PdfContext
+from ocrmypdf._pipeline import (
+    calculate_image_dpi,
+    get_canvas_square_dpi,
+    get_raster_device,
+)
+from ocrmypdf.helpers import Resolution
+
+log = logging.getLogger(__name__)
+
+# Seconds between checks for page images picked up by the page workers
+POLL_INTERVAL = 0.05
+
+
+def render_settings(page_context: PageContext) -> tuple[str, Resolution]:
+    """Ghostscript device and resolution the page will be rasterized with."""
+    return (
+        get_raster_device(page_context.pageinfo),
+        get_canvas_square_dpi(page_context, calculate_image_dpi(page_context)),
+    )
+
+
+def prerendered_page_image(page_context: PageContext) -> Path:
+    """The page image that :class:`RenderAhead` renders for this page."""
+    raster_device, raster_dpi = render_settings(page_context)
+    return ghostscript.prerendered_file(
+        page_context.get_path('rasterize.png'), raster_device, raster_dpi
+    )
+
+
+def discard_prerendered_page_image(page_context: PageContext) -> None:
+    """Delete the page image rendered ahead for this page, if it was not used.
+
+    Page workers must call this when they finish a page, since
+    :class:`RenderAhead` waits for its rendered images to be used up.
+    """
+    prerendered_page_image(page_context).unlink(missing_ok=True)
+
+
+class RenderAhead:
+    """Render page images in a background thread, ahead of the page workers.
+
+    Runs of consecutive pages that are rasterized with the same Ghostscript device
+    and resolution are rendered by one Ghostscript process, which interprets the
+    PDF's shared resources once per run instead of once per page. The page
+    workers pick up the images when they rasterize their page.
+
+    At most ``limit`` rendered images wait on disk at any time. Pages that could
+    not be rendered ahead are rendered by their page worker as usual. Pages in
+    ``skip``, such as those finished by an earlier run, are neither rendered nor
+    yielded.
+    """
+
+    def __init__(self, context: PdfContext, limit: int, skip: Collection[int] = ()):
+        self.context = context
+        self.limit = limit
+        self.skip = skip
+        self.rendered: list[Path] = []
+        self.settled = 0  # Pages, in order, that are rendered or will not be
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._render, name='render-ahead', daemon=True
+        )
+
+    def _runs(self) -> Iterator[tuple[str, Resolution, list[PageContext]]]:
+        run: list[PageContext] = []
+        settings = None
+        for page_context in self.context.get_page_contexts():
+            if page_context.pageno in self.skip:
+                if run:
+                    yield (*settings, run)
+                    run = []
+                continue
+            page_settings = render_settings(page_context)
+            if run and (page_settings != settings or len(run) >= self.limit):
+                yield (*settings, run)
+                run = []
+            settings = page_settings
+            run.append(page_context)
+        if run:
+            yield (*settings, run)
+
+    def _waiting(self) -> int:
+        self.rendered = [image for image in self.rendered if image.exists()]
+        return len(self.rendered)
+
+    def _settle(self, pages: int) -> None:
+        with self.condition:
+            self.settled = max(self.settled, pages)
+            self.condition.notify_all()
+
+    def _render(self) -> None:
+        try:
+            for raster_device, raster_dpi, run in self._runs():
+                while self._waiting() + len(run) > self.limit:
+                    if self.stopped.wait(POLL_INTERVAL):
+                        return
+                output_files = [
+                    page_context.get_path('rasterize.png') for page_context in run
+                ]
+                if ghostscript.rasterize_pdf_pages(
+                    self.context.origin,
+                    output_files,
+                    raster_device=raster_device,
+                    raster_dpi=raster_dpi,
+                    first_page=run[0].pageno + 1,
+                ):
+                    self.rendered.extend(
+                        ghostscript.prerendered_file(
+                            output_file, raster_device, raster_dpi
+                        )
+                        for output_file in output_files
+                    )
+                self._settle(run[-1].pageno + 1)
+        except Exception:  # pylint: disable=broad-except
+            log.debug("Rendering pages ahead failed", exc_info=True)
+        finally:
+            # Whatever happened, let the remaining pages render themselves
+            self._settle(len(self.context.pdfinfo))
+
+    def get_page_context_args(self) -> Iterator[tuple[PageContext]]:
+        """Like :meth:`PdfContext.get_page_context_args`, but paced by rendering.
+
+        Each page is yielded once its image has been rendered ahead, or once it is
+        clear that it will not be.
+        """
+        self.thread.start()
+        try:
+            for page_context in self.context.get_page_contexts():
+                if page_context.pageno in self.skip:
+                    continue
+                with self.condition:
+                    self.condition.wait_for(
+                        lambda n=page_context.pageno: self.settled > n
+                    )
+                yield (page_context,)
+        finally:
+            self.stopped.set()
@@ -0,0 +1,111 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+"""Limit how many pages are in each stage of the pipeline at once."""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from ocrmypdf._jobcontext import PageContext
+    from ocrmypdf._pipelines._common import PageResult
+
+log = logging.getLogger(__name__)
+
+
+class Stage(NamedTuple):
+    """One step that every page may go through."""
+
+    name: str
+    """Name of the stage."""
+
+    task: Callable[[PageContext, PageResult], PageResult]
+    """Does the stage's work on a page, given the page's result so far."""
+
+    applies: Callable[[PageResult], bool]
+    """Whether a page with this result so far needs the stage."""
+
+    share: float
+    """Share of the page workers that may be in the stage at once."""
+
+
+class StageLimits:
+    """How many pages may be in each stage at once, across all page workers.
+
+    A page worker waits to enter a stage while the stage is full, so workers
+    spread out over the stages instead of all rasterizing or all running OCR at
+    the same time.
+
+    Limits made with ``use_threads=False`` may be passed to worker processes when
+    they are created, such as through a worker initializer.
+    """
+
+    def __init__(self, stages: Sequence[Stage], max_workers: int, *, use_threads: bool):
+        if use_threads:
+            semaphore = threading.BoundedSemaphore
+        else:
+            semaphore = multiprocessing.BoundedSemaphore
+        self.limits = {
+            stage.name: max(1, int(max_workers * stage.share)) for stage in stages
+        }
+        self._slots = {name: semaphore(limit) for name, limit in self.limits.items()}
+
+    @contextmanager
+    def entered(self, name: str) -> Iterator[None]:
+        """Wait until the stage has room for another page, and hold its place."""
+        with self._slots[name]:
+            yield
+
+
+def page_stage_limits(
+    stages: Sequence[Stage], max_workers: int, *, use_threads: bool
+) -> StageLimits | None:
+    """The stage limits for page workers, or None if they cannot be shared."""
+    try:
+        return StageLimits(stages, max_workers, use_threads=use_threads)
+    except (ImportError, OSError):
+        # Some platforms, like AWS Lambda, do not support process synchronization
+        log.debug("Cannot share stage limits with page workers")
+        return None
+
+
+_worker_stage_limits: StageLimits | None = None
+
+
+def set_worker_stage_limits(stage_limits: StageLimits | None) -> None:
+    """Set the stage limits that pages processed by this worker observe."""
+    global _worker_stage_limits  # pylint: disable=global-statement
+    _worker_stage_limits = stage_limits
+
+
+def run_stages(
+    stages: Sequence[Stage], page_context: PageContext, result: PageResult
+) -> PageResult:
+    """Pass a page through each stage that applies to it, in order.
+
+    The page waits for room in each stage it enters, according to the worker's
+    stage limits, and holds its place in only one stage at a time.
+
+    Args:
+        stages: The stages, in the order pages go through them.
+        page_context: The page.
+        result: The page's result so far.
+
+    Returns:
+        The page's result after the last stage that applies to it.
+    """
+    for stage in stages:
+        if not stage.applies(result):
+            continue
+        if _worker_stage_limits is None:
+            result = stage.task(page_context, result)
+            continue
+        with _worker_stage_limits.entered(stage.name):
+            result = stage.task(page_context, result)
+    return result
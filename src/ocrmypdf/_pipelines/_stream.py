@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+"""Stream page images from Ghostscript into Tesseract, without a work file."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO
+
+from ocrmypdf._exec import ghostscript
+from ocrmypdf._jobcontext import PageContext
+from ocrmypdf._pipeline import (
+    calculate_image_dpi,
+    calculate_raster_dpi,
+    get_canvas_square_dpi,
+    get_page_square_dpi,
+    get_raster_device,
+)
+
+log = logging.getLogger(__name__)
+
+GHOSTSCRIPT_PLUGIN = 'ocrmypdf.builtin_plugins.ghostscript'
+TESSERACT_PLUGIN = 'ocrmypdf.builtin_plugins.tesseract_ocr'
+
+
+def _only_builtin(hook, plugin_name: str) -> bool:
+    """Whether every implementation of a hook is the one in a builtin plugin."""
+    return all(impl.plugin_name == plugin_name for impl in hook.get_hookimpls())
+
+
+def can_stream_page(page_context: PageContext) -> bool:
+    """Whether the page image may be piped from Ghostscript into Tesseract.
+
+    That is possible when Ghostscript's image is only read by Tesseract: no
+    image is made for the visible page, nothing preprocesses or rotates the
+    image, no text areas need to be blanked out for OCR, and Ghostscript and
+    the Tesseract program are used as is, rather than through another plugin.
+    """
+    options = page_context.options
+    pageinfo = page_context.pageinfo
+    plugin_manager = page_context.plugin_manager
+
+    if not options.lossless_reconstruction or options.tesseract_timeout <= 0:
+        return False
+    if any(
+        (
+            options.rotate_pages,
+            options.deskew,
+            options.clean,
+            options.remove_background,
+            options.remove_vectors,
+            options.tesseract_downsample_large_images,
+            # Pages are rendered ahead or by a render server to a file already
+            options.render_ahead,
+            options.render_server,
+        )
+    ):
+        return False
+    if not options.force_ocr and any(
+        pageinfo.get_textareas(visible=True if options.redo_ocr else None)
+    ):
+        return False  # create_ocr_image blanks these out
+
+    # Tesseract reads the resolution Ghostscript writes in the image, which is
+    # only right when PDF UserUnit scaling does not apply
+    image_dpi = calculate_image_dpi(page_context)
+    if get_canvas_square_dpi(page_context, image_dpi) != get_page_square_dpi(
+        page_context, image_dpi
+    ):
+        return False
+
+    hook = plugin_manager.hook
+    if not _only_builtin(hook.rasterize_pdf_page, GHOSTSCRIPT_PLUGIN):
+        return False
+    if not _only_builtin(hook.filter_ocr_image, TESSERACT_PLUGIN):
+        return False
+    # pylint: disable=import-outside-toplevel
+    # Plugins import ocrmypdf, so they cannot be imported while it is loading
+    from ocrmypdf.builtin_plugins.tesseract_ocr import TesseractOcrEngine
+    from ocrmypdf.builtin_plugins.tesserocr_ocr import TesserocrOcrEngine
+
+    ocr_engine = hook.get_ocr_engine()
+    return (
+        type(ocr_engine) in (TesseractOcrEngine, TesserocrOcrEngine)
+        and options.tesseract_backend == 'cli'
+    )
+
+
+@contextmanager
+def streamed_page_image(page_context: PageContext) -> Iterator[IO[bytes]]:
+    """Rasterize the page into a pipe, for the OCR engine to read.
+
+    Raises:
+        SubprocessOutputError: If Ghostscript failed, once the OCR engine is
+            done. The page should then be processed with work files, which
+            reports the error properly.
+    """
+    canvas_dpi, _page_dpi = calculate_raster_dpi(page_context)
+    log.debug("Streaming page image from Ghostscript to the OCR engine")
+    with ghostscript.rasterize_pdf_to_pipe(
+        page_context.origin,
+        raster_device=get_raster_device(page_context.pageinfo),
+        raster_dpi=canvas_dpi,
+        pageno=page_context.pageinfo.pageno + 1,
+        stop_on_error=not page_context.options.continue_on_soft_render_error,
+    ) as image_stream:
+        yield image_stream
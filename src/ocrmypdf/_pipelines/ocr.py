@@ -9,12 +9,16 @@ from __future__ import annotations
 import argparse
 import logging
 import logging.handlers
-from collections.abc import Sequence
+from collections.abc import Iterable, Iterator, Sequence
 from functools import partial
+from itertools import islice
+from math import ceil
 from pathlib import Path
 from tempfile import mkdtemp
+from typing import IO
 
 import PIL
+from PIL import Image
 
 from ocrmypdf._concurrent import Executor
 from ocrmypdf._graft import OcrGrafter
@@ -24,45 +28,67 @@ from ocrmypdf._pipeline import (
     is_ocr_required,
     merge_sidecars,
     ocr_engine_hocr,
+    ocr_engine_hocr_batch,
     ocr_engine_textonly_pdf,
     render_hocr_page,
     triage,
     validate_pdfinfo_options,
 )
+from ocrmypdf._pipelines._checkpoint import Checkpoint, checkpoint_work_folder
 from ocrmypdf._pipelines._common import (
     PageResult,
     cli_exception_handler,
+    costliest_pages_first,
     do_get_pdfinfo,
     manage_debug_log_handler,
     manage_work_folder,
     postprocess,
     process_page,
     report_output_pdf,
+    report_page_timings,
+    reported_stage,
     set_thread_pageno,
     setup_pipeline,
+    timed_stage,
     worker_init,
 )
+from ocrmypdf._pipelines._memory import page_memory_budget, page_memory_reserved
+from ocrmypdf._pipelines._ocr_threads import (
+    page_tesseract_threads,
+    tesseract_threads_allocated,
+)
+from ocrmypdf._pipelines._render_ahead import (
+    RenderAhead,
+    discard_prerendered_page_image,
+)
+from ocrmypdf._pipelines._stages import Stage, page_stage_limits, run_stages
+from ocrmypdf._pipelines._stream import can_stream_page, streamed_page_image
 from ocrmypdf._plugin_manager import OcrmypdfPluginManager
 from ocrmypdf._progressbar import ProgressBar
 from ocrmypdf._validation import (
     check_requested_output_file,
     create_input_file,
 )
-from ocrmypdf.exceptions import ExitCode
+from ocrmypdf.exceptions import ExitCode, SubprocessOutputError
 
 log = logging.getLogger(__name__)
 
 
 def _image_to_ocr_text(
-    page_context: PageContext, ocr_image_out: Path
+    page_context: PageContext, ocr_image_out: Path | IO[bytes]
 ) -> tuple[Path, Path]:
-    """Run OCR engine on image to create OCR PDF and text file."""
+    """Run OCR engine on image to create OCR PDF and text file.
+
+    The image may be a stream if the OCR engine is Tesseract.
+    """
     options = page_context.options
     if options.pdf_renderer.startswith('hocr'):
-        hocr_out, text_out = ocr_engine_hocr(ocr_image_out, page_context)
+        with tesseract_threads_allocated():
+            hocr_out, text_out = ocr_engine_hocr(ocr_image_out, page_context)
         ocr_out = render_hocr_page(hocr_out, page_context)
     elif options.pdf_renderer == 'sandwich':
-        ocr_out, text_out = ocr_engine_textonly_pdf(ocr_image_out, page_context)
+        with tesseract_threads_allocated():
+            ocr_out, text_out = ocr_engine_textonly_pdf(ocr_image_out, page_context)
     else:
         raise NotImplementedError(f"pdf_renderer {options.pdf_renderer}")
     return ocr_out, text_out
@@ -70,64 +96,377 @@ def _image_to_ocr_text(
 
 def _exec_page_sync(page_context: PageContext) -> PageResult:
     """Execute a pipeline for a single page synchronously."""
+    try:
+        with page_memory_reserved(page_context):
+            return _exec_page(page_context)
+    finally:
+        if page_context.options.render_ahead:
+            discard_prerendered_page_image(page_context)
+
+
+def _exec_page(page_context: PageContext) -> PageResult:
     set_thread_pageno(page_context.pageno + 1)
 
     if not is_ocr_required(page_context):
         return PageResult(pageno=page_context.pageno)
 
+    timings: dict[str, float] = {}
+    if can_stream_page(page_context):
+        try:
+            with (
+                timed_stage(timings, 'ocr'),
+                streamed_page_image(page_context) as image_stream,
+            ):
+                ocr_out, text_out = _image_to_ocr_text(page_context, image_stream)
+        except SubprocessOutputError:
+            log.debug("Streaming the page image failed; using work files")
+            timings.clear()
+        else:
+            return PageResult(
+                pageno=page_context.pageno,
+                ocr=ocr_out,
+                text=text_out,
+                timings=timings,
+            )
+
     ocr_image_out, pdf_page_from_image_out, orientation_correction = process_page(
-        page_context
+        page_context, timings
     )
-    ocr_out, text_out = _image_to_ocr_text(page_context, ocr_image_out)
+    with timed_stage(timings, 'ocr'):
+        ocr_out, text_out = _image_to_ocr_text(page_context, ocr_image_out)
     return PageResult(
         pageno=page_context.pageno,
         pdf_page_from_image=pdf_page_from_image_out,
         ocr=ocr_out,
         text=text_out,
         orientation_correction=orientation_correction,
+        timings=timings,
+    )
+
+
+def _exec_page_prepare(page_context: PageContext) -> PageResult:
+    """Prepare a page for batched OCR, doing everything but the OCR itself.
+
+    The caller reserves the page's memory, since it is needed until the page's
+    batch is OCRed.
+    """
+    try:
+        return _prepare_page(page_context)
+    finally:
+        if page_context.options.render_ahead:
+            discard_prerendered_page_image(page_context)
+
+
+def _prepare_page(page_context: PageContext) -> PageResult:
+    set_thread_pageno(page_context.pageno + 1)
+
+    if not is_ocr_required(page_context):
+        return PageResult(pageno=page_context.pageno)
+
+    timings: dict[str, float] = {}
+    ocr_image_out, pdf_page_from_image_out, orientation_correction = process_page(
+        page_context, timings
+    )
+    return PageResult(
+        pageno=page_context.pageno,
+        pdf_page_from_image=pdf_page_from_image_out,
+        orientation_correction=orientation_correction,
+        timings=timings,
+        ocr_image=ocr_image_out,
+    )
+
+
+def _exec_ocr_batch(
+    batch: Sequence[tuple[PageContext, PageResult]],
+) -> list[PageResult]:
+    """OCR a batch of prepared pages with one call to the OCR engine."""
+    page_contexts = [page_context for page_context, _ in batch]
+    set_thread_pageno(page_contexts[0].pageno + 1)
+
+    batch_timings: dict[str, float] = {}
+    with timed_stage(batch_timings, 'ocr'), tesseract_threads_allocated():
+        outputs = ocr_engine_hocr_batch(
+            [prepared.ocr_image for _, prepared in batch], page_contexts
+        )
+    # Share the time spent on the batch evenly between its pages
+    ocr_seconds = batch_timings.get('ocr', 0.0) / len(batch)
+
+    results = []
+    for (page_context, prepared), (hocr_out, text_out) in zip(batch, outputs):
+        set_thread_pageno(page_context.pageno + 1)
+        timings = dict(prepared.timings or {})
+        timings['ocr'] = timings.get('ocr', 0.0) + ocr_seconds
+        with timed_stage(timings, 'ocr'):
+            ocr_out = render_hocr_page(hocr_out, page_context)
+        results.append(
+            prepared._replace(
+                ocr=ocr_out, text=text_out, timings=timings, ocr_image=None
+            )
+        )
+    return results
+
+
+def _stage_image(page_context: PageContext, result: PageResult) -> PageResult:
+    """Stage that rasterizes, orients and preprocesses a page."""
+    del result  # The first stage
+    try:
+        return _prepare_page(page_context)
+    finally:
+        if page_context.options.render_ahead:
+            discard_prerendered_page_image(page_context)
+
+
+def _stage_ocr(page_context: PageContext, prepared: PageResult) -> PageResult:
+    """Stage that runs the OCR engine on a prepared page image."""
+    set_thread_pageno(page_context.pageno + 1)
+    assert prepared.ocr_image is not None
+    timings = dict(prepared.timings or {})
+    hocr_out = ocr_out = None
+    with timed_stage(timings, 'ocr'), tesseract_threads_allocated():
+        if page_context.options.pdf_renderer.startswith('hocr'):
+            hocr_out, text_out = ocr_engine_hocr(prepared.ocr_image, page_context)
+        else:
+            ocr_out, text_out = ocr_engine_textonly_pdf(
+                prepared.ocr_image, page_context
+            )
+    return prepared._replace(
+        ocr_image=None, hocr=hocr_out, ocr=ocr_out, text=text_out, timings=timings
     )
 
 
-def exec_concurrent(context: PdfContext, executor: Executor) -> Sequence[str]:
-    """Execute the OCR pipeline concurrently."""
+def _stage_text(page_context: PageContext, result: PageResult) -> PageResult:
+    """Stage that renders the text layer of a page from its hOCR."""
+    set_thread_pageno(page_context.pageno + 1)
+    assert result.hocr is not None
+    timings = dict(result.timings or {})
+    with timed_stage(timings, 'ocr'):
+        ocr_out = render_hocr_page(result.hocr, page_context)
+    return result._replace(hocr=None, ocr=ocr_out, timings=timings)
+
+
+# The stages of the OCR pipeline, for ``--scheduler stage``. OCR is usually the
+# slowest stage, so every page worker may be in it, and fewer in the others.
+PAGE_STAGES = [
+    Stage('image', _stage_image, lambda result: True, 0.5),
+    Stage('ocr', _stage_ocr, lambda result: result.ocr_image is not None, 1.0),
+    Stage('text', _stage_text, lambda result: result.hocr is not None, 0.25),
+]
+
+
+def _exec_page_staged(page_context: PageContext) -> PageResult:
+    """Pass a page through the stages of the OCR pipeline.
+
+    The page's estimated memory is held until OCR is done, since its image waits
+    between the image and OCR stages.
+    """
+    result = PageResult(pageno=page_context.pageno)
+    with page_memory_reserved(page_context):
+        result = run_stages(PAGE_STAGES[:2], page_context, result)
+    return run_stages(PAGE_STAGES[2:], page_context, result)
+
+
+# Pixels in a US Letter page at 300 dpi, the page size a batch size is scaled to
+BATCH_PAGE_PIXELS = 2550 * 3300
+
+
+def _ocr_batches(
+    ready: Sequence[tuple[PageContext, PageResult]], batch_size: int
+) -> list[list[tuple[PageContext, PageResult]]]:
+    """Group pages that are ready for OCR into batches.
+
+    A batch holds at most ``batch_size`` pages, and fewer if its pages are larger
+    than a US Letter page at 300 dpi, so that the memory and time taken by a batch
+    does not grow with page size.
+    """
+    max_pixels = batch_size * BATCH_PAGE_PIXELS
+
+    batches: list[list[tuple[PageContext, PageResult]]] = []
+    batch: list[tuple[PageContext, PageResult]] = []
+    pixels = 0
+    for page_context, result in ready:
+        with Image.open(result.ocr_image) as im:
+            page_pixels = im.width * im.height
+        if batch and (len(batch) >= batch_size or pixels + page_pixels > max_pixels):
+            batches.append(batch)
+            batch, pixels = [], 0
+        batch.append((page_context, result))
+        pixels += page_pixels
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _exec_page_group(page_contexts: Sequence[PageContext]) -> list[PageResult]:
+    """Prepare a group of pages, then OCR them in batches.
+
+    Each worker OCRs its pages as soon as it has prepared them, so OCR starts
+    while other workers are still preparing pages, and only the images of the
+    groups being worked on wait in the temporary folder. The memory of the whole
+    group is reserved until its batches are OCRed.
+    """
+    results: list[PageResult] = []
+    ready: list[tuple[PageContext, PageResult]] = []
+    with page_memory_reserved(*page_contexts):
+        for page_context in page_contexts:
+            result = _exec_page_prepare(page_context)
+            if result.ocr_image is None:
+                results.append(result)
+            else:
+                ready.append((page_context, result))
+        for batch in _ocr_batches(ready, len(page_contexts)):
+            results.extend(_exec_ocr_batch(batch))
+    return results
+
+
+def _page_groups(
+    page_context_args: Iterable[tuple[PageContext]], group_size: int
+) -> Iterator[tuple[list[PageContext]]]:
+    """Group consecutive pages, taking pages only as each group is needed."""
+    page_contexts = (page_context for (page_context,) in page_context_args)
+    while group := list(islice(page_contexts, group_size)):
+        yield (group,)
+
+
+def exec_concurrent(
+    context: PdfContext, executor: Executor, checkpoint: Checkpoint | None = None
+) -> Sequence[str]:
+    """Execute the OCR pipeline concurrently.
+
+    Pages that the checkpoint records as finished are grafted without being
+    processed again, and pages finished now are recorded in it.
+    """
     options = context.options
+    finished = dict(checkpoint.finished) if checkpoint else {}
+    pages = len(context.pdfinfo) - len(finished)
     max_workers = min(len(context.pdfinfo), options.jobs)
+    if finished:
+        log.info(
+            "Resuming from checkpoint: %d of %d pages are finished",
+            len(finished),
+            len(context.pdfinfo),
+        )
     if max_workers > 1:
         log.info("Start processing %d pages concurrently", max_workers)
 
     sidecars: list[Path | None] = [None] * len(context.pdfinfo)
     ocrgraft = OcrGrafter(context)
 
-    def update_page(result: PageResult, pbar: ProgressBar):
-        """After OCR is complete for a page, update the PDF."""
-        try:
-            set_thread_pageno(result.pageno + 1)
-            sidecars[result.pageno] = result.text
-            pbar.update(0.5)
+    if options.render_ahead:
+        # Rendering ahead works on runs of consecutive pages, so keep page order
+        page_context_args = RenderAhead(
+            context, options.render_ahead, skip=finished
+        ).get_page_context_args()
+    else:
+        page_context_args = [
+            (page_context,)
+            for (page_context,) in costliest_pages_first(context)
+            if page_context.pageno not in finished
+        ]
+    # Workers wait to start a page until its estimated memory fits the budget, and
+    # give Tesseract more threads as fewer pages remain
+    tesseract_threads = page_tesseract_threads(options, pages)
+    page_worker_init = partial(
+        worker_init,
+        PIL.Image.MAX_IMAGE_PIXELS,
+        page_memory_budget(options),
+        tesseract_threads,
+    )
+
+    def graft_page(result: PageResult):
+        sidecars[result.pageno] = result.text
+        with reported_stage(context.plugin_manager, 'graft', result.pageno):
             ocrgraft.graft_page(
                 pageno=result.pageno,
                 image=result.pdf_page_from_image,
                 textpdf=result.ocr,
                 autorotate_correction=result.orientation_correction,
             )
+
+    def update_page(result: PageResult, pbar: ProgressBar):
+        """After OCR is complete for a page, update the PDF."""
+        try:
+            set_thread_pageno(result.pageno + 1)
+            if tesseract_threads:
+                tesseract_threads.page_finished()
+            if result.timings:
+                report_page_timings(
+                    context.plugin_manager, result.pageno, result.timings
+                )
+            pbar.update(0.5)
+            graft_page(result)
+            if checkpoint:
+                checkpoint.page_finished(result)
             pbar.update(0.5)
         finally:
             set_thread_pageno(None)
 
-    executor(
-        use_threads=options.use_threads,
-        max_workers=max_workers,
-        progress_kwargs=dict(
-            total=len(context.pdfinfo),
-            desc='OCR' if options.tesseract_timeout > 0 else 'Image processing',
-            unit='page',
-            disable=not options.progress_bar,
-        ),
-        worker_initializer=partial(worker_init, PIL.Image.MAX_IMAGE_PIXELS),
-        task=_exec_page_sync,
-        task_arguments=context.get_page_context_args(),
-        task_finished=update_page,
-    )
+    for pageno in sorted(finished):
+        set_thread_pageno(pageno + 1)
+        graft_page(finished[pageno])
+    set_thread_pageno(None)
+
+    if options.scheduler == 'stage':
+        # Each worker passes its page through the stages, but only some workers
+        # may be in each stage at once, so some pages are rasterized while others
+        # are OCRed
+        executor(
+            use_threads=options.use_threads,
+            max_workers=max_workers,
+            progress_kwargs=dict(
+                total=pages,
+                desc='OCR',
+                unit='page',
+                disable=not options.progress_bar,
+            ),
+            worker_initializer=partial(
+                page_worker_init,
+                stage_limits=page_stage_limits(
+                    PAGE_STAGES, max_workers, use_threads=options.use_threads
+                ),
+            ),
+            task=_exec_page_staged,
+            task_arguments=page_context_args,
+            task_finished=update_page,
+        )
+    elif options.tesseract_batch_size > 1 and options.pdf_renderer.startswith('hocr'):
+        # Each worker prepares a group of pages, then OCRs them in batches so the
+        # OCR engine starts once per batch instead of once per page. Groups are
+        # kept small enough that every worker gets one.
+        group_size = min(options.tesseract_batch_size, ceil(pages / max_workers))
+
+        def group_finished(results: list[PageResult], pbar: ProgressBar):
+            for result in results:
+                update_page(result, pbar)
+
+        executor(
+            use_threads=options.use_threads,
+            max_workers=max_workers,
+            progress_kwargs=dict(
+                total=pages,
+                desc='OCR',
+                unit='page',
+                disable=not options.progress_bar,
+            ),
+            worker_initializer=page_worker_init,
+            task=_exec_page_group,
+            task_arguments=_page_groups(page_context_args, max(1, group_size)),
+            task_finished=group_finished,
+        )
+    else:
+        executor(
+            use_threads=options.use_threads,
+            max_workers=max_workers,
+            progress_kwargs=dict(
+                total=pages,
+                desc='OCR' if options.tesseract_timeout > 0 else 'Image processing',
+                unit='page',
+                disable=not options.progress_bar,
+            ),
+            worker_initializer=page_worker_init,
+            task=_exec_page_sync,
+            task_arguments=page_context_args,
+            task_finished=update_page,
+        )
 
     # Output sidecar text
     if options.sidecar:
@@ -136,7 +475,8 @@ def exec_concurrent(context: PdfContext, executor: Executor) -> Sequence[str]:
         copy_final(text, options.sidecar, options.input_file)
 
     # Merge layers to one single pdf
-    pdf = ocrgraft.finalize()
+    with reported_stage(context.plugin_manager, 'graft_finalize'):
+        pdf = ocrgraft.finalize()
 
     messages: Sequence[str] = []
     if options.output_type != 'none':
@@ -153,32 +493,47 @@ def _run_pipeline(
     options: argparse.Namespace,
     plugin_manager: OcrmypdfPluginManager,
 ) -> ExitCode:
+    if options.checkpoint_folder:
+        # A durable work folder, kept if the run fails so that it can be resumed
+        work_folder = checkpoint_work_folder(Path(options.checkpoint_folder))
+        # The input file from the run being resumed, if it was copied
+        (work_folder / 'origin').unlink(missing_ok=True)
+    else:
+        work_folder = Path(mkdtemp(prefix="ocrmypdf.io."))
     with (
         manage_work_folder(
-            work_folder=Path(mkdtemp(prefix="ocrmypdf.io.")),
+            work_folder=work_folder,
             retain=options.keep_temporary_files,
             print_location=options.keep_temporary_files,
+            retain_on_error=bool(options.checkpoint_folder),
         ) as work_folder,
         manage_debug_log_handler(options=options, work_folder=work_folder),
     ):
         executor = setup_pipeline(options, plugin_manager)
         check_requested_output_file(options)
         start_input_file, original_filename = create_input_file(options, work_folder)
+        checkpoint = None
+        if options.checkpoint_folder:
+            checkpoint = Checkpoint.resume(
+                work_folder, start_input_file, options, keep={start_input_file.name}
+            )
 
         # Triage image or pdf
-        origin_pdf = triage(
-            original_filename, start_input_file, work_folder / 'origin.pdf', options
-        )
+        with reported_stage(plugin_manager, 'triage'):
+            origin_pdf = triage(
+                original_filename, start_input_file, work_folder / 'origin.pdf', options
+            )
 
         # Gather pdfinfo and create context
-        pdfinfo = do_get_pdfinfo(origin_pdf, executor, options)
+        with reported_stage(plugin_manager, 'pdfinfo'):
+            pdfinfo = do_get_pdfinfo(origin_pdf, executor, options)
         context = PdfContext(options, work_folder, origin_pdf, pdfinfo, plugin_manager)
 
         # Validate options are okay for this pdf
         validate_pdfinfo_options(context)
 
         # Execute the pipeline
-        optimize_messages = exec_concurrent(context, executor)
+        optimize_messages = exec_concurrent(context, executor, checkpoint)
 
         exitcode = report_output_pdf(options, start_input_file, optimize_messages)
         return exitcode
@@ -23,6 +23,7 @@ from ocrmypdf._pipeline import (
 )
 from ocrmypdf._pipelines._common import (
     HOCRResult,
+    costliest_pages_first,
     do_get_pdfinfo,
     manage_work_folder,
     process_page,
@@ -30,7 +31,13 @@ from ocrmypdf._pipelines._common import (
     setup_pipeline,
     worker_init,
 )
+from ocrmypdf._pipelines._memory import page_memory_budget, page_memory_reserved
+from ocrmypdf._pipelines._ocr_threads import (
+    page_tesseract_threads,
+    tesseract_threads_allocated,
+)
 from ocrmypdf._plugin_manager import OcrmypdfPluginManager
+from ocrmypdf._progressbar import ProgressBar
 from ocrmypdf._validation import (
     set_lossless_reconstruction,
 )
@@ -45,10 +52,12 @@ def _exec_page_hocr_sync(page_context: PageContext) -> HOCRResult:
     if not is_ocr_required(page_context):
         return HOCRResult(pageno=page_context.pageno)
 
-    ocr_image_out, pdf_page_from_image_out, orientation_correction = process_page(
-        page_context
-    )
-    hocr_out, _ = ocr_engine_hocr(ocr_image_out, page_context)
+    with page_memory_reserved(page_context):
+        ocr_image_out, pdf_page_from_image_out, orientation_correction = process_page(
+            page_context
+        )
+        with tesseract_threads_allocated():
+            hocr_out, _ = ocr_engine_hocr(ocr_image_out, page_context)
 
     result = HOCRResult(
         pageno=page_context.pageno,
@@ -68,6 +77,13 @@ def exec_pdf_to_hocr(context: PdfContext, executor: Executor) -> None:
     if max_workers > 1:
         log.info("Start processing %d pages concurrently", max_workers)
 
+    tesseract_threads = page_tesseract_threads(options, len(context.pdfinfo))
+
+    def page_finished(result: HOCRResult, pbar: ProgressBar):
+        del result, pbar  # The result is saved by the worker
+        if tesseract_threads:
+            tesseract_threads.page_finished()
+
     executor(
         use_threads=options.use_threads,
         max_workers=max_workers,
@@ -78,9 +94,15 @@ def exec_pdf_to_hocr(context: PdfContext, executor: Executor) -> None:
             unit_scale=0.5,
             disable=not options.progress_bar,
         ),
-        worker_initializer=partial(worker_init, PIL.Image.MAX_IMAGE_PIXELS),
+        worker_initializer=partial(
+            worker_init,
+            PIL.Image.MAX_IMAGE_PIXELS,
+            page_memory_budget(options),
+            tesseract_threads,
+        ),
         task=_exec_page_hocr_sync,
-        task_arguments=context.get_page_context_args(),
+        task_arguments=costliest_pages_first(context),
+        task_finished=page_finished,
     )
 
 
@@ -135,6 +135,10 @@ def check_options_preprocessing(options: Namespace) -> None:
         and not options.rotate_pages
     ):
         raise BadArgsError("--rotate-pages is required for --rotate-pages-threshold")
+    if options.rotate_pages_single_render and not options.rotate_pages:
+        raise BadArgsError(
+            "--rotate-pages is required for --rotate-pages-single-render"
+        )
     if options.clean:
         check_external_program(
             program='unpaper',
@@ -238,6 +238,9 @@ def ocr(  # noqa: D417
     sidecar: PathOrIO | None = None,
     jobs: int | None = None,
     use_threads: bool | None = None,
+    scheduler: str | None = None,
+    max_memory: int | None = None,
+    checkpoint_folder: os.PathLike | None = None,
     title: str | None = None,
     author: str | None = None,
     subject: str | None = None,
@@ -267,13 +270,19 @@ def ocr(  # noqa: D417
     tesseract_oem: int | None = None,
     tesseract_thresholding: int | None = None,
     pdf_renderer: str | None = None,
+    intermediate_image_format: str | None = None,
     tesseract_timeout: float | None = None,
     tesseract_non_ocr_timeout: float | None = None,
     tesseract_downsample_above: int | None = None,
     tesseract_downsample_large_images: bool | None = None,
+    tesseract_batch_size: int | None = None,
+    tesseract_backend: str | None = None,
     rotate_pages_threshold: float | None = None,
+    rotate_pages_single_render: bool | None = None,
     pdfa_image_compression: str | None = None,
     color_conversion_strategy: str | None = None,
+    render_ahead: int | None = None,
+    render_server: int | None = None,
     user_words: os.PathLike | None = None,
     user_patterns: os.PathLike | None = None,
     fast_web_view: float | None = None,
@@ -357,7 +366,7 @@ def ocr(  # noqa: D417
     create_options_kwargs = {
         k: v
         for k, v in locals().items()
-        if k not in {'input_file', 'output_file', 'kwargs'}
+        if k not in {'input_file', 'output_file', 'kwargs', 'plugin_manager'}
     }
     create_options_kwargs.update(kwargs)
 
@@ -388,6 +397,7 @@ def _pdf_to_hocr(  # noqa: D417
     image_dpi: int | None = None,
     jobs: int | None = None,
     use_threads: bool | None = None,
+    max_memory: int | None = None,
     title: str | None = None,
     author: str | None = None,
     subject: str | None = None,
@@ -415,6 +425,7 @@ def _pdf_to_hocr(  # noqa: D417
     tesseract_downsample_above: int | None = None,
     tesseract_downsample_large_images: bool | None = None,
     rotate_pages_threshold: float | None = None,
+    rotate_pages_single_render: bool | None = None,
     user_words: os.PathLike | None = None,
     user_patterns: os.PathLike | None = None,
     continue_on_soft_render_error: bool | None = None,
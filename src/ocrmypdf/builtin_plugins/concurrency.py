@@ -13,8 +13,14 @@ import signal
 import sys
 import threading
 from collections.abc import Callable, Iterable
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from contextlib import suppress
+from itertools import islice
 from typing import Union
 
 from rich.console import Console as RichConsole
@@ -32,6 +38,10 @@ Queue = Union[multiprocessing.Queue, queue.Queue]  # noqa: UP007
 UserInit = Callable[[], None]
 WorkerInit = Callable[[Queue, UserInit, int], None]
 
+# Tasks submitted to the pool for each worker at any time, so that every worker
+# has its next task queued while its last result is collected
+TASKS_IN_FLIGHT_PER_WORKER = 3
+
 
 def log_listener(q: Queue):
     """Listen to the worker processes and forward the messages to logging.
@@ -138,11 +148,24 @@ class StandardExecutor(Executor):
                 initargs=(log_queue, worker_initializer, logging.getLogger("").level),
             ) as executor,
         ):
-            futures = [executor.submit(task, *args) for args in task_arguments]
+            # Submit tasks in a bounded window rather than all at once, so that
+            # memory for pending tasks and their futures does not grow with the
+            # number of tasks, and cancellation takes effect promptly
+            pending_arguments = iter(task_arguments)
+            futures = set()
+
+            def submit(count: int) -> None:
+                for args in islice(pending_arguments, count):
+                    futures.add(executor.submit(task, *args))
+
             try:
-                for future in as_completed(futures):
-                    result = future.result()
-                    task_finished(result, pbar)
+                submit(max_workers * TASKS_IN_FLIGHT_PER_WORKER)
+                while futures:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    submit(len(done))
+                    for future in done:
+                        result = future.result()
+                        task_finished(result, pbar)
             except KeyboardInterrupt:
                 # Terminate pool so we exit instantly
                 executor.shutdown(wait=False, cancel_futures=True)
@@ -10,6 +10,7 @@ from packaging.version import Version
 
 from ocrmypdf import hookimpl
 from ocrmypdf._exec import ghostscript
+from ocrmypdf.cli import numeric
 from ocrmypdf.exceptions import MissingDependencyError
 from ocrmypdf.subprocess import check_external_program
 
@@ -46,6 +47,32 @@ def add_options(parser):
         "preserves the original compression of all images.",
     )
 
+    gs.add_argument(
+        '--render-ahead',
+        action='store',
+        type=numeric(int, 0),
+        default=0,
+        metavar='PAGES',
+        help="Render page images ahead of the page workers, with one Ghostscript "
+        "process for each run of consecutive pages that are rendered the same "
+        "way. This avoids interpreting the PDF's shared resources, such as fonts, "
+        "again for every page, which helps with large documents. At most this "
+        "many rendered pages wait on disk at a time. 0 (the default) renders "
+        "each page in its own Ghostscript process.",
+    )
+    gs.add_argument(
+        '--render-server',
+        action='store',
+        type=numeric(int, 0),
+        default=0,
+        metavar='PAGES',
+        help="Rasterize pages with long-lived Ghostscript processes, each of which "
+        "renders up to this many pages before it is replaced, so that pages do "
+        "not pay for starting Ghostscript. A process that fails is replaced "
+        "immediately and the page is rendered as usual. 0 (the default) starts "
+        "a Ghostscript process for each page.",
+    )
+
 
 @hookimpl
 def check_options(options):
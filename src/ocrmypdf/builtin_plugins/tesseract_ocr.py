@@ -121,6 +121,31 @@ def add_options(parser):
             "usually larger."
         ),
     )
+    tess.add_argument(
+        '--tesseract-backend',
+        choices=['cli', 'library'],
+        default='cli',
+        help=(
+            "How to run Tesseract. 'cli' runs the tesseract program for each page. "
+            "'library' calls libtesseract in-process through the optional tesserocr "
+            "package, so that language models stay loaded between pages. If "
+            "tesserocr is not installed, 'cli' is used instead."
+        ),
+    )
+    tess.add_argument(
+        '--tesseract-batch-size',
+        action='store',
+        type=numeric(int, 1, 64),
+        default=1,
+        metavar='PAGES',
+        help=(
+            "OCR up to this many pages with each Tesseract process, so that "
+            "Tesseract loads its language models once per batch instead of once "
+            "per page. This saves time on short pages, especially with several "
+            "languages. Large pages are put in smaller batches. Only used with "
+            "the hOCR renderer. By default each page is OCRed by its own process."
+        ),
+    )
     tess.add_argument(
         '--user-words',
         metavar='FILE',
@@ -166,6 +191,10 @@ def check_options(options):
             "thresholding method. The --tesseract-threshold argument will be "
             "ignored."
         )
+    if options.tesseract_batch_size > 1 and options.scheduler == 'stage':
+        raise BadArgsError(
+            "--tesseract-batch-size cannot be used with --scheduler stage"
+        )
     if options.tesseract_pagesegmode in (0, 2):
         log.warning(
             "The --tesseract-pagesegmode argument you select will disable OCR. "
@@ -185,18 +214,21 @@ def check_options(options):
 def validate(pdfinfo, options):
     # Tesseract 4.x can be multithreaded, and we also run multiple workers. We want
     # to manage how many threads it uses to avoid creating total threads than cores.
-    # Performance testing shows we're better off
-    # parallelizing ocrmypdf and forcing Tesseract to be single threaded, which we
-    # get by setting the envvar OMP_THREAD_LIMIT to 1. But if the page count of the
-    # input file is small, then we allow Tesseract to use threads, subject to the
-    # constraint: (ocrmypdf workers) * (tesseract threads) <= max_workers.
-    # As of Tesseract 4.1, 3 threads is the most effective on a 4 core/8 thread system.
-    if not os.environ.get('OMP_THREAD_LIMIT', '').isnumeric():
+    # Each Tesseract process is given its own thread limit in its environment
+    # (OMP_THREAD_LIMIT), which grows as the pages of the document finish and
+    # cores become free, unless the user set OMP_THREAD_LIMIT already.
+    if os.environ.get('OMP_THREAD_LIMIT', '').isnumeric():
+        log.debug(
+            "Using Tesseract OpenMP thread limit %s", os.environ['OMP_THREAD_LIMIT']
+        )
+    elif options.tesseract_backend == 'library':
+        # Tesseract in the workers reads the limit once when loaded, which is
+        # after this since tesserocr is imported on first use, so set it for the
+        # whole process, subject to the constraint:
+        # (ocrmypdf workers) * (tesseract threads) <= max_workers.
         tess_threads = clamp(options.jobs // len(pdfinfo), 1, 3)
         os.environ['OMP_THREAD_LIMIT'] = str(tess_threads)
-    else:
-        tess_threads = int(os.environ['OMP_THREAD_LIMIT'])
-    log.debug("Using Tesseract OpenMP thread limit %d", tess_threads)
+        log.debug("Using Tesseract OpenMP thread limit %d", tess_threads)
 
     if (
         options.tesseract_downsample_above != 32767
@@ -279,6 +311,25 @@ class TesseractOcrEngine(OcrEngine):
             user_patterns=options.user_patterns,
         )
 
+    def generate_hocr_batch(self, input_files, output_hocrs, output_texts, options):
+        if len(input_files) > 1 and tesseract.generate_hocr_batch(
+            input_files=list(input_files),
+            output_hocrs=list(output_hocrs),
+            output_texts=list(output_texts),
+            languages=options.languages,
+            engine_mode=options.tesseract_oem,
+            tessconfig=options.tesseract_config,
+            timeout=options.tesseract_timeout,
+            pagesegmode=options.tesseract_pagesegmode,
+            thresholding=options.tesseract_thresholding,
+            user_words=options.user_words,
+            user_patterns=options.user_patterns,
+        ):
+            return
+        # Fall back to one process per page, which handles a page that times out
+        # or that Tesseract rejects without losing the rest of the batch
+        super().generate_hocr_batch(input_files, output_hocrs, output_texts, options)
+
     @staticmethod
     def generate_pdf(input_file, output_pdf, output_text, options):
         tesseract.generate_pdf(
@@ -0,0 +1,301 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+"""Built-in plugin to implement OCR with libtesseract, in-process.
+
+Requires the optional tesserocr package, a Python binding for libtesseract.
+Language models stay loaded between pages, so no page pays for starting a
+process and loading models. Used when ``--tesseract-backend library`` is given.
+
+tesserocr is only imported when a worker first uses it. Loading libtesseract
+loads its OpenMP runtime, which reads ``OMP_THREAD_LIMIT`` once, so the thread
+limit must be set before then.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import threading
+import time
+from contextlib import suppress
+from math import pi
+from os import fspath
+from pathlib import Path
+
+from ocrmypdf import hookimpl
+from ocrmypdf._exec import tesseract
+from ocrmypdf.builtin_plugins.tesseract_ocr import TesseractOcrEngine
+from ocrmypdf.exceptions import MissingDependencyError, SubprocessOutputError
+from ocrmypdf.pluginspec import OcrEngine, OrientationConfidence
+
+TESSEROCR_AVAILABLE = importlib.util.find_spec('tesserocr') is not None
+
+log = logging.getLogger(__name__)
+
+# Each worker thread keeps its own API objects, since an API object may only be
+# used by one thread at a time
+_worker = threading.local()
+
+MAX_APIS_PER_WORKER = 4
+
+
+def _get_api(
+    languages: list[str],
+    engine_mode: int | None,
+    psm: int,
+    tessconfig: list[str] | None = None,
+    user_words=None,
+    user_patterns=None,
+):
+    """Get this worker's initialized API object for the given settings.
+
+    Initializing an API object loads the language models, which is the cost
+    this plugin avoids paying per page. Objects are reused for as long as the
+    worker lives, and the least recently used is released if a worker needs
+    more than ``MAX_APIS_PER_WORKER`` different settings.
+    """
+    import tesserocr
+
+    key = (
+        tuple(languages),
+        engine_mode,
+        psm,
+        tuple(tessconfig or ()),
+        user_words,
+        user_patterns,
+    )
+    if not hasattr(_worker, 'apis'):
+        _worker.apis = {}
+    api = _worker.apis.pop(key, None)
+    if api is None:
+        variables = {}
+        if user_words:
+            variables['user_words_file'] = fspath(user_words)
+        if user_patterns:
+            variables['user_patterns_file'] = fspath(user_patterns)
+        try:
+            api = tesserocr.PyTessBaseAPI(
+                lang='+'.join(languages),
+                oem=engine_mode if engine_mode is not None else tesserocr.OEM.DEFAULT,
+                psm=psm,
+                configs=list(tessconfig or ()),
+                variables=variables,
+            )
+        except RuntimeError as e:
+            raise MissingDependencyError(
+                f"libtesseract could not be initialized for languages {languages}: {e}"
+            ) from e
+        if len(_worker.apis) >= MAX_APIS_PER_WORKER:
+            oldest = next(iter(_worker.apis))
+            _worker.apis.pop(oldest).End()
+    _worker.apis[key] = api  # Reinsert as most recently used
+    return api
+
+
+def get_orientation(input_file: Path, engine_mode: int | None) -> OrientationConfidence:
+    import tesserocr
+
+    api = _get_api(['osd'], engine_mode, tesserocr.PSM.OSD_ONLY)
+    api.SetImageFile(fspath(input_file))
+    osd = api.DetectOrientationScript()
+    api.Clear()
+    if not osd:
+        return OrientationConfidence(angle=0, confidence=0.0)
+    return OrientationConfidence(
+        angle=int(osd['orient_deg']), confidence=float(osd['orient_conf'])
+    )
+
+
+def get_deskew(
+    input_file: Path, languages: list[str], engine_mode: int | None
+) -> float:
+    import tesserocr
+
+    api = _get_api(languages, engine_mode, tesserocr.PSM.AUTO_ONLY)
+    api.SetImageFile(fspath(input_file))
+    layout = api.AnalyseLayout()
+    if layout is None:  # Not enough info for a skew angle
+        api.Clear()
+        return 0.0
+    _orientation, _direction, _order, deskew_radians = layout.Orientation()
+    api.Clear()
+    deskew_degrees = 180 / pi * deskew_radians
+    log.debug(f"Deskew angle: {deskew_degrees:.3f}")
+    return deskew_degrees
+
+
+def _process_page(
+    *,
+    input_file: Path,
+    prefix: Path,
+    renderer: str,
+    languages: list[str],
+    engine_mode: int | None,
+    tessconfig: list[str],
+    timeout: float,
+    pagesegmode: int | None,
+    thresholding: int,
+    user_words,
+    user_patterns,
+) -> bool:
+    """OCR one page, writing ``prefix`` with .txt and the renderer's suffix.
+
+    Returns ``False`` if libtesseract ran out of time.
+
+    Raises:
+        SubprocessOutputError: If libtesseract failed to OCR the page.
+    """
+    import tesserocr
+
+    if timeout == 0:
+        return False
+    api = _get_api(
+        languages,
+        engine_mode,
+        tesserocr.PSM.AUTO if pagesegmode is None else pagesegmode,
+        tessconfig,
+        user_words,
+        user_patterns,
+    )
+    if tesseract.has_thresholding():
+        api.SetVariable('thresholding_method', str(thresholding))
+    api.SetVariable('tessedit_create_hocr', '1' if renderer == 'hocr' else '0')
+    api.SetVariable('tessedit_create_pdf', '1' if renderer == 'pdf' else '0')
+    api.SetVariable('textonly_pdf', '1' if renderer == 'pdf' else '0')
+    api.SetVariable('tessedit_create_txt', '1')
+    started = time.monotonic()
+    try:
+        if api.ProcessPages(
+            fspath(prefix), fspath(input_file), timeout=int(timeout * 1000)
+        ):
+            return True
+    finally:
+        api.Clear()
+    # libtesseract reports a timeout and a failure alike, so tell them apart by
+    # whether the time ran out
+    if time.monotonic() - started >= timeout:
+        return False
+    raise SubprocessOutputError(f"libtesseract could not OCR {fspath(input_file)}")
+
+
+def generate_hocr(
+    *, input_file: Path, output_hocr: Path, output_text: Path, **kwargs
+) -> None:
+    """Generate a hOCR file, which must be converted to PDF."""
+    prefix = output_hocr.with_suffix('')
+    if not _process_page(
+        input_file=input_file, prefix=prefix, renderer='hocr', **kwargs
+    ):
+        tesseract.page_timedout(kwargs['timeout'])
+        tesseract._generate_null_hocr(output_hocr, output_text, input_file)
+        return
+    with suppress(FileNotFoundError):
+        prefix.with_suffix('.txt').replace(output_text)
+
+
+def generate_pdf(
+    *, input_file: Path, output_pdf: Path, output_text: Path, **kwargs
+) -> None:
+    """Generate a text only PDF using libtesseract's PDF renderer."""
+    prefix = output_pdf.parent / Path(output_pdf.stem)
+    if not _process_page(
+        input_file=input_file, prefix=prefix, renderer='pdf', **kwargs
+    ):
+        tesseract.page_timedout(kwargs['timeout'])
+        tesseract.use_skip_page(output_pdf, output_text)
+        return
+    with suppress(FileNotFoundError):
+        prefix.with_suffix('.txt').replace(output_text)
+
+
+def _ocr_kwargs(options) -> dict:
+    return dict(
+        languages=options.languages,
+        engine_mode=options.tesseract_oem,
+        tessconfig=options.tesseract_config,
+        timeout=options.tesseract_timeout,
+        pagesegmode=options.tesseract_pagesegmode,
+        thresholding=options.tesseract_thresholding,
+        user_words=options.user_words,
+        user_patterns=options.user_patterns,
+    )
+
+
+@hookimpl
+def check_options(options):
+    if options.tesseract_backend == 'library' and not TESSEROCR_AVAILABLE:
+        log.warning(
+            "--tesseract-backend library requires the tesserocr package, which is "
+            "not installed. The tesseract program will be used instead."
+        )
+        options.tesseract_backend = 'cli'
+
+
+class TesserocrOcrEngine(TesseractOcrEngine):
+    """Implements OCR with libtesseract through tesserocr.
+
+    Runs the tesseract program as :class:`TesseractOcrEngine` does unless
+    ``--tesseract-backend library`` is given.
+    """
+
+    @staticmethod
+    def get_orientation(input_file, options):
+        if options.tesseract_backend != 'library':
+            return TesseractOcrEngine.get_orientation(input_file, options)
+        return get_orientation(input_file, engine_mode=options.tesseract_oem)
+
+    @staticmethod
+    def get_deskew(input_file, options) -> float:
+        if options.tesseract_backend != 'library':
+            return TesseractOcrEngine.get_deskew(input_file, options)
+        return get_deskew(
+            input_file,
+            languages=options.languages,
+            engine_mode=options.tesseract_oem,
+        )
+
+    @staticmethod
+    def generate_hocr(input_file, output_hocr, output_text, options):
+        if options.tesseract_backend != 'library':
+            TesseractOcrEngine.generate_hocr(
+                input_file, output_hocr, output_text, options
+            )
+            return
+        generate_hocr(
+            input_file=input_file,
+            output_hocr=output_hocr,
+            output_text=output_text,
+            **_ocr_kwargs(options),
+        )
+
+    @staticmethod
+    def generate_pdf(input_file, output_pdf, output_text, options):
+        if options.tesseract_backend != 'library':
+            TesseractOcrEngine.generate_pdf(
+                input_file, output_pdf, output_text, options
+            )
+            return
+        generate_pdf(
+            input_file=input_file,
+            output_pdf=output_pdf,
+            output_text=output_text,
+            **_ocr_kwargs(options),
+        )
+
+    def generate_hocr_batch(self, input_files, output_hocrs, output_texts, options):
+        if options.tesseract_backend != 'library':
+            super().generate_hocr_batch(
+                input_files, output_hocrs, output_texts, options
+            )
+            return
+        # Models are already loaded, so batching pages has nothing to save
+        OcrEngine.generate_hocr_batch(
+            self, input_files, output_hocrs, output_texts, options
+        )
+
+
+@hookimpl
+def get_ocr_engine():
+    if not TESSEROCR_AVAILABLE:
+        return None
+    return TesserocrOcrEngine()
@@ -234,6 +234,37 @@ Online documentation is located at:
         type=numeric(int, 0, 256),
         help="Use up to N CPU cores simultaneously (default: use all).",
     )
+    jobcontrol.add_argument(
+        '--scheduler',
+        choices=['page', 'stage'],
+        default='page',
+        help="Choose how work on pages is scheduled. 'page' (the default) runs "
+        "every step of a page in one worker, as does 'stage', but 'stage' "
+        "limits how many workers rasterize and preprocess, or render the text "
+        "layer, at once, so that some pages are rasterized while others are "
+        "OCRed.",
+    )
+    jobcontrol.add_argument(
+        '--max-memory',
+        metavar='MB',
+        type=numeric(int, 0),
+        help="Start processing a page only when its estimated memory use fits in "
+        "MB megabytes, less what the pages already being processed use. Large "
+        "pages are then processed with less parallelism than small pages. "
+        "Use 0 for no limit. By default, 3/4 of the memory available is used, "
+        "taking container memory limits into account.",
+    )
+    jobcontrol.add_argument(
+        '--checkpoint-folder',
+        metavar='FOLDER',
+        help="Keep temporary files in FOLDER instead of a temporary folder, and "
+        "record each page there as it is finished. If the run is interrupted, "
+        "running the same command again finishes only the pages that were not "
+        "finished. The folder must be empty or hold the checkpoint of an earlier "
+        "run with the same input file and settings; otherwise that run is "
+        "started over. The folder is kept if the run fails, and deleted when it "
+        "succeeds, unless --keep-temporary-files is given.",
+    )
     jobcontrol.add_argument(
         '-q', '--quiet', action='store_true', help="Suppress INFO messages"
     )
@@ -402,6 +433,17 @@ Online documentation is located at:
         help="Choose OCR PDF renderer - the default option is to let OCRmyPDF "
         "choose.  See documentation for discussion.",
     )
+    advanced.add_argument(
+        '--intermediate-image-format',
+        choices=['png', 'fast', 'uncompressed'],
+        default='fast',
+        help="Choose how page images given to Tesseract and unpaper are saved in "
+        "the temporary folder. 'png' uses fully compressed PNG. 'fast' (the "
+        "default) uses PNG with the fastest compression. 'uncompressed' uses "
+        "uncompressed TIFF for Tesseract and PNM for unpaper, which saves CPU "
+        "time but uses the most temporary disk space. Page images that become "
+        "part of the output PDF are always fully compressed.",
+    )
     advanced.add_argument(
         '--rotate-pages-threshold',
         default=DEFAULT_ROTATE_PAGES_THRESHOLD,
@@ -410,6 +452,14 @@ Online documentation is located at:
         help="Only rotate pages when confidence is above this value (arbitrary "
         "units reported by tesseract)",
     )
+    advanced.add_argument(
+        '--rotate-pages-single-render',
+        action='store_true',
+        help="With --rotate-pages, rasterize each page once and detect its "
+        "orientation from a downscaled copy of that image, instead of rasterizing "
+        "a separate preview first. The correction is then applied by rotating "
+        "the image, which is lossless.",
+    )
     advanced.add_argument(
         '--fast-web-view',
         type=numeric(float, 0),
@@ -0,0 +1,357 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+"""Cache the OCR engine's results for page images it has already seen.
+
+Reprocessing a document with different output settings, such as ``--optimize``
+or ``--output-type``, produces the same page images as before, so the OCR
+results for them can be reused instead of running the OCR engine again.
+
+Results are keyed by a SHA-256 hash of the page image given to the OCR engine,
+the OCR engine and its version, and every setting that changes what the engine
+recognizes: languages, page segmentation mode, engine mode, thresholding,
+timeout, configuration files, user words and user patterns. Any change to the
+page image, such as from different preprocessing, is a cache miss. Pages the
+OCR engine skipped, such as after a timeout, are not cached.
+
+The cache is a folder holding one folder per result. When it grows beyond its
+size limit, the results that were least recently used are deleted.
+
+Use with:
+ocrmypdf --plugin ocrmypdf.extra_plugins.ocr_cache ...
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from argparse import ArgumentParser, Namespace
+from collections.abc import Iterable, Sequence
+from os import PathLike, fspath
+from pathlib import Path
+from tempfile import mkdtemp
+
+from ocrmypdf import hookimpl
+from ocrmypdf._exec.tesseract import SKIPPED_PAGE_TEXT
+from ocrmypdf.cli import numeric
+from ocrmypdf.exceptions import BadArgsError
+from ocrmypdf.pluginspec import OcrEngine, OrientationConfidence
+
+log = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_folder() -> Path:
+    """The cache folder used when ``--ocr-cache-folder`` is not given."""
+    if os.name == 'nt':
+        base = Path(os.environ.get('LOCALAPPDATA', Path.home()))
+    else:
+        base = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache'))
+    return base / 'ocrmypdf' / 'ocr'
+
+
+@hookimpl
+def add_options(parser: ArgumentParser) -> None:
+    """Add the OCR cache's command line arguments."""
+    cache = parser.add_argument_group(
+        "OCR cache", "Reuse OCR results for page images that were OCRed before"
+    )
+    cache.add_argument(
+        '--ocr-cache-folder',
+        metavar='FOLDER',
+        type=Path,
+        help="Folder in which OCR results are cached. "
+        f"Default: {default_cache_folder()}",
+    )
+    cache.add_argument(
+        '--ocr-cache-size',
+        metavar='MB',
+        type=numeric(int, 1),
+        default=1024,
+        help="Delete the least recently used OCR results when the cache is "
+        "larger than this many megabytes. Default: %(default)s",
+    )
+
+
+@hookimpl
+def check_options(options: Namespace) -> None:
+    """Make sure the cache folder exists."""
+    if options.ocr_cache_folder is None:
+        options.ocr_cache_folder = default_cache_folder()
+    try:
+        options.ocr_cache_folder.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        raise BadArgsError(
+            f"Cannot create the OCR cache folder {options.ocr_cache_folder}: {e}"
+        ) from e
+
+
+def _update_hash(h, item: str | bytes | PathLike | None) -> None:
+    """Add an item to the hash, with a separator so items cannot run together."""
+    if isinstance(item, PathLike):
+        with open(item, 'rb') as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                h.update(chunk)
+    elif isinstance(item, str):
+        h.update(item.encode('utf-8'))
+    elif item is not None:
+        h.update(item)
+    h.update(b'\0')
+
+
+def _setting_file(name: str | None) -> Path | str | None:
+    """Hash the content of settings that name an existing file, not their name."""
+    if name and Path(name).is_file():
+        return Path(name)
+    return name
+
+
+def cache_key(
+    kind: str, input_file: Path, engine: OcrEngine, options: Namespace
+) -> str:
+    """The cache key of an OCR result of a kind ('hocr' or 'pdf') for an image."""
+    h = hashlib.sha256()
+    for item in (
+        kind,
+        input_file,
+        str(engine),
+        engine.version(),
+        ','.join(options.languages),
+        str(options.tesseract_pagesegmode),
+        str(options.tesseract_oem),
+        str(options.tesseract_thresholding),
+        str(options.tesseract_timeout),
+        *(_setting_file(config) for config in options.tesseract_config),
+        _setting_file(options.user_words),
+        _setting_file(options.user_patterns),
+    ):
+        _update_hash(h, item)
+    return h.hexdigest()
+
+
+class OcrCache:
+    """A folder of OCR results, each in a folder named by its key.
+
+    Results are written to a temporary folder and then renamed, so that
+    concurrent workers never see partial results. A result folder's
+    modification time is updated whenever it is used, which is what least
+    recently used means when the cache is trimmed.
+
+    The size of the cache is measured when the first result is saved, then kept
+    up to date as results are saved, so that the folder is only scanned again
+    when the cache is too large. Results saved by other processes are counted
+    when the folder is next scanned.
+    """
+
+    def __init__(self, folder: Path, max_bytes: int):
+        """Use the cache in a folder, trimmed to ``max_bytes`` of results."""
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.size: int | None = None
+        self.lock = threading.Lock()
+
+    def _entry(self, key: str) -> Path:
+        return self.folder / key[:2] / key
+
+    def load(self, key: str, outputs: dict[str, Path]) -> bool:
+        """Copy a cached result to the output files, if it is cached."""
+        entry = self._entry(key)
+        try:
+            for name, output_file in outputs.items():
+                shutil.copyfile(entry / name, output_file)
+            os.utime(entry)
+        except OSError:
+            return False  # Not cached, or trimmed while being read
+        return True
+
+    def save(self, key: str, outputs: dict[str, Path]) -> None:
+        """Cache the output files as the result for the key."""
+        entry = self._entry(key)
+        staging = None
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            staging = Path(mkdtemp(dir=entry.parent, prefix='.staging-'))
+            size = 0
+            for name, output_file in outputs.items():
+                shutil.copyfile(output_file, staging / name)
+                size += (staging / name).stat().st_size
+            staging.rename(entry)
+        except OSError as e:
+            # Including when another worker cached the same result first
+            log.debug("OCR result not cached: %s", e)
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+            return
+        with self.lock:
+            if self.size is not None:
+                self.size += size
+            if self.size is None or self.size > self.max_bytes:
+                self._trim()
+
+    def _entries(self) -> Iterable[tuple[float, int, Path]]:
+        for prefix in self.folder.iterdir():
+            if not prefix.is_dir():
+                continue
+            for entry in prefix.iterdir():
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in entry.iterdir())
+                    yield entry.stat().st_mtime, size, entry
+                except OSError:
+                    continue  # Deleted by another worker
+
+    def trim(self) -> None:
+        """Delete the least recently used results while the cache is too large."""
+        with self.lock:
+            self._trim()
+
+    def _trim(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+        self.size = total
+
+
+# One OcrCache per folder and size limit in each process, to keep its size
+_caches: dict[tuple[Path, int], OcrCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _skipped(outputs: dict[str, Path]) -> bool:
+    """Whether the OCR engine gave up on the page, such as after a timeout.
+
+    The placeholder output of a skipped page must not be cached, or the page
+    would never be OCRed again, even with a longer timeout.
+    """
+    try:
+        return outputs['txt'].read_text(encoding='utf-8') == SKIPPED_PAGE_TEXT
+    except (KeyError, OSError, UnicodeDecodeError):
+        return True
+
+
+class CachingOcrEngine(OcrEngine):
+    """Wraps another OCR engine, reusing its cached results where possible."""
+
+    def __init__(self, engine: OcrEngine):
+        """Wrap an OCR engine."""
+        self.engine = engine
+
+    def version(self) -> str:
+        """Returns the version of the wrapped OCR engine."""
+        return self.engine.version()
+
+    def creator_tag(self, options: Namespace) -> str:
+        """Returns the creator tag of the wrapped OCR engine."""
+        return self.engine.creator_tag(options)
+
+    def __str__(self):
+        """Returns name of the wrapped OCR engine and version."""
+        return str(self.engine)
+
+    def languages(self, options: Namespace):
+        """Returns the languages of the wrapped OCR engine."""
+        return self.engine.languages(options)
+
+    def get_orientation(
+        self, input_file: Path, options: Namespace
+    ) -> OrientationConfidence:
+        """Returns the orientation of the image, which is not cached."""
+        return self.engine.get_orientation(input_file, options)
+
+    def get_deskew(self, input_file: Path, options: Namespace) -> float:
+        """Returns the deskew angle of the image, which is not cached."""
+        return self.engine.get_deskew(input_file, options)
+
+    @staticmethod
+    def _cache(options: Namespace) -> OcrCache:
+        key = (Path(options.ocr_cache_folder), options.ocr_cache_size * 1024**2)
+        with _caches_lock:
+            if key not in _caches:
+                _caches[key] = OcrCache(*key)
+            return _caches[key]
+
+    def _cached(self, kind, input_file, outputs, options, generate) -> None:
+        if not isinstance(input_file, (str, PathLike)):
+            generate()  # Not a file that can be hashed
+            return
+        cache = self._cache(options)
+        key = cache_key(kind, Path(input_file), self.engine, options)
+        if cache.load(key, outputs):
+            log.debug("Using cached OCR result for %s", fspath(input_file))
+            return
+        generate()
+        if not _skipped(outputs):
+            cache.save(key, outputs)
+
+    def generate_hocr(
+        self, input_file: Path, output_hocr: Path, output_text: Path, options
+    ) -> None:
+        """Produce hOCR and text from the cache, or else the wrapped engine."""
+        self._cached(
+            'hocr',
+            input_file,
+            {'hocr': output_hocr, 'txt': output_text},
+            options,
+            lambda: self.engine.generate_hocr(
+                input_file, output_hocr, output_text, options
+            ),
+        )
+
+    def generate_pdf(
+        self, input_file: Path, output_pdf: Path, output_text: Path, options
+    ) -> None:
+        """Produce a text only PDF and text from the cache, or else the engine."""
+        self._cached(
+            'pdf',
+            input_file,
+            {'pdf': output_pdf, 'txt': output_text},
+            options,
+            lambda: self.engine.generate_pdf(
+                input_file, output_pdf, output_text, options
+            ),
+        )
+
+    def generate_hocr_batch(
+        self,
+        input_files: Sequence[Path],
+        output_hocrs: Sequence[Path],
+        output_texts: Sequence[Path],
+        options: Namespace,
+    ) -> None:
+        """Produce hOCR for cached pages from the cache, and OCR the others."""
+        cache = self._cache(options)
+        missed = []
+        for input_file, output_hocr, output_text in zip(
+            input_files, output_hocrs, output_texts
+        ):
+            key = cache_key('hocr', input_file, self.engine, options)
+            if not cache.load(key, {'hocr': output_hocr, 'txt': output_text}):
+                missed.append((input_file, output_hocr, output_text, key))
+        if not missed:
+            return
+        # OCR the pages that are not cached as a batch of their own
+        missed_files, missed_hocrs, missed_texts, keys = zip(*missed)
+        self.engine.generate_hocr_batch(
+            missed_files, missed_hocrs, missed_texts, options
+        )
+        for output_hocr, output_text, key in zip(missed_hocrs, missed_texts, keys):
+            outputs = {'hocr': output_hocr, 'txt': output_text}
+            if not _skipped(outputs):
+                cache.save(key, outputs)
+
+
+@hookimpl(hookwrapper=True)
+def get_ocr_engine():
+    """Wrap the OCR engine that would otherwise be used."""
+    outcome = yield
+    engine = outcome.get_result()
+    if engine is not None:
+        outcome.force_result(CachingOcrEngine(engine))
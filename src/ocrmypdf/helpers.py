@@ -220,6 +220,36 @@ def available_cpu_count() -> int:
     return 1
 
 
+CGROUP_MEMORY_LIMITS = (
+    Path('/sys/fs/cgroup/memory.max'),  # cgroup v2
+    Path('/sys/fs/cgroup/memory/memory.limit_in_bytes'),  # cgroup v1
+)
+
+
+def available_memory() -> int | None:
+    """Returns the number of bytes of memory available to this process.
+
+    This is the memory limit of the control group (such as a container) the
+    process runs in, if it has one, or else the physical memory of the system.
+    Returns None if neither can be determined.
+    """
+    physical = None
+    with suppress(AttributeError, ValueError, OSError):  # No sysconf on Windows
+        physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    for limit_file in CGROUP_MEMORY_LIMITS:
+        try:
+            limit_text = limit_file.read_text().strip()
+        except OSError:
+            continue
+        if not limit_text.isdigit():
+            continue  # 'max' means no limit
+        limit = int(limit_text)
+        # cgroup v1 reports no limit as a huge number
+        if physical is None or limit < physical:
+            return limit
+    return physical
+
+
 def is_file_writable(test_file: os.PathLike) -> bool:
     """Intentionally racy test if target is writable.
 
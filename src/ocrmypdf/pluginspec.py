@@ -157,6 +157,28 @@ def get_progressbar_class() -> type[ProgressBar]:
     """
 
 
+@hookspec
+def report_stage_timing(stage: str, seconds: float, pageno: int | None) -> None:
+    """Called when a stage of the pipeline finishes, with its wall clock time.
+
+    This may be used to collect performance metrics. Document level stages such
+    as ``triage``, ``pdfinfo``, ``pdfa``, ``metadata`` and ``optimize`` are
+    reported with *pageno* set to ``None``. Page level stages such as
+    ``rasterize``, ``ocr`` and ``graft`` are reported once per page processed.
+
+    Arguments:
+        stage: The name of the stage. The set of stages reported may change
+            in minor releases.
+        seconds: How long the stage took.
+        pageno: The 0-based page number for page level stages, otherwise ``None``.
+
+    Note:
+        This hook will be called from the main process. Page level stages that
+        run in worker processes are timed there and reported when the page is
+        finished.
+    """
+
+
 @hookspec
 def validate(pdfinfo: PdfInfo, options: Namespace) -> None:
     """Called to give a plugin an opportunity to review *options* and *pdfinfo*.
@@ -452,6 +474,35 @@ class OcrEngine(ABC):
             options: The command line options.
         """
 
+    def generate_hocr_batch(
+        self,
+        input_files: Sequence[Path],
+        output_hocrs: Sequence[Path],
+        output_texts: Sequence[Path],
+        options: Namespace,
+    ) -> None:
+        """Called to produce hOCR and sidecar text files for several page images.
+
+        OCRmyPDF uses this instead of :meth:`generate_hocr` when
+        ``--tesseract-batch-size`` is greater than 1, so that engines with a high
+        startup cost can process several pages per invocation. The default
+        implementation calls :meth:`generate_hocr` for each page.
+
+        This function executes in a worker thread or worker process.
+
+        Args:
+            input_files: Page images on which to perform OCR.
+            output_hocrs: The expected names of the output hOCR files, one per
+                page image.
+            output_texts: The expected names of the text files containing the
+                recognized text, one per page image.
+            options: The command line options.
+        """
+        for input_file, output_hocr, output_text in zip(
+            input_files, output_hocrs, output_texts
+        ):
+            self.generate_hocr(input_file, output_hocr, output_text, options)
+
 
 @hookspec(firstresult=True)
 def get_ocr_engine() -> OcrEngine:
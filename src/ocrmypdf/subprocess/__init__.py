@@ -10,6 +10,7 @@ import re
 import sys
 from collections.abc import Callable, Mapping, Sequence
 from contextlib import suppress
+from functools import lru_cache
 from pathlib import Path
 from subprocess import PIPE, STDOUT, CalledProcessError, CompletedProcess, Popen
 from subprocess import run as subprocess_run
@@ -115,6 +116,22 @@ def run_polling_stderr(
         return CompletedProcess(args, proc.returncode, None, stderr=stderr)
 
 
+def popen(
+    args: Args,
+    *,
+    env: OsEnviron | None = None,
+    **kwargs,
+) -> Popen:
+    """Start a process like ``ocrmypdf.subprocess.run``, without waiting for it.
+
+    For long-lived processes that are driven through their standard streams.
+    Arguments are the same as for ``subprocess.Popen``. The caller must wait for
+    the process to exit.
+    """
+    args, env, _process_log, _text = _fix_process_args(args, env, kwargs)
+    return Popen(args, env=env, **kwargs)
+
+
 def _fix_process_args(
     args: Args, env: OsEnviron | None, kwargs
 ) -> tuple[Args, OsEnviron, logging.Logger, bool]:
@@ -152,7 +169,32 @@ def get_version(
         regex: A regular expression to parse the program's output and obtain the
             version.
         env: Custom ``os.environ`` in which to run program.
+
+    Versions found in the default environment are cached for as long as ``PATH``
+    is unchanged, because a long-running process (for example, a web service
+    calling :func:`ocrmypdf.ocr` repeatedly) would otherwise run every version
+    check again for each file. Failures are not cached.
     """
+    if env is None:
+        return _get_version_cached(program, version_arg, regex, os.environ.get('PATH'))
+    return _get_version(program, version_arg=version_arg, regex=regex, env=env)
+
+
+@lru_cache(maxsize=64)
+def _get_version_cached(
+    program: str, version_arg: str, regex: str, path: str | None
+) -> str:
+    del path  # only part of the cache key
+    return _get_version(program, version_arg=version_arg, regex=regex)
+
+
+def _get_version(
+    program: str,
+    *,
+    version_arg: str,
+    regex: str,
+    env: OsEnviron | None = None,
+) -> str:
     args_prog = [program, version_arg]
     try:
         proc = run(
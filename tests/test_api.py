@@ -12,7 +12,9 @@ from pdfminer.high_level import extract_text
 
 import ocrmypdf
 import ocrmypdf._pipelines
+import ocrmypdf._pipelines._common
 import ocrmypdf.api
+from ocrmypdf._plugin_manager import get_plugin_manager
 
 
 def test_language_list():
@@ -103,3 +105,49 @@ def test_hocr_result_pickle():
         orientation_correction=180,
     )
     assert result == pickle.loads(pickle.dumps(result))
+
+
+def test_timed_stage_accumulates():
+    timings: dict[str, float] = {}
+    with ocrmypdf._pipelines._common.timed_stage(timings, 'ocr'):
+        pass
+    first = timings['ocr']
+    with ocrmypdf._pipelines._common.timed_stage(timings, 'ocr'):
+        pass
+    assert timings['ocr'] >= first
+
+    with (
+        pytest.raises(ValueError),
+        ocrmypdf._pipelines._common.timed_stage(timings, 'failed'),
+    ):
+        raise ValueError()
+    assert 'failed' not in timings
+
+    with ocrmypdf._pipelines._common.timed_stage(None, 'ignored'):
+        pass
+
+
+def test_report_stage_timing(resources: Path, outpdf: Path):
+    class TimingRecorder:
+        def __init__(self):
+            self.reports = []
+
+        @ocrmypdf.hookimpl
+        def report_stage_timing(self, stage, seconds, pageno):
+            assert seconds >= 0
+            self.reports.append((stage, pageno))
+
+    recorder = TimingRecorder()
+    plugin_manager = get_plugin_manager(['tests/plugins/tesseract_cache.py'])
+    plugin_manager.register(recorder)
+    ocrmypdf.ocr(
+        resources / 'ccitt.pdf',
+        outpdf,
+        plugin_manager=plugin_manager,
+        output_type='pdf',
+        optimize=0,
+    )
+    stages = {stage for stage, _pageno in recorder.reports}
+    assert {'triage', 'pdfinfo', 'metadata', 'optimize'} <= stages
+    for stage in ['rasterize', 'page_image', 'ocr', 'graft']:
+        assert (stage, 0) in recorder.reports
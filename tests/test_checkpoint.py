@@ -0,0 +1,125 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+from argparse import Namespace
+
+import pytest
+
+from ocrmypdf._graft import OcrGrafter
+from ocrmypdf._pipelines import ocr
+from ocrmypdf._pipelines._checkpoint import (
+    MANIFEST,
+    Checkpoint,
+    checkpoint_work_folder,
+)
+from ocrmypdf._pipelines._common import PageResult
+from ocrmypdf.exceptions import BadArgsError, ExitCode
+
+from .conftest import check_ocrmypdf, run_ocrmypdf_api
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / 'checkpoint'
+    folder.mkdir()
+    return folder
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    input_file = tmp_path / 'input.pdf'
+    input_file.write_bytes(b'%PDF-1.7 input')
+    return input_file
+
+
+def _finish_page(checkpoint, folder, pageno):
+    ocr_out = folder / f'{pageno:06d}_ocr.pdf'
+    text_out = folder / f'{pageno:06d}_ocr.txt'
+    ocr_out.write_text('pdf')
+    text_out.write_text('text')
+    result = PageResult(pageno=pageno, ocr=ocr_out, text=text_out, timings={'ocr': 1.0})
+    checkpoint.page_finished(result)
+    return result
+
+
+def test_checkpoint_resume(folder, input_file):
+    options = Namespace(languages=['eng'], jobs=4)
+    checkpoint = Checkpoint.resume(folder, input_file, options)
+    assert not checkpoint.finished
+    results = [_finish_page(checkpoint, folder, pageno) for pageno in range(3)]
+    (folder / '000004_rasterize.png').write_text('in progress')
+    (folder / 'origin').write_bytes(input_file.read_bytes())
+
+    # Settings that do not change the pages may differ
+    options = Namespace(languages=['eng'], jobs=1)
+    checkpoint = Checkpoint.resume(folder, input_file, options, keep={'origin'})
+    assert checkpoint.finished == {
+        result.pageno: result._replace(timings=None) for result in results
+    }
+    assert not (folder / '000004_rasterize.png').exists()
+    assert (folder / 'origin').exists()
+
+
+def test_checkpoint_interrupted(folder, input_file):
+    options = Namespace(languages=['eng'])
+    checkpoint = Checkpoint.resume(folder, input_file, options)
+    _finish_page(checkpoint, folder, 0)
+    _finish_page(checkpoint, folder, 1)
+    (folder / '000001_ocr.txt').unlink()
+    with open(folder / MANIFEST, 'a') as f:
+        f.write('{"pageno": 2, "ocr": {"Pa')
+
+    checkpoint = Checkpoint.resume(folder, input_file, options)
+    assert list(checkpoint.finished) == [0]
+    # The manifest no longer holds the pages that were not reused
+    checkpoint = Checkpoint.resume(folder, input_file, options)
+    assert list(checkpoint.finished) == [0]
+
+
+def test_checkpoint_other_settings(folder, input_file, caplog):
+    checkpoint = Checkpoint.resume(folder, input_file, Namespace(oversample=0))
+    _finish_page(checkpoint, folder, 0)
+
+    checkpoint = Checkpoint.resume(folder, input_file, Namespace(oversample=300))
+    assert not checkpoint.finished
+    assert 'starting over' in caplog.text
+    assert not (folder / '000000_ocr.pdf').exists()
+
+
+def test_checkpoint_work_folder(tmp_path):
+    assert checkpoint_work_folder(tmp_path / 'new').is_dir()
+
+    (tmp_path / 'other').mkdir()
+    (tmp_path / 'other' / 'file.txt').write_text('not a checkpoint')
+    with pytest.raises(BadArgsError):
+        checkpoint_work_folder(tmp_path / 'other')
+
+
+def test_checkpoint_folder(resources, outpdf, tmp_path, monkeypatch):
+    checkpoint_folder = tmp_path / 'checkpoint'
+    args = [
+        '--checkpoint-folder',
+        checkpoint_folder,
+        '--plugin',
+        'tests/plugins/tesseract_noop.py',
+    ]
+
+    # Every page is finished, but the run fails before the output is written
+    def finalize(self):
+        raise OSError("interrupted")
+
+    with monkeypatch.context() as m:
+        m.setattr(OcrGrafter, 'finalize', finalize)
+        exitcode = run_ocrmypdf_api(resources / 'multipage.pdf', outpdf, *args)
+    assert exitcode == ExitCode.other_error
+    assert (checkpoint_folder / MANIFEST).exists()
+
+    # Resuming reuses the finished pages instead of processing them again
+    def exec_page_sync(page_context):
+        raise AssertionError("finished page processed again")
+
+    monkeypatch.setattr(ocr, '_exec_page_sync', exec_page_sync)
+    check_ocrmypdf(resources / 'multipage.pdf', outpdf, *args)
+    assert not checkpoint_folder.exists()
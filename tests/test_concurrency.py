@@ -5,10 +5,16 @@ from __future__ import annotations
 
 import os
 import platform
+import threading
 
 import pytest
 
 from ocrmypdf import ExitCode
+from ocrmypdf._progressbar import NullProgressBar
+from ocrmypdf.builtin_plugins.concurrency import (
+    TASKS_IN_FLIGHT_PER_WORKER,
+    StandardExecutor,
+)
 
 from .conftest import run_ocrmypdf_api
 
@@ -27,3 +33,43 @@ def test_simulate_oom_killer(multipage, no_outpdf):
         'tests/plugins/tesseract_simulate_oom_killer.py',
     )
     assert exitcode == ExitCode.child_process_error
+
+
+def _noop():
+    pass
+
+
+def test_submission_window():
+    lock = threading.Lock()
+    submitted = ran = finished = 0
+    max_in_flight = 0
+
+    def task_arguments():
+        nonlocal submitted, max_in_flight
+        for n in range(100):
+            with lock:
+                submitted += 1
+                max_in_flight = max(max_in_flight, submitted - ran)
+            yield (n,)
+
+    def task(n):
+        nonlocal ran
+        with lock:
+            ran += 1
+        return n
+
+    def task_finished(result, pbar):
+        nonlocal finished
+        finished += 1
+
+    StandardExecutor(pbar_class=NullProgressBar)(
+        use_threads=True,
+        max_workers=2,
+        progress_kwargs={},
+        worker_initializer=_noop,
+        task=task,
+        task_arguments=task_arguments(),
+        task_finished=task_finished,
+    )
+    assert finished == 100
+    assert max_in_flight <= 2 * TASKS_IN_FLIGHT_PER_WORKER
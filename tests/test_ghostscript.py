@@ -5,9 +5,12 @@ from __future__ import annotations
 
 import logging
 import secrets
+import shutil
 import subprocess
 import sys
+from argparse import Namespace
 from decimal import Decimal
+from io import BytesIO
 from unittest.mock import patch
 
 import pikepdf
@@ -17,8 +20,10 @@ from PIL import Image, UnidentifiedImageError
 
 from ocrmypdf._exec import ghostscript
 from ocrmypdf._exec.ghostscript import DuplicateFilter, rasterize_pdf
+from ocrmypdf._plugin_manager import get_plugin_manager
 from ocrmypdf.exceptions import ColorConversionNeededError, ExitCode, InputFileError
 from ocrmypdf.helpers import Resolution
+from ocrmypdf.pdfa import file_claims_pdfa, generate_pdfa_ps
 
 from .conftest import check_ocrmypdf, run_ocrmypdf_api
 
@@ -79,6 +84,146 @@ def test_rasterize_rotated(francais, outdir, caplog):
         assert im.info['dpi'] == forced_dpi.flip_axis()
 
 
+def test_rasterize_pdf_pages(resources, outdir):
+    output_files = [outdir / f'{n}.png' for n in range(1, 4)]
+    assert ghostscript.rasterize_pdf_pages(
+        resources / 'cardinal.pdf',
+        output_files,
+        raster_device='pngmono',
+        raster_dpi=Resolution(50, 50),
+        first_page=2,
+    )
+
+    with patch('ocrmypdf._exec.ghostscript.run') as mock:
+        for n, output_file in enumerate(output_files, start=2):
+            rasterize_pdf(
+                resources / 'cardinal.pdf',
+                output_file,
+                raster_device='pngmono',
+                raster_dpi=Resolution(50, 50),
+                pageno=n,
+            )
+        mock.assert_not_called()
+    assert not list(outdir.glob('*.prerender'))
+    for output_file in output_files:
+        with Image.open(output_file) as im:
+            assert im.mode == '1'
+
+
+def test_rasterize_pdf_to_pipe(resources, outdir):
+    rasterize_pdf(
+        resources / 'cardinal.pdf',
+        outdir / 'reference.png',
+        raster_device='pngmono',
+        raster_dpi=Resolution(50, 50),
+        pageno=2,
+    )
+    with ghostscript.rasterize_pdf_to_pipe(
+        resources / 'cardinal.pdf',
+        raster_device='pngmono',
+        raster_dpi=Resolution(50, 50),
+        pageno=2,
+    ) as stream:
+        data = stream.read()
+    with (
+        Image.open(outdir / 'reference.png') as reference,
+        Image.open(BytesIO(data)) as im,
+    ):
+        assert im.mode == reference.mode
+        assert im.size == reference.size
+        assert im.tobytes() == reference.tobytes()
+
+
+def test_render_server(resources, outdir):
+    # Render servers only work in the folder of the page images
+    input_file = shutil.copy(resources / 'cardinal.pdf', outdir / 'in.pdf')
+    rasterize_pdf(
+        input_file,
+        outdir / 'reference.png',
+        raster_device='pngmono',
+        raster_dpi=Resolution(50, 50),
+        pageno=2,
+    )
+
+    with patch('ocrmypdf._exec.ghostscript.run') as mock:
+        for n in range(1, 4):
+            rasterize_pdf(
+                input_file,
+                outdir / f'{n}.png',
+                raster_device='pngmono',
+                raster_dpi=Resolution(50, 50),
+                pageno=n,
+                server_pages=2,
+            )
+        mock.assert_not_called()
+    with (
+        Image.open(outdir / 'reference.png') as reference,
+        Image.open(outdir / '2.png') as im,
+    ):
+        assert im.mode == reference.mode
+        assert im.size == reference.size
+        assert im.tobytes() == reference.tobytes()
+
+
+def test_render_server_folder(tmp_path, monkeypatch):
+    started = []
+
+    class FakeRenderServer:
+        def __init__(self, *, folder, stop_on_error):
+            self.folder = folder
+            self.stop_on_error = stop_on_error
+            self.pages = 0
+            started.append(folder)
+
+        def render(self, input_file, output_file, **kwargs):
+            self.pages += 1
+            return True
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(ghostscript, 'RenderServer', FakeRenderServer)
+    monkeypatch.setattr(ghostscript, '_idle_render_servers', [])
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    first.mkdir()
+    second.mkdir()
+
+    def render(folder, input_file):
+        return ghostscript._render_with_server(
+            input_file,
+            folder / 'page.png',
+            raster_device='pngmono',
+            raster_dpi=Resolution(50, 50),
+            pageno=1,
+            stop_on_error=False,
+            server_pages=10,
+        )
+
+    # Servers are only shared by pages in the same work folder
+    assert render(first, first / 'origin.pdf')
+    assert render(first, first / 'origin.pdf')
+    assert render(second, second / 'origin.pdf')
+    assert started == [first.resolve(), second.resolve()]
+    # Files outside the work folder are not given to a server
+    assert not render(second, first / 'origin.pdf')
+    # The server of a finished document is closed
+    shutil.rmtree(first)
+    assert render(second, second / 'origin.pdf')
+    assert [s.folder for s in ghostscript._idle_render_servers] == [second.resolve()]
+
+
+def test_render_ahead(resources, outpdf):
+    check_ocrmypdf(
+        resources / 'cardinal.pdf',
+        outpdf,
+        '--render-ahead',
+        '2',
+        '--rotate-pages',
+        '--plugin',
+        'tests/plugins/tesseract_noop.py',
+    )
+
+
 def test_gs_render_failure(resources, outpdf, caplog):
     exitcode = run_ocrmypdf_api(
         resources / 'blank.pdf',
@@ -287,3 +432,56 @@ def test_recoverable_image_error_with_stop(pdf_with_invalid_image, outdir, caplo
             stop_on_error=True,
         )
     # out2.png will not be created; if it were it would be blank.
+
+
+def test_render_server_setting(resources, outdir):
+    def render(input_file, output_file, **kwargs):
+        Image.new('1', (10, 10)).save(output_file, dpi=(50, 50))
+        return True
+
+    with (
+        patch('ocrmypdf._exec.ghostscript._render_with_server') as server,
+        patch('ocrmypdf._exec.ghostscript._run_rasterize') as process,
+    ):
+        server.side_effect = process.side_effect = render
+        with ghostscript.render_server(2):
+            rasterize_pdf(
+                resources / 'cardinal.pdf',
+                outdir / '1.png',
+                raster_device='pngmono',
+                raster_dpi=Resolution(50, 50),
+            )
+        server.assert_called_once()
+        process.assert_not_called()
+
+        # The setting only applies inside the block
+        rasterize_pdf(
+            resources / 'cardinal.pdf',
+            outdir / '2.png',
+            raster_device='pngmono',
+            raster_dpi=Resolution(50, 50),
+        )
+        server.assert_called_once()
+        process.assert_called_once()
+
+
+def test_generate_pdfa_hook(resources, outdir):
+    pm = get_plugin_manager([])
+    generate_pdfa_ps(outdir / 'pdfa.ps')
+    context = Namespace(
+        options=Namespace(
+            pdfa_image_compression='auto',
+            color_conversion_strategy='LeaveColorUnchanged',
+        )
+    )
+    pm.hook.generate_pdfa(
+        pdf_pages=[resources / 'graph.pdf'],
+        pdfmark=outdir / 'pdfa.ps',
+        output_file=outdir / 'pdfa.pdf',
+        context=context,
+        pdf_version='1.7',
+        pdfa_part='2',
+        progressbar_class=None,
+        stop_on_soft_error=True,
+    )
+    assert file_claims_pdfa(outdir / 'pdfa.pdf')['pass']
@@ -54,6 +54,33 @@ def test_no_cpu_count(monkeypatch):
     assert invoked, "Patched function called during test"
 
 
+@pytest.mark.parametrize(
+    'limits, expected',
+    [
+        (['max\n'], None),
+        (['1073741824\n'], 1073741824),
+        ([None, '2147483648\n'], 2147483648),
+        ([str(2**62)], None),  # cgroup v1 with no limit
+    ],
+)
+def test_available_memory_cgroup(limits, expected, tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'sysconf', lambda name: 2**20)
+    limit_files = []
+    for n, limit in enumerate(limits):
+        limit_file = tmp_path / f'memory{n}'
+        if limit is not None:
+            limit_file.write_text(limit)
+        limit_files.append(limit_file)
+    monkeypatch.setattr(helpers, 'CGROUP_MEMORY_LIMITS', limit_files)
+    assert helpers.available_memory() == (expected or 2**40)
+
+
+def test_available_memory_unknown(tmp_path, monkeypatch):
+    monkeypatch.delattr(os, 'sysconf', raising=False)
+    monkeypatch.setattr(helpers, 'CGROUP_MEMORY_LIMITS', [tmp_path / 'missing'])
+    assert helpers.available_memory() is None
+
+
 skipif_docker = pytest.mark.skipif(running_in_docker(), reason="fails on Docker")
 
 
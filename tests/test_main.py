@@ -332,6 +332,19 @@ def test_tesseract_thresholding(value, resources, outpdf):
     )
 
 
+@pytest.mark.parametrize('value', ['png', 'fast', 'uncompressed'])
+def test_intermediate_image_format(value, resources, outpdf):
+    check_ocrmypdf(
+        resources / 'skew.pdf',
+        outpdf,
+        '--deskew',
+        '--intermediate-image-format',
+        value,
+        '--plugin',
+        'tests/plugins/tesseract_noop.py',
+    )
+
+
 @pytest.mark.parametrize('value', ['abcxyz'])
 def test_tesseract_thresholding_invalid(value, resources, no_outpdf):
     with pytest.raises(SystemExit, match='2'):
@@ -889,6 +902,22 @@ def test_version_check():
         get_version('echo')
 
 
+def test_version_check_cached(monkeypatch):
+    ocrmypdf.subprocess._get_version_cached.cache_clear()
+    with patch('ocrmypdf.subprocess._get_version', return_value='1.2.3') as mock:
+        assert get_version('python3') == '1.2.3'
+        assert get_version('python3') == '1.2.3'
+        assert mock.call_count == 1
+
+        monkeypatch.setenv('PATH', os.pathsep + os.environ.get('PATH', ''))
+        assert get_version('python3') == '1.2.3'
+        assert mock.call_count == 2
+
+        get_version('python3', env=os.environ)
+        assert mock.call_count == 3
+    ocrmypdf.subprocess._get_version_cached.cache_clear()
+
+
 @pytest.mark.parametrize(
     'threshold, optimize, output_type, expected',
     [
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+import threading
+import time
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from ocrmypdf._pipelines import _memory
+from ocrmypdf._pipelines._memory import MemoryBudget, page_memory_budget
+
+from .conftest import check_ocrmypdf
+
+
+def _reserve_all(budget, sizes, max_workers=4):
+    lock = threading.Lock()
+    peak = 0
+
+    def reserve(nbytes):
+        nonlocal peak
+        with budget.reserve(nbytes):
+            with lock:
+                peak = max(peak, budget.used)
+            time.sleep(0.01)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(reserve, nbytes) for nbytes in sizes]:
+            future.result()
+    return peak
+
+
+def test_memory_budget():
+    budget = MemoryBudget(100, use_threads=True)
+    peak = _reserve_all(budget, [40] * 10)
+    assert peak <= 80  # At most two at a time
+    assert budget.used == 0
+
+
+def test_memory_budget_oversized():
+    budget = MemoryBudget(100, use_threads=True)
+    peak = _reserve_all(budget, [500, 10, 10, 10])
+    assert peak <= 100  # The oversized reservation holds the whole budget
+    assert budget.used == 0
+
+
+def _reserve_in_process(nbytes):
+    with _memory._worker_budget.reserve(nbytes):
+        return _memory._worker_budget.used
+
+
+def test_memory_budget_processes():
+    budget = MemoryBudget(100, use_threads=False)
+    with ProcessPoolExecutor(
+        max_workers=2,
+        initializer=_memory.set_worker_memory_budget,
+        initargs=(budget,),
+    ) as executor:
+        used = list(executor.map(_reserve_in_process, [60] * 4))
+    assert all(60 <= used_bytes <= 100 for used_bytes in used)
+    assert budget.used == 0
+
+
+def test_page_memory_reserved_together(monkeypatch):
+    budget = MemoryBudget(1000, use_threads=True)
+    monkeypatch.setattr(_memory, '_worker_budget', budget)
+    monkeypatch.setattr(
+        _memory, 'estimate_page_memory', lambda page_context: page_context.pageno
+    )
+    pages = [Namespace(pageno=pageno) for pageno in (100, 200, 300)]
+    with _memory.page_memory_reserved(*pages):
+        assert budget.used == 600
+    assert budget.used == 0
+
+
+@pytest.mark.parametrize(
+    'max_memory, available, expected',
+    [
+        (1, None, 1024**2),
+        (0, 2**30, None),
+        (None, 2**30, 3 * 2**28),
+        (None, None, None),
+    ],
+)
+def test_page_memory_budget(max_memory, available, expected, monkeypatch):
+    monkeypatch.setattr(_memory, 'available_memory', lambda: available)
+    budget = page_memory_budget(Namespace(max_memory=max_memory, use_threads=True))
+    if expected is None:
+        assert budget is None
+    else:
+        assert budget.limit == expected
+
+
+def test_max_memory(resources, outpdf):
+    # A budget smaller than any page still processes every page, one at a time
+    check_ocrmypdf(
+        resources / 'multipage.pdf',
+        outpdf,
+        '--max-memory',
+        '1',
+        '--plugin',
+        'tests/plugins/tesseract_noop.py',
+    )
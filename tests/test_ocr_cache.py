@@ -0,0 +1,190 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+import os
+from argparse import Namespace
+
+import pytest
+
+from ocrmypdf._exec.tesseract import SKIPPED_PAGE_TEXT
+from ocrmypdf.extra_plugins.ocr_cache import CachingOcrEngine, OcrCache
+from ocrmypdf.pluginspec import OcrEngine, OrientationConfidence
+
+from .conftest import check_ocrmypdf
+
+
+class CountingOcrEngine(OcrEngine):
+    def __init__(self):
+        """Start with no calls to the OCR engine counted."""
+        self.calls = 0
+
+    @staticmethod
+    def version():
+        return '1.0'
+
+    @staticmethod
+    def creator_tag(options):
+        return 'Counting OCR'
+
+    def __str__(self):
+        return 'Counting OCR 1.0'
+
+    @staticmethod
+    def languages(options):
+        return {'eng', 'deu'}
+
+    @staticmethod
+    def get_orientation(input_file, options):
+        return OrientationConfidence(angle=0, confidence=0.0)
+
+    def generate_hocr(self, input_file, output_hocr, output_text, options):
+        self.calls += 1
+        if input_file.read_text() == 'slow':
+            output_hocr.write_text('')
+            output_text.write_text(SKIPPED_PAGE_TEXT)
+            return
+        output_hocr.write_text(f'hocr {input_file.read_text()}')
+        output_text.write_text(f'text {input_file.read_text()}')
+
+    def generate_pdf(self, input_file, output_pdf, output_text, options):
+        self.calls += 1
+        output_pdf.write_text(f'pdf {input_file.read_text()}')
+        output_text.write_text(f'text {input_file.read_text()}')
+
+
+@pytest.fixture
+def options(tmp_path):
+    return Namespace(
+        ocr_cache_folder=tmp_path / 'cache',
+        ocr_cache_size=1,
+        languages=['eng'],
+        tesseract_pagesegmode=None,
+        tesseract_oem=None,
+        tesseract_thresholding=0,
+        tesseract_timeout=180.0,
+        tesseract_config=[],
+        user_words=None,
+        user_patterns=None,
+    )
+
+
+def _image(tmp_path, name, content):
+    image = tmp_path / name
+    image.write_text(content)
+    return image
+
+
+def test_ocr_cache(tmp_path, options):
+    (tmp_path / 'cache').mkdir()
+    engine = CountingOcrEngine()
+    cached = CachingOcrEngine(engine)
+    image = _image(tmp_path, 'page.png', 'image')
+
+    for n in range(2):
+        cached.generate_hocr(
+            image, tmp_path / f'{n}.hocr', tmp_path / f'{n}.txt', options
+        )
+        assert (tmp_path / f'{n}.hocr').read_text() == 'hocr image'
+        assert (tmp_path / f'{n}.txt').read_text() == 'text image'
+    assert engine.calls == 1
+
+    # A PDF is cached separately from hOCR
+    cached.generate_pdf(image, tmp_path / 'out.pdf', tmp_path / 'out.txt', options)
+    assert engine.calls == 2
+
+    # So is a different image, or the same image with other settings
+    other = _image(tmp_path, 'other.png', 'other')
+    cached.generate_hocr(other, tmp_path / 'a.hocr', tmp_path / 'a.txt', options)
+    assert engine.calls == 3
+    options.languages = ['deu']
+    cached.generate_hocr(image, tmp_path / 'b.hocr', tmp_path / 'b.txt', options)
+    assert engine.calls == 4
+
+
+def test_ocr_cache_batch(tmp_path, options):
+    (tmp_path / 'cache').mkdir()
+    engine = CountingOcrEngine()
+    cached = CachingOcrEngine(engine)
+    images = [_image(tmp_path, f'{n}.png', str(n)) for n in range(3)]
+
+    cached.generate_hocr(images[0], tmp_path / 'x.hocr', tmp_path / 'x.txt', options)
+    cached.generate_hocr_batch(
+        images,
+        [tmp_path / f'{n}.hocr' for n in range(3)],
+        [tmp_path / f'{n}.txt' for n in range(3)],
+        options,
+    )
+    assert engine.calls == 3  # The first page was cached
+    for n in range(3):
+        assert (tmp_path / f'{n}.hocr').read_text() == f'hocr {n}'
+
+
+def test_ocr_cache_skipped_page(tmp_path, options):
+    (tmp_path / 'cache').mkdir()
+    engine = CountingOcrEngine()
+    cached = CachingOcrEngine(engine)
+    image = _image(tmp_path, 'page.png', 'slow')
+
+    # A page that timed out is OCRed again next time
+    for n in range(2):
+        cached.generate_hocr(
+            image, tmp_path / f'{n}.hocr', tmp_path / f'{n}.txt', options
+        )
+    assert engine.calls == 2
+    cached.generate_hocr_batch(
+        [image], [tmp_path / 'b.hocr'], [tmp_path / 'b.txt'], options
+    )
+    assert engine.calls == 3
+    assert not any((tmp_path / 'cache').glob('*/*'))
+
+
+def test_ocr_cache_trim(tmp_path):
+    cache = OcrCache(tmp_path, max_bytes=25)
+    output = tmp_path / 'output'
+    for n, key in enumerate(['aa1', 'bb2', 'cc3']):
+        output.write_text('0123456789')
+        cache.save(key, {'txt': output})
+        # Make the order of use unambiguous
+        os.utime(tmp_path / key[:2] / key, (n, n))
+    # The two most recently saved results fit
+    assert not (tmp_path / 'aa' / 'aa1').exists()
+
+    assert cache.load('bb2', {'txt': output})  # Now the most recently used
+    output.write_text('0123456789')
+    cache.save('dd4', {'txt': output})
+    assert (tmp_path / 'bb' / 'bb2').exists()
+    assert not (tmp_path / 'cc' / 'cc3').exists()
+    assert not cache.load('cc3', {'txt': output})
+
+
+def test_ocr_cache_size(tmp_path, monkeypatch):
+    cache = OcrCache(tmp_path, max_bytes=1000)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, '_entries', lambda: scans.append(1) or entries())
+    output = tmp_path / 'output'
+    output.write_text('0123456789')
+    for key in ['aa1', 'bb2', 'cc3']:
+        cache.save(key, {'txt': output})
+    # The folder is scanned once, then the size is kept as results are saved
+    assert len(scans) == 1
+    assert cache.size == 30
+
+
+def test_ocr_cache_plugin(resources, outdir):
+    cache_folder = outdir / 'cache'
+    for n in range(2):
+        check_ocrmypdf(
+            resources / 'trivial.pdf',
+            outdir / f'out{n}.pdf',
+            '--plugin',
+            'ocrmypdf.extra_plugins.ocr_cache',
+            '--plugin',
+            'tests/plugins/tesseract_noop.py',
+            '--ocr-cache-folder',
+            cache_folder,
+            '--force-ocr',
+        )
+    assert any(cache_folder.glob('*/*'))
@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+import pytest
+from PIL import Image
+
+from ocrmypdf._pageimage import PageImage, consumer_formats
+from ocrmypdf.helpers import Resolution
+
+
+def test_page_image_from_file(tmp_path):
+    path = tmp_path / 'page.png'
+    Image.new('L', (30, 20), 128).save(path, dpi=(300, 300))
+
+    page_image = PageImage(path)
+    assert page_image.file == path
+    assert page_image.image.size == (30, 20)
+    assert page_image.dpi == Resolution(300, 300)
+
+
+def test_page_image_saved_on_demand(tmp_path):
+    path = tmp_path / 'page.png'
+    page_image = PageImage(
+        path, Image.new('1', (30, 20), 1), dpi=Resolution(150.0, 150.0)
+    )
+    assert not path.exists()
+
+    assert page_image.file == path
+    with Image.open(path) as im:
+        assert im.mode == '1'
+        assert Resolution(*im.info['dpi']) == Resolution(150, 150)
+
+    # Saved only once
+    path.unlink()
+    assert page_image.file == path
+    assert not path.exists()
+
+
+def test_page_image_dpi_from_image(tmp_path):
+    im = Image.new('RGB', (30, 20))
+    im.info['dpi'] = (72, 72)
+    assert PageImage(tmp_path / 'page.png', im).dpi == Resolution(72, 72)
+    assert PageImage(tmp_path / 'page.png', Image.new('RGB', (30, 20))).dpi is None
+
+
+def test_consumer_formats():
+    assert consumer_formats('png', 'ocr') == ['png']
+    assert consumer_formats('uncompressed', 'ocr')[0] == 'tiff'
+    assert consumer_formats('uncompressed', 'unpaper')[0] == 'pnm'
+    for setting in ('png', 'fast', 'uncompressed'):
+        assert consumer_formats(setting, 'pdf') == ['png']
+
+
+@pytest.mark.parametrize(
+    'formats, suffix',
+    [(['tiff'], '.tif'), (['pnm'], '.pnm'), (['fast-png'], '.png')],
+)
+def test_page_image_file_for(tmp_path, formats, suffix):
+    page_image = PageImage(
+        tmp_path / 'page.png', Image.new('L', (30, 20), 128), dpi=Resolution(150, 150)
+    )
+    path = page_image.file_for(formats)
+    assert path == tmp_path / f'page{suffix}'
+    with Image.open(path) as im:
+        assert im.size == (30, 20)
+        if formats != ['pnm']:
+            assert Resolution(*im.info['dpi']) == Resolution(150, 150)
+
+
+def test_page_image_file_for_reuses_source(tmp_path):
+    path = tmp_path / 'page.png'
+    Image.new('L', (30, 20), 128).save(path, dpi=(300, 300))
+
+    page_image = PageImage(path)
+    assert page_image.file_for(consumer_formats('uncompressed', 'ocr')) == path
+    assert not (tmp_path / 'page.tif').exists()
+
+
+def test_page_image_fast_png_resaved_for_pdf(tmp_path):
+    page_image = PageImage(tmp_path / 'page.png', Image.new('L', (30, 20), 128))
+    fast = page_image.file_for(consumer_formats('fast', 'ocr'))
+    assert page_image.file_for(consumer_formats('fast', 'ocr')) == fast
+
+    # The fast PNG is overwritten with a fully compressed one, and forgotten
+    assert page_image.file_for(consumer_formats('fast', 'pdf')) == fast
+    assert 'fast-png' not in repr(page_image)
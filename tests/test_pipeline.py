@@ -13,6 +13,8 @@ from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen.canvas import Canvas
 
 from ocrmypdf import _pipeline, pdfinfo
+from ocrmypdf._jobcontext import PdfContext
+from ocrmypdf._pipelines._common import costliest_pages_first
 from ocrmypdf.helpers import Resolution
 
 warnings.filterwarnings(
@@ -67,6 +69,55 @@ def test_dpi_needed(image, text, vector, result, rgb_image, outdir):
     assert _pipeline.get_page_square_dpi(ctx) == result
 
 
+def test_costliest_pages_first(rgb_image, outdir):
+    c = Canvas(str(outdir / 'cost.pdf'), pagesize=(5 * inch, 5 * inch))
+    # Pages whose images have 8 pixels per inch of width, 16, then 64
+    for width in (1, 1 / 2, 1 / 8):
+        c.drawImage(rgb_image, 0, 0, width=width * inch, height=width * inch)
+        c.showPage()
+    c.drawString(1 * inch, 4 * inch, "Actual text")
+    c.showPage()
+    c.save()
+
+    pi = pdfinfo.PdfInfo(outdir / 'cost.pdf')
+    options = Mock(oversample=0, pages=None, skip_text=True)
+    context = PdfContext(options, outdir, outdir / 'cost.pdf', pi, None)
+
+    costs = [
+        _pipeline.estimate_page_cost(page_context)
+        for page_context in context.get_page_contexts()
+    ]
+    assert costs[2] > costs[1] > costs[0] > 0
+    assert costs[3] == 0  # Skipped, since it has text
+
+    ordered = [
+        page_context.pageno for (page_context,) in costliest_pages_first(context)
+    ]
+    assert ordered == [2, 1, 0, 3]
+
+
+def test_estimate_page_memory(rgb_image, outdir):
+    gray_image = ImageReader(Image.new('L', (8, 8)))
+    c = Canvas(str(outdir / 'memory.pdf'), pagesize=(5 * inch, 5 * inch))
+    for image in (rgb_image, gray_image):
+        c.drawImage(image, 0, 0, width=1 * inch, height=1 * inch)
+        c.showPage()
+    c.drawString(1 * inch, 4 * inch, "Actual text")
+    c.showPage()
+    c.save()
+
+    pi = pdfinfo.PdfInfo(outdir / 'memory.pdf')
+    options = Mock(oversample=0, pages=None, skip_text=True)
+    context = PdfContext(options, outdir, outdir / 'memory.pdf', pi, None)
+
+    rgb, gray, text = (
+        _pipeline.estimate_page_memory(page_context)
+        for page_context in context.get_page_contexts()
+    )
+    assert rgb > gray > _pipeline.PAGE_BASE_MEMORY
+    assert text == 0  # Skipped, since it has text
+
+
 @pytest.mark.parametrize(
     # Name for nicer -v output
     'name,input,output',
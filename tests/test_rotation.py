@@ -16,6 +16,8 @@ from PIL import Image, ImageChops
 from reportlab.pdfgen.canvas import Canvas
 
 from ocrmypdf._exec import ghostscript
+from ocrmypdf._pageimage import PageImage
+from ocrmypdf._pipeline import rotate_page_image
 from ocrmypdf._plugin_manager import get_plugin_manager
 from ocrmypdf.helpers import IMG2PDF_KWARGS, Resolution
 from ocrmypdf.pdfinfo import PdfInfo
@@ -115,6 +117,26 @@ def test_autorotate(renderer, resources, outdir):
         assert cmp > 0.95
 
 
+def test_autorotate_single_render(resources, outdir):
+    check_ocrmypdf(
+        resources / 'cardinal.pdf',
+        outdir / 'out.pdf',
+        '-r',
+        '--rotate-pages-single-render',
+        '--plugin',
+        'tests/plugins/tesseract_cache.py',
+    )
+    for n in range(1, 4 + 1):
+        cmp = compare_images_monochrome(
+            outdir,
+            reference_pdf=resources / 'cardinal.pdf',
+            reference_pageno=1,
+            test_pdf=outdir / 'out.pdf',
+            test_pageno=n,
+        )
+        assert cmp > 0.95
+
+
 @pytest.mark.parametrize(
     'threshold, op, comparison_threshold',
     [
@@ -317,6 +339,34 @@ def test_rasterize_rotates(resources, tmp_path):
     assert Image.open(img).size == (200, 83), "Image not rotated"
 
 
+@pytest.mark.parametrize('rotation', (90, 180, 270))
+def test_rotate_page_image(rotation, resources, tmp_path):
+    pm = get_plugin_manager([])
+
+    def rasterize(img, rotation):
+        pm.hook.rasterize_pdf_page(
+            input_file=resources / 'graph.pdf',
+            output_file=img,
+            raster_device='pngmono',
+            raster_dpi=Resolution(20, 20),
+            page_dpi=Resolution(20, 30),
+            pageno=1,
+            rotation=rotation,
+            filter_vector=False,
+            stop_on_soft_error=True,
+        )
+        return img
+
+    rotated = rotate_page_image(
+        PageImage(rasterize(tmp_path / 'img.png', 0)), rotation
+    ).file
+    reference = rasterize(tmp_path / 'reference.png', rotation)
+    with Image.open(rotated) as im, Image.open(reference) as ref:
+        assert im.size == ref.size
+        assert im.info['dpi'] == pytest.approx(ref.info['dpi'])
+        assert not ImageChops.difference(im.convert('L'), ref.convert('L')).getbbox()
+
+
 def test_simulated_scan(outdir):
     canvas = Canvas(
         fspath(outdir / 'fakescan.pdf'),
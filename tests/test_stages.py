@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from ocrmypdf._pipelines import _stages
+from ocrmypdf._pipelines._common import PageResult
+from ocrmypdf._pipelines._stages import (
+    Stage,
+    StageLimits,
+    run_stages,
+    set_worker_stage_limits,
+)
+
+from .conftest import check_ocrmypdf
+
+
+def _run(stages, pageno):
+    return run_stages(stages, SimpleNamespace(pageno=pageno), PageResult(pageno=pageno))
+
+
+def test_run_stages():
+    def first(page_context, result):
+        return result._replace(text=Path(f'{page_context.pageno}.txt'))
+
+    def second(page_context, result):
+        return result._replace(ocr=result.text.with_suffix('.pdf'))
+
+    stages = [
+        Stage('first', first, lambda result: True, 1.0),
+        Stage('second', second, lambda result: result.pageno % 2 == 0, 1.0),
+    ]
+    for pageno in range(4):
+        result = _run(stages, pageno)
+        assert result.text == Path(f'{pageno}.txt')
+        if pageno % 2 == 0:
+            assert result.ocr == Path(f'{pageno}.pdf')
+        else:
+            assert result.ocr is None
+
+
+def test_stage_limits():
+    stages = [
+        Stage('start', lambda page_context, result: result, lambda r: True, 0.5),
+        Stage('end', lambda page_context, result: result, lambda r: True, 0.25),
+    ]
+    assert StageLimits(stages, 8, use_threads=True).limits == {'start': 4, 'end': 2}
+    assert StageLimits(stages, 1, use_threads=True).limits == {'start': 1, 'end': 1}
+
+
+def test_run_stages_limited(monkeypatch):
+    lock = threading.Lock()
+    in_stage = peak = 0
+
+    def limited(page_context, result):
+        nonlocal in_stage, peak
+        with lock:
+            in_stage += 1
+            peak = max(peak, in_stage)
+        time.sleep(0.01)
+        with lock:
+            in_stage -= 1
+        return result
+
+    stages = [
+        Stage('free', lambda page_context, result: result, lambda r: True, 1.0),
+        Stage('limited', limited, lambda r: True, 0.25),
+    ]
+    monkeypatch.setattr(_stages, '_worker_stage_limits', None)
+    set_worker_stage_limits(StageLimits(stages, 8, use_threads=True))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(partial(_run, stages), range(20)))
+    assert [result.pageno for result in results] == list(range(20))
+    assert peak <= 2
+
+
+@pytest.mark.parametrize('renderer', ['hocr', 'sandwich'])
+@pytest.mark.parametrize('threads', ['--use-threads', '--no-use-threads'])
+def test_scheduler_stage(renderer, threads, resources, outpdf):
+    check_ocrmypdf(
+        resources / 'multipage.pdf',
+        outpdf,
+        threads,
+        '--scheduler',
+        'stage',
+        '--pdf-renderer',
+        renderer,
+        '--rotate-pages',
+        '--plugin',
+        'tests/plugins/tesseract_noop.py',
+    )
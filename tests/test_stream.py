@@ -0,0 +1,64 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+
+from ocrmypdf._pipelines import ocr
+from ocrmypdf.exceptions import SubprocessOutputError
+from ocrmypdf.pdfinfo import PdfInfo
+
+from .conftest import check_ocrmypdf
+
+RENDERERS = ['hocr', 'sandwich']
+
+
+@pytest.mark.parametrize('renderer', RENDERERS)
+def test_page_image_streamed(renderer, resources, outpdf, outtxt):
+    with patch.object(ocr, 'process_page', wraps=ocr.process_page) as mock:
+        check_ocrmypdf(
+            resources / 'ccitt.pdf',
+            outpdf,
+            '--pdf-renderer',
+            renderer,
+            '--sidecar',
+            outtxt,
+        )
+        mock.assert_not_called()
+    assert PdfInfo(outpdf)[0].has_text
+    assert outtxt.read_text(encoding='utf-8').strip()
+
+
+@pytest.mark.parametrize(
+    'args',
+    [
+        ['--plugin', 'tests/plugins/tesseract_noop.py'],
+        ['--force-ocr'],
+        ['--rotate-pages'],
+        ['--tesseract-timeout', '0'],
+    ],
+)
+def test_page_image_not_streamed(args, resources, outpdf):
+    with patch.object(ocr, 'process_page', wraps=ocr.process_page) as mock:
+        check_ocrmypdf(resources / 'ccitt.pdf', outpdf, *args)
+        mock.assert_called()
+
+
+def test_page_image_stream_failure(resources, outpdf):
+    @contextmanager
+    def failing_stream(page_context):
+        with open(page_context.origin, 'rb') as f:
+            yield f  # Not an image
+        raise SubprocessOutputError()
+
+    with (
+        patch.object(ocr, 'streamed_page_image', failing_stream),
+        patch.object(ocr, 'process_page', wraps=ocr.process_page) as mock,
+    ):
+        check_ocrmypdf(resources / 'ccitt.pdf', outpdf)
+        mock.assert_called()
+    assert PdfInfo(outpdf)[0].has_text
@@ -6,13 +6,17 @@ from __future__ import annotations
 import logging
 import os
 import subprocess
+from argparse import Namespace
 from os import fspath
 from pathlib import Path
+from xml.etree import ElementTree
 
 import pytest
 
 from ocrmypdf import pdfinfo
 from ocrmypdf._exec import tesseract
+from ocrmypdf._pipelines import _memory, _ocr_threads, ocr
+from ocrmypdf._pipelines._ocr_threads import TesseractThreads
 from ocrmypdf.exceptions import BadArgsError, ExitCode, MissingDependencyError
 
 from .conftest import check_ocrmypdf, run_ocrmypdf_api
@@ -110,6 +114,212 @@ def test_image_too_large_pdf(monkeypatch, resources, outdir):
         assert Path(outdir / 'pdf.pdf').stat().st_size == 0
 
 
+HOCR_TWO_PAGES = """<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">
+ <head>
+  <title></title>
+ </head>
+ <body>
+  <div class='ocr_page' id='page_1' title='image "a.png"; bbox 0 0 100 200'>
+   <span class='ocrx_word' id='word_1_1'>first</span>
+  </div>
+  <div class='ocr_page' id='page_2' title='image "b.png"; bbox 0 0 300 400'>
+   <span class='ocrx_word' id='word_2_1'>second</span>
+  </div>
+ </body>
+</html>
+"""
+
+
+def test_split_hocr_pages():
+    pages = tesseract.split_hocr_pages(HOCR_TWO_PAGES)
+    assert len(pages) == 2
+    for page, word in zip(pages, ['first', 'second']):
+        root = ElementTree.fromstring(page.encode())
+        divs = root.findall('.//{http://www.w3.org/1999/xhtml}div')
+        assert len(divs) == 1
+        assert word in page
+
+    assert tesseract.split_hocr_pages('<html><body></body></html>') == []
+
+
+def test_hocr_batch_failure(monkeypatch, resources, outdir):
+    def dummy_run(args, *, env=None, **kwargs):
+        raise subprocess.CalledProcessError(1, 'tesseract', output=b'Empty page!!')
+
+    monkeypatch.setattr(tesseract, 'run', dummy_run)
+    assert not tesseract.generate_hocr_batch(
+        input_files=[resources / 'crom.png', resources / 'crom.png'],
+        output_hocrs=[outdir / '1.hocr', outdir / '2.hocr'],
+        output_texts=[outdir / '1.txt', outdir / '2.txt'],
+        languages=['eng'],
+        engine_mode=None,
+        tessconfig=[],
+        timeout=180.0,
+        pagesegmode=None,
+        thresholding=0,
+        user_words=None,
+        user_patterns=None,
+    )
+
+
+@pytest.mark.parametrize(
+    'user_limit, expected',
+    [(None, '2'), ('1', None)],
+)
+def test_thread_limit(user_limit, expected, monkeypatch, resources):
+    if user_limit is None:
+        monkeypatch.delenv('OMP_THREAD_LIMIT', raising=False)
+    else:
+        monkeypatch.setenv('OMP_THREAD_LIMIT', user_limit)
+    envs = []
+
+    def dummy_run(args, *, env=None, **kwargs):
+        envs.append(env)
+        raise subprocess.CalledProcessError(
+            1, 'tesseract', output=b'Too few characters. Skipping this page'
+        )
+
+    monkeypatch.setattr(tesseract, 'run', dummy_run)
+    with tesseract.thread_limit(2):
+        tesseract.get_orientation(resources / 'crom.png', None, 180.0)
+    tesseract.get_orientation(resources / 'crom.png', None, 180.0)
+
+    if expected is None:
+        assert envs == [None, None]  # The user's limit in os.environ applies
+    else:
+        assert envs[0]['OMP_THREAD_LIMIT'] == expected
+        assert envs[1] is None
+    assert os.environ.get('OMP_THREAD_LIMIT') == user_limit
+
+
+def test_tesseract_threads():
+    threads = TesseractThreads(8, 6, use_threads=True)
+    with threads.allocate() as first:
+        assert first == 1  # More pages than jobs
+    for _ in range(4):
+        threads.page_finished()
+    with threads.allocate() as first, threads.allocate() as second:
+        assert (first, second) == (3, 3)  # Capped at the most effective count
+        with threads.allocate() as third:
+            assert third == 2  # Only two jobs left
+            with threads.allocate() as fourth:
+                assert fourth == 1  # Always at least one
+
+
+def test_tesseract_threads_unshared(monkeypatch):
+    def no_lock():
+        raise OSError("no process synchronization")
+
+    monkeypatch.setattr(_ocr_threads.multiprocessing, 'Lock', no_lock)
+    threads = _ocr_threads.page_tesseract_threads(
+        Namespace(jobs=8, use_threads=False), 4
+    )
+    # Each process gets a share of the jobs fixed for the document
+    with threads.allocate() as first, threads.allocate() as second:
+        assert (first, second) == (2, 2)
+
+
+def test_tesseract_batch_size(resources, outdir):
+    sidecar = outdir / 'sidecar.txt'
+    check_ocrmypdf(
+        resources / 'cardinal.pdf',
+        outdir / 'out.pdf',
+        '--pdf-renderer',
+        'hocr',
+        '--tesseract-batch-size',
+        '3',
+        '--sidecar',
+        sidecar,
+    )
+    pages = sidecar.read_text(encoding='utf-8').split('\f')
+    assert len(pages) == 4
+    assert all('the' in page.lower() for page in pages)
+
+
+def test_tesseract_batch_thread_limit(resources, outdir, monkeypatch):
+    monkeypatch.delenv('OMP_THREAD_LIMIT', raising=False)
+    thread_limits = []
+    ocr_engine_hocr_batch = ocr.ocr_engine_hocr_batch
+
+    def limited_ocr_engine_hocr_batch(*args):
+        thread_limits.append((tesseract._env() or {}).get('OMP_THREAD_LIMIT'))
+        return ocr_engine_hocr_batch(*args)
+
+    monkeypatch.setattr(ocr, 'ocr_engine_hocr_batch', limited_ocr_engine_hocr_batch)
+    check_ocrmypdf(
+        resources / 'cardinal.pdf',
+        outdir / 'out.pdf',
+        '--pdf-renderer',
+        'hocr',
+        '--tesseract-batch-size',
+        '2',
+        '--jobs',
+        '2',
+    )
+    assert thread_limits
+    assert all(limit is not None for limit in thread_limits)
+
+
+def test_tesseract_batch_streamed(resources, outdir, monkeypatch):
+    events = []
+    exec_page_prepare = ocr._exec_page_prepare
+    exec_ocr_batch = ocr._exec_ocr_batch
+
+    def recorded_exec_page_prepare(page_context):
+        events.append('prepare')
+        return exec_page_prepare(page_context)
+
+    def recorded_exec_ocr_batch(batch):
+        events.append('ocr')
+        return exec_ocr_batch(batch)
+
+    monkeypatch.setattr(ocr, '_exec_page_prepare', recorded_exec_page_prepare)
+    monkeypatch.setattr(ocr, '_exec_ocr_batch', recorded_exec_ocr_batch)
+    check_ocrmypdf(
+        resources / 'cardinal.pdf',
+        outdir / 'out.pdf',
+        '--pdf-renderer',
+        'hocr',
+        '--tesseract-batch-size',
+        '2',
+        '--jobs',
+        '1',
+        '--plugin',
+        'tests/plugins/tesseract_noop.py',
+    )
+    # The first batch is OCRed before the remaining pages are prepared
+    assert events == ['prepare', 'prepare', 'ocr', 'prepare', 'prepare', 'ocr']
+
+
+def test_tesseract_batch_memory_reserved(resources, outdir, monkeypatch):
+    reserved = []
+    exec_ocr_batch = ocr._exec_ocr_batch
+
+    def recorded_exec_ocr_batch(batch):
+        reserved.append(_memory._worker_budget.used)
+        return exec_ocr_batch(batch)
+
+    monkeypatch.setattr(ocr, '_exec_ocr_batch', recorded_exec_ocr_batch)
+    check_ocrmypdf(
+        resources / 'cardinal.pdf',
+        outdir / 'out.pdf',
+        '--pdf-renderer',
+        'hocr',
+        '--tesseract-batch-size',
+        '2',
+        '--jobs',
+        '1',
+        '--max-memory',
+        '100000',
+        '--plugin',
+        'tests/plugins/tesseract_noop.py',
+    )
+    # The pages of each batch are still reserved while they are OCRed
+    assert reserved
+    assert all(nbytes > 0 for nbytes in reserved)
+
+
 def test_timeout(caplog):
     tesseract.page_timedout(5)
     assert "took too long" in caplog.text
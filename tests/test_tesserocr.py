@@ -0,0 +1,114 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from ocrmypdf._plugin_manager import get_parser_options_plugins
+from ocrmypdf.builtin_plugins import tesserocr_ocr
+from ocrmypdf.exceptions import SubprocessOutputError
+
+from .conftest import check_ocrmypdf
+
+# pylint: disable=redefined-outer-name
+
+
+def test_library_backend_falls_back(monkeypatch, caplog, resources, no_outpdf):
+    monkeypatch.setattr(tesserocr_ocr, 'TESSEROCR_AVAILABLE', False)
+    _parser, options, _pm = get_parser_options_plugins(
+        [
+            '--tesseract-backend',
+            'library',
+            str(resources / 'trivial.pdf'),
+            str(no_outpdf),
+        ]
+    )
+    tesserocr_ocr.check_options(options)
+    assert options.tesseract_backend == 'cli'
+    assert 'tesserocr' in caplog.text
+    assert tesserocr_ocr.get_ocr_engine() is None
+
+
+@pytest.mark.parametrize('renderer', ['hocr', 'sandwich'])
+def test_library_backend(renderer, resources, outdir):
+    pytest.importorskip('tesserocr')
+    sidecar = outdir / 'sidecar.txt'
+    check_ocrmypdf(
+        resources / 'cardinal.pdf',
+        outdir / 'out.pdf',
+        '--tesseract-backend',
+        'library',
+        '--pdf-renderer',
+        renderer,
+        '--rotate-pages',
+        '--deskew',
+        '--sidecar',
+        sidecar,
+    )
+    pages = sidecar.read_text(encoding='utf-8').split('\f')
+    assert len(pages) == 4
+    assert all('the' in page.lower() for page in pages)
+
+
+def test_tesserocr_imported_lazily():
+    # libtesseract must not be loaded before the OpenMP thread limit is set
+    p = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            'import sys, ocrmypdf.builtin_plugins.tesserocr_ocr; '
+            'print("tesserocr" in sys.modules)',
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert p.stdout.strip() == 'False'
+
+
+class FailingApi:
+    def SetVariable(self, name, value):
+        pass
+
+    def ProcessPages(self, prefix, input_file, timeout):
+        return False
+
+    def Clear(self):
+        pass
+
+
+@pytest.mark.parametrize('timed_out', [True, False])
+def test_library_backend_error(timed_out, monkeypatch, tmp_path, caplog):
+    monkeypatch.setitem(
+        sys.modules, 'tesserocr', SimpleNamespace(PSM=SimpleNamespace(AUTO=3))
+    )
+    monkeypatch.setattr(tesserocr_ocr, '_get_api', lambda *args: FailingApi())
+    monkeypatch.setattr(tesserocr_ocr.tesseract, 'has_thresholding', lambda: False)
+    # The time runs out at once, or never
+    clock = iter([0.0, 10.0 if timed_out else 0.1])
+    monkeypatch.setattr(tesserocr_ocr.time, 'monotonic', lambda: next(clock))
+    kwargs = dict(
+        input_file=tmp_path / 'page.png',
+        output_hocr=tmp_path / 'page.hocr',
+        output_text=tmp_path / 'page.txt',
+        languages=['eng'],
+        engine_mode=None,
+        tessconfig=[],
+        timeout=5.0,
+        pagesegmode=None,
+        thresholding=0,
+        user_words=None,
+        user_patterns=None,
+    )
+    if timed_out:
+        tesserocr_ocr.generate_hocr(**kwargs)
+        assert 'took too long' in caplog.text
+        assert (tmp_path / 'page.txt').read_text() == '[skipped page]'
+    else:
+        with pytest.raises(SubprocessOutputError):
+            tesserocr_ocr.generate_hocr(**kwargs)
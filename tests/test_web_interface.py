@@ -0,0 +1,368 @@
+# SPDX-FileCopyrightText: 2025 James R. Barlow
+# SPDX-License-Identifier: MPL-2.0
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import queue
+import time
+import zipfile
+from concurrent.futures import Future
+
+import pytest
+
+from ocrmypdf.exceptions import PriorOcrFoundError
+
+pytest.importorskip('flask')
+
+import web_interface  # noqa: E402
+
+PDF = b'%PDF-1.7\n%%EOF\n'
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = web_interface.ResultStore(tmp_path / 'results', ttl=3600, max_size=10**9)
+    monkeypatch.setattr(web_interface, 'result_store', store)
+    monkeypatch.setitem(web_interface.app.config, 'RESULT_FOLDER', str(store.folder))
+    return store
+
+
+@pytest.fixture
+def client(store):
+    return web_interface.app.test_client()
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    monkeypatch.setitem(web_interface.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    return web_interface.Upload('scan.pdf', size=8, chunk_size=4)
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_upload_chunks(upload):
+    assert upload.missing() == [0, 1]
+    assert upload.write_chunk(1, io.BytesIO(b'5678'), _sha256(b'5678')) is None
+    assert upload.missing() == [0]
+    assert upload.write_chunk(0, io.BytesIO(b'1234'), _sha256(b'1234')) is None
+    assert upload.missing() == []
+    assert upload.input_path.read_bytes() == b'12345678'
+
+
+def test_upload_bad_resend(upload):
+    assert upload.write_chunk(0, io.BytesIO(b'1234'), _sha256(b'1234')) is None
+
+    # Resending an accepted chunk with the wrong content or length leaves it intact
+    assert upload.write_chunk(0, io.BytesIO(b'abcd'), _sha256(b'1234')) is not None
+    assert upload.write_chunk(0, io.BytesIO(b'12345'), _sha256(b'12345')) is not None
+    assert upload.write_chunk(0, io.BytesIO(b'12'), _sha256(b'12')) is not None
+    assert upload.missing() == [1]
+    assert upload.input_path.read_bytes()[:4] == b'1234'
+
+
+class FinishedPool:
+    """Complete each OCR job at once by copying its input to its output."""
+
+    def submit(self, fn, job_id, input_path, output_path, options):
+        output_path.write_bytes(input_path.read_bytes())
+        future = Future()
+        future.set_result(0)
+        return future
+
+
+class FailingPool:
+    """Fail each OCR job as if its input already had text."""
+
+    def submit(self, fn, job_id, input_path, output_path, options):
+        future = Future()
+        future.set_exception(PriorOcrFoundError("page already has text"))
+        return future
+
+
+@pytest.fixture
+def service(store, tmp_path, monkeypatch):
+    """Isolate the job queue and records; queued jobs run on run_queued()."""
+    monkeypatch.setitem(web_interface.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    for name in ('jobs', 'batches', 'uploads', 'inflight'):
+        monkeypatch.setattr(web_interface, name, {})
+    monkeypatch.setattr(web_interface, 'job_queue', queue.Queue(maxsize=4))
+    monkeypatch.setattr(
+        web_interface, 'result_cache', web_interface.ResultCache(tmp_path / 'cache', 0)
+    )
+    monkeypatch.setattr(web_interface, 'ocr_pool', FinishedPool())
+    monkeypatch.setattr(web_interface, 'start_workers', lambda: None)
+
+
+def run_queued():
+    """Process the queued jobs, as the OCR worker threads would."""
+    while not web_interface.job_queue.empty():
+        web_interface.process_job(web_interface.job_queue.get_nowait())
+
+
+def post_files(client, url, *files):
+    data = {'file': [(io.BytesIO(content), name) for name, content in files]}
+    return client.post(url, data=data, content_type='multipart/form-data')
+
+
+def test_api_queue_full(client, store, service, tmp_path, monkeypatch):
+    monkeypatch.setattr(web_interface, 'job_queue', queue.Queue(maxsize=1))
+    web_interface.job_queue.put_nowait(None)
+
+    response = post_files(client, '/api/process', ('scan.pdf', PDF))
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert not web_interface.jobs
+    assert not store.reserved
+    assert not list(tmp_path.glob('*_input_*'))
+
+
+def test_api_job_done(client, store, service):
+    response = post_files(client, '/api/process', ('scan.pdf', PDF))
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] == 'queued'
+    assert response.headers['Location'] == job['status_url']
+
+    run_queued()
+    job = client.get(job['status_url']).get_json()
+    assert job['status'] == 'done'
+    assert job['output_file'] == 'scan_ocr.pdf'
+    download = client.get(job['download_url'])
+    assert download.status_code == 200
+    assert download.data == PDF
+
+
+def test_api_job_failed(client, store, service, monkeypatch):
+    monkeypatch.setattr(web_interface, 'ocr_pool', FailingPool())
+    job = post_files(client, '/api/process', ('scan.pdf', PDF)).get_json()
+
+    run_queued()
+    job = client.get(job['status_url']).get_json()
+    assert job['status'] == 'failed'
+    assert 'page already has text' in job['error']
+    assert not store.reserved
+    assert not store.path('scan_ocr.pdf').exists()
+    assert client.get('/download/scan_ocr.pdf').status_code == 302
+
+
+def test_process_job_cache_failure(tmp_path, monkeypatch):
+    def put(key, output_path):
+        raise OSError("cache is full")
+
+    monkeypatch.setitem(web_interface.app.config, 'RESULT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(web_interface, 'ocr_pool', FinishedPool())
+    monkeypatch.setattr(web_interface.result_cache, 'put', put)
+    input_path = tmp_path / 'input.pdf'
+    input_path.write_bytes(b'%PDF-1.7')
+    job = web_interface.Job(input_path, 'output.pdf', 'input.pdf', {})
+
+    web_interface.process_job(job)
+    assert job.status == 'done'
+    assert job.output_path.read_bytes() == b'%PDF-1.7'
+
+
+def test_output_names_reserved(client, store):
+    first = store.reserve('scan.pdf')
+    second = store.reserve('scan.pdf')
+    assert (first, second) == ('scan_ocr.pdf', 'scan_ocr_2.pdf')
+    assert not any(store.folder.iterdir())
+
+    # The output of an unfinished job is not served, even once it is written
+    store.path(first).write_bytes(b'%PDF-1.7 partial')
+    assert client.get(f'/download/{first}').status_code == 302
+    assert client.get(f'/results?files={first}').status_code == 302
+
+    store.release(first)
+    response = client.get(f'/download/{first}')
+    assert response.status_code == 200
+    assert response.data == b'%PDF-1.7 partial'
+
+
+def test_api_batch_mixed(client, store, service, tmp_path):
+    response = post_files(
+        client, '/api/batch', ('scan.pdf', PDF), ('notes.txt', b'not a scan')
+    )
+    assert response.status_code == 400
+    assert 'notes.txt' in response.get_json()['error']
+    assert 'scan.pdf' not in response.get_json()['error']
+
+    # Nothing of the batch is kept, not even the valid file
+    assert not web_interface.jobs
+    assert web_interface.job_queue.empty()
+    assert not store.reserved
+    assert not list(tmp_path.glob('*_input_*'))
+
+
+def test_api_batch(client, store, service):
+    response = post_files(client, '/api/batch', ('a.pdf', PDF), ('b.pdf', PDF))
+    assert response.status_code == 202
+    batch = response.get_json()
+    assert (batch['status'], batch['total'], batch['completed']) == ('running', 2, 0)
+
+    run_queued()
+    batch = client.get(batch['status_url']).get_json()
+    assert (batch['status'], batch['completed']) == ('done', 2)
+    assert [job['output_file'] for job in batch['jobs']] == ['a_ocr.pdf', 'b_ocr.pdf']
+
+
+def test_download_all_zip(client, store):
+    contents = {'a_ocr.pdf': PDF, 'b_ocr.pdf': PDF * 3}
+    for name, content in contents.items():
+        store.path(name).write_bytes(content)
+    pending = store.reserve('c.pdf')
+    store.path(pending).write_bytes(b'%PDF-1.7 partial')
+
+    # The unfinished result is left out of the archive
+    response = client.get(f"/download_all/a_ocr.pdf,b_ocr.pdf,{pending}")
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == sorted(contents)
+        for name, content in contents.items():
+            assert archive.read(name) == content
+
+
+def test_stream_zip_chunks(tmp_path):
+    path = tmp_path / 'scan_ocr.pdf'
+    path.write_bytes(PDF * 10)
+
+    # Entries larger than a chunk are streamed in several pieces
+    pieces = list(web_interface.stream_zip([path], chunk_size=16))
+    assert len([piece for piece in pieces if piece]) > 2
+    with zipfile.ZipFile(io.BytesIO(b''.join(pieces))) as archive:
+        assert archive.getinfo('scan_ocr.pdf').compress_type == zipfile.ZIP_STORED
+        assert archive.read('scan_ocr.pdf') == PDF * 10
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_sweep_results(store, service, tmp_path):
+    for name in ('expired_ocr.pdf', 'live_ocr.pdf', 'running_ocr.pdf'):
+        store.path(name).write_bytes(PDF)
+    _age(store.path('expired_ocr.pdf'), 2 * 3600)
+    _age(store.path('running_ocr.pdf'), 2 * 3600)
+    running = web_interface.Job(
+        tmp_path / 'running_input.pdf', 'running_ocr.pdf', 'running.pdf', {}
+    )
+    web_interface.jobs[running.id] = running
+
+    web_interface.sweep()
+    assert sorted(path.name for path in store.folder.iterdir()) == [
+        'live_ocr.pdf',
+        'running_ocr.pdf',
+    ]
+    assert store.stats()['files_held'] == 1
+    assert store.stats()['bytes_removed'] == len(PDF)
+
+
+def test_sweep_results_quota(tmp_path):
+    store = web_interface.ResultStore(tmp_path, ttl=3600, max_size=2 * len(PDF))
+    for age, name in enumerate(['c_ocr.pdf', 'b_ocr.pdf', 'a_ocr.pdf']):
+        store.path(name).write_bytes(PDF)
+        _age(store.path(name), age * 60)
+
+    # The least recently used result is removed to fit the quota
+    store.sweep()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'b_ocr.pdf',
+        'c_ocr.pdf',
+    ]
+
+
+def test_job_events_done(client, store, service):
+    job = post_files(client, '/api/process', ('scan.pdf', PDF)).get_json()
+    run_queued()
+
+    response = client.get(f"/api/jobs/{job['job_id']}/events")
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    # A finished job sends its final status as the only event, then ends
+    events = response.get_data(as_text=True).split('\n\n')
+    assert events[-1] == ''
+    [event] = events[:-1]
+    kind, data = event.split('\n')
+    assert kind == 'event: done'
+    assert data.startswith('data: ')
+    info = json.loads(data.removeprefix('data: '))
+    assert info['job_id'] == job['job_id']
+    assert info['output_file'] == 'scan_ocr.pdf'
+
+
+def test_job_events_unknown(client):
+    assert client.get('/api/jobs/nonexistent/events').status_code == 404
+
+
+def scrape_metrics(client):
+    """Return the samples of /metrics as {name with labels: value}."""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics_after_job(client, store, service):
+    before = scrape_metrics(client)
+    job = post_files(client, '/api/process', ('scan.pdf', PDF)).get_json()
+    assert scrape_metrics(client)['ocrmypdf_queue_depth'] == 1
+
+    run_queued()
+    assert client.get(job['status_url']).get_json()['status'] == 'done'
+    after = scrape_metrics(client)
+    jobs_ok = 'ocrmypdf_jobs_total{exit_code="ok"}'
+    assert after[jobs_ok] == before.get(jobs_ok, 0) + 1
+    pages = 'ocrmypdf_pages_processed_total'
+    assert after[pages] == before[pages] + 1
+    count = 'ocrmypdf_job_seconds_count'
+    assert after[count] == before.get(count, 0) + 1
+    assert after['ocrmypdf_queue_depth'] == 0
+
+    # The result store is measured by the janitor
+    web_interface.sweep()
+    assert scrape_metrics(client)['ocrmypdf_result_store_files'] == 1
+
+
+def test_result_cache_get(tmp_path):
+    cache = web_interface.ResultCache(tmp_path / 'cache', 10**6)
+    output_path = tmp_path / 'output.pdf'
+    output_path.write_bytes(PDF)
+    cache.put('key', output_path)
+
+    copy_path = tmp_path / 'copy.pdf'
+    assert cache.get('key', copy_path)
+    assert copy_path.read_bytes() == PDF
+
+    # An entry evicted before it could be copied is a cache miss
+    next(cache.folder.glob('*.pdf')).unlink()
+    missing_path = tmp_path / 'missing.pdf'
+    assert not cache.get('key', missing_path)
+    assert not missing_path.exists()
+
+
+def test_api_cached_job(client, store, service, tmp_path, monkeypatch):
+    cache = web_interface.ResultCache(tmp_path / 'cache', 10**6)
+    monkeypatch.setattr(web_interface, 'result_cache', cache)
+    post_files(client, '/api/process', ('scan.pdf', PDF))
+    run_queued()
+
+    # The same file with the same options is answered from the cache at once
+    response = post_files(client, '/api/process', ('scan.pdf', PDF))
+    assert response.status_code == 200
+    job = response.get_json()
+    assert (job['status'], job['output_file']) == ('done', 'scan_ocr_2.pdf')
+    assert web_interface.job_queue.empty()
+    assert client.get(job['download_url']).data == PDF
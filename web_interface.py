@@ -4,17 +4,52 @@ Simple Flask web interface for OCRmyPDF
 Allows uploading PDF/image files, running OCR, and downloading the result.
 """
 
+import hashlib
+import io
+import json
+import multiprocessing
 import os
+import queue
+import shutil
 import tempfile
+import threading
+import time
 import uuid
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
 from pathlib import Path
-from flask import Flask, request, render_template, send_file, flash, redirect, url_for, jsonify
+from flask import (
+    Flask, Request, Response, request, render_template, send_file, flash, redirect,
+    url_for, jsonify, stream_with_context
+)
 from werkzeug.utils import secure_filename
+import pikepdf
 import ocrmypdf
-from ocrmypdf.exceptions import ExitCode
+from ocrmypdf._exec import ghostscript, tesseract
+from ocrmypdf._plugin_manager import get_plugin_manager
+from ocrmypdf.exceptions import ExitCode, MissingDependencyError
+from ocrmypdf.helpers import available_cpu_count
+import web_plugin
+
+# Files sent together to /api/batch; each may be as large as MAX_CONTENT_LENGTH
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', '20'))
+
+class WebRequest(Request):
+    """Request whose size limit applies per file, including in a batch."""
+
+    @property
+    def max_content_length(self):
+        """Allow room for a full batch of files in a request to /api/batch."""
+        limit = super().max_content_length
+        if limit is not None and self.endpoint == 'api_batch':
+            # One file's worth more leaves room for the form fields; each file
+            # is checked against the limit on its own in api_batch
+            return limit * (BATCH_MAX_FILES + 1)
+        return limit
 
 app = Flask(__name__)
+app.request_class = WebRequest
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
 
@@ -25,31 +60,866 @@ ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'tif', 'bmp', 'gif'}
 UPLOAD_FOLDER = tempfile.gettempdir()
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Processed files are kept in a managed result store until they expire, in at
+# most RESULT_STORE_SIZE bytes
+RESULT_FOLDER = os.environ.get(
+    'RESULT_FOLDER', os.path.join(UPLOAD_FOLDER, 'ocrmypdf-web-results')
+)
+app.config['RESULT_FOLDER'] = RESULT_FOLDER
+RESULT_TTL = int(os.environ.get('RESULT_TTL', '3600'))  # seconds since last use
+RESULT_STORE_SIZE = int(os.environ.get('RESULT_STORE_SIZE', str(2 * 1024**3)))
+JANITOR_INTERVAL = int(os.environ.get('JANITOR_INTERVAL', '60'))  # seconds
+
+# Files too large for one request are uploaded in chunks of at most this many
+# bytes, up to a total size of MAX_UPLOAD_SIZE bytes
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', str(4 * 1024 * 1024 * 1024)))
+
+# OCR job queue: request handlers enqueue jobs, a pool of OCR workers drains it
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', '32'))
+JOB_RETENTION = int(os.environ.get('JOB_RETENTION', '3600'))  # seconds
+
+# Worker slots shared by all running jobs; one slot processes one page at a time
+OCR_SLOTS = int(os.environ.get('OCR_SLOTS', str(available_cpu_count())))
+
+# Finished outputs are cached by upload content and OCR options, in at most
+# RESULT_CACHE_SIZE bytes
+RESULT_CACHE_FOLDER = os.environ.get(
+    'RESULT_CACHE_FOLDER', os.path.join(UPLOAD_FOLDER, 'ocrmypdf-web-cache')
+)
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', str(1024 * 1024 * 1024)))
+
+# Pages each long-lived Ghostscript render server renders before it is replaced;
+# 0 starts Ghostscript for every page
+GS_RENDER_SERVER = int(os.environ.get('GS_RENDER_SERVER', '0'))
+
+class SlotScheduler:
+    """Share a fixed budget of OCR worker slots between concurrent jobs.
+
+    Each job asks for as many slots as it has pages and is granted what is
+    left of the budget, but at least one slot, so the total number of pages
+    in flight stays close to the number of CPUs however many jobs run.
+    """
+
+    def __init__(self, slots):
+        """Start with all slots free."""
+        self.slots = slots
+        self.free = slots
+        self.condition = threading.Condition()
+
+    def acquire(self, wanted):
+        """Wait until a slot is free and return the number of slots granted."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.free > 0)
+            granted = max(1, min(wanted, self.free))
+            self.free -= granted
+            return granted
+
+    def release(self, granted):
+        """Return the slots granted to a job that has finished."""
+        with self.condition:
+            self.free += granted
+            self.condition.notify_all()
+
+    def in_use(self):
+        """Return the number of slots granted to running jobs."""
+        with self.condition:
+            return self.slots - self.free
+
+class Metrics:
+    """Counters and histograms, rendered in the Prometheus text format."""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+    def __init__(self):
+        """Start with no metrics; each is declared with describe()."""
+        self.lock = threading.Lock()
+        self.descriptions = {}  # name -> (type, help)
+        self.counters = {}  # name -> {labels: value}
+        self.histograms = {}  # name -> {labels: [bucket counts, sum, count]}
+
+    def describe(self, name, kind, help_text):
+        """Declare a metric of kind 'counter', 'histogram' or 'gauge'."""
+        self.descriptions[name] = (kind, help_text)
+        if kind == 'counter':
+            self.counters[name] = {}
+        elif kind == 'histogram':
+            self.histograms[name] = {}
+
+    def inc(self, name, amount=1, **labels):
+        """Add amount to the counter with the given labels."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Count value in the histogram with the given labels."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms[name]
+            if key not in series:
+                series[key] = [[0] * len(self.BUCKETS), 0.0, 0]
+            buckets, _, _ = series[key]
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            series[key][1] += value
+            series[key][2] += 1
+
+    def render(self, gauges):
+        """Return all metrics, plus the given {name: value} gauges, as text."""
+        lines = []
+
+        def header(name):
+            kind, help_text = self.descriptions[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            for name, series in self.counters.items():
+                header(name)
+                if not series:
+                    series = {(): 0}
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{format_labels(key)} {value}")
+            for name, series in self.histograms.items():
+                header(name)
+                for key, (buckets, total, count) in sorted(series.items()):
+                    for bound, bucket_count in zip(self.BUCKETS, buckets):
+                        labels = format_labels(key + (('le', str(bound)),))
+                        lines.append(f"{name}_bucket{labels} {bucket_count}")
+                    labels = format_labels(key + (('le', '+Inf'),))
+                    lines.append(f"{name}_bucket{labels} {count}")
+                    lines.append(f"{name}_sum{format_labels(key)} {total}")
+                    lines.append(f"{name}_count{format_labels(key)} {count}")
+        for name, value in gauges.items():
+            header(name)
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+def format_labels(key):
+    """Format label pairs as {name="value",...}, or nothing if there are none."""
+    if not key:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in key)
+    return f"{{{pairs}}}"
+
+class ResultCache:
+    """On-disk cache of OCR outputs, evicting least recently used files.
+
+    Entries are named after their key. A file's modification time records
+    when it was last used, so the cache survives restarts.
+    """
+
+    def __init__(self, folder, max_size):
+        """Use folder for the cache, holding at most max_size bytes."""
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return self.folder / f"{key}.pdf"
+
+    def get(self, key, output_path):
+        """Copy the cached output for key to output_path; False if there is none.
+
+        The copy is made under the lock, so the entry cannot be evicted while it
+        is being copied.
+        """
+        path = self._path(key)
+        with self.lock:
+            try:
+                os.utime(path)
+                shutil.copyfile(path, output_path)
+            except FileNotFoundError:
+                return False
+            except OSError:
+                Path(output_path).unlink(missing_ok=True)
+                raise
+        return True
+
+    def put(self, key, output_path):
+        """Store a copy of output_path under key, then evict to fit the budget."""
+        if self.max_size <= 0:
+            return
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{uuid.uuid4()}.tmp")
+        try:
+            shutil.copyfile(output_path, temp_path)
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+            raise
+        with self.lock:
+            os.replace(temp_path, path)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self.folder.glob('*.pdf'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+class ResultStore:
+    """Directory of processed files with expiry and a disk quota.
+
+    A result expires RESULT_TTL seconds after it was produced or last
+    downloaded; its modification time records that. When the store is over
+    its quota the least recently used results are removed first. Results of
+    jobs that are still running are never removed.
+
+    Output names are reserved in memory while their jobs are queued or
+    running, and only served once the job has finished and released them.
+    """
+
+    def __init__(self, folder, ttl, max_size):
+        """Keep results in folder for ttl seconds, in at most max_size bytes."""
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.bytes_held = 0
+        self.files_held = 0
+        self.bytes_removed = 0
+        self.reserved = set()
+
+    def path(self, filename):
+        """Return where the result named filename is kept."""
+        return self.folder / filename
+
+    def reserve(self, original_filename):
+        """Reserve a unique output name for original_filename."""
+        with self.lock:
+            output_filename = generate_output_filename(
+                original_filename, self.folder, self.reserved
+            )
+            self.reserved.add(output_filename)
+        return output_filename
+
+    def release(self, filename):
+        """Release a reserved name once its job has finished or was dropped."""
+        with self.lock:
+            self.reserved.discard(filename)
+
+    def ready(self, filename):
+        """Whether filename is a finished result that can be downloaded."""
+        with self.lock:
+            if filename in self.reserved:
+                return False
+        return self.path(filename).is_file()
+
+    def touch(self, filename):
+        """Mark a result as used now, postponing its expiry."""
+        try:
+            os.utime(self.path(filename))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self, active=()):
+        """Remove expired results, then evict until the store fits its quota.
+
+        Names in active belong to unfinished jobs and are left alone.
+        """
+        with self.lock:
+            cutoff = time.time() - self.ttl
+            entries = []
+            for path in self.folder.iterdir():
+                if path.name in active:
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            count = len(entries)
+            for mtime, size, path in sorted(entries):
+                if mtime >= cutoff and total <= self.max_size:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                count -= 1
+                self.bytes_removed += size
+            self.bytes_held = total
+            self.files_held = count
+
+    def stats(self):
+        """Report what the store held after the last sweep."""
+        with self.lock:
+            return {
+                'bytes_held': self.bytes_held,
+                'files_held': self.files_held,
+                'bytes_removed': self.bytes_removed,
+                'max_bytes': self.max_size,
+            }
+
+class Upload:
+    """A file being uploaded in chunks.
+
+    Chunks are written in place into the file that becomes the job's input,
+    so the assembled file is never copied.
+    """
+
+    def __init__(self, filename, size, chunk_size):
+        """Create the upload's input file at its full size, to be filled by chunks."""
+        self.id = str(uuid.uuid4())
+        self.filename = filename
+        self.size = size
+        self.chunk_size = chunk_size
+        self.chunks = max(1, ceil(size / chunk_size))
+        upload_folder = Path(app.config['UPLOAD_FOLDER'])
+        self.input_path = upload_folder / f"{self.id}_input_{filename}"
+        self.received = {}  # chunk index -> SHA-256 of the chunk
+        self.lock = threading.Lock()
+        self.updated = time.time()
+        with open(self.input_path, 'wb') as f:
+            f.truncate(size)
+
+    def chunk_length(self, index):
+        """Return the length of chunk index; the last chunk may be short."""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def write_chunk(self, index, stream, expected_sha256):
+        """Write chunk index from stream, checking its length and checksum.
+
+        The chunk is buffered and only written into the file once it checks out,
+        so a bad resend cannot corrupt a chunk that was already accepted.
+
+        Returns an error message, or None if the chunk was stored.
+        """
+        length = self.chunk_length(index)
+        digest = hashlib.sha256()
+        received = 0
+        with tempfile.SpooledTemporaryFile(max_size=length) as buffer:
+            while data := stream.read(min(1024 * 1024, length + 1 - received)):
+                received += len(data)
+                if received > length:
+                    break
+                digest.update(data)
+                buffer.write(data)
+            if received != length:
+                return f"Chunk {index} must be {length} bytes"
+            if digest.hexdigest() != expected_sha256.lower():
+                return f"Chunk {index} does not match its checksum"
+
+            # The chunk is missing until it has been written in full
+            with self.lock:
+                self.received.pop(index, None)
+            buffer.seek(0)
+            with open(self.input_path, 'r+b') as f:
+                f.seek(index * self.chunk_size)
+                shutil.copyfileobj(buffer, f)
+        with self.lock:
+            self.received[index] = digest.hexdigest()
+            self.updated = time.time()
+        return None
+
+    def missing(self):
+        """Return the indexes of the chunks not received yet."""
+        with self.lock:
+            return [i for i in range(self.chunks) if i not in self.received]
+
+    def to_dict(self):
+        """Describe the upload, so an interrupted client knows what to resend."""
+        return {
+            'upload_id': self.id,
+            'filename': self.filename,
+            'size': self.size,
+            'chunk_size': self.chunk_size,
+            'chunks': self.chunks,
+            'missing': self.missing(),
+        }
+
+def cache_key(upload_digest, options):
+    """Combine the upload's hash with a canonical form of the OCR options."""
+    canonical = json.dumps(
+        {'ocrmypdf': ocrmypdf.__version__, 'options': options},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(f"{upload_digest}:{canonical}".encode()).hexdigest()
+
+class Job:
+    """An OCR request waiting for, or processed by, an OCR worker."""
+
+    def __init__(self, input_path, output_filename, original_name, options):
+        """Create a queued job that OCRs input_path to output_filename."""
+        self.id = str(uuid.uuid4())
+        self.input_path = input_path
+        self.output_filename = output_filename
+        self.original_name = original_name
+        self.options = options
+        self.status = 'queued'
+        self.error = None
+        self.size = None
+        self.pages = 1
+        self.slots = 0
+        self.key = None
+        self.followers = []  # identical jobs waiting for this one to finish
+        self.progress = None  # latest progress event from the OCR worker
+        self.stage_started = None
+        self.version = 0  # incremented on every change clients should see
+        self.changed = threading.Condition()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    @property
+    def output_path(self):
+        """Where the job writes its output, in the result store."""
+        return Path(app.config['RESULT_FOLDER']) / self.output_filename
+
+    def finish(self):
+        """Release the job's output name and wake up everyone waiting for it."""
+        result_store.release(self.output_filename)
+        self.done.set()
+        self.notify()
+
+    def notify(self):
+        """Wake up clients following this job's events."""
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def update_progress(self, event):
+        """Record a progress event and estimate the time left in its stage."""
+        if not self.progress or self.progress['stage'] != event['stage']:
+            self.stage_started = event['time']
+        eta = None
+        completed, total = event['completed'], event['total']
+        if total and completed:
+            elapsed = event['time'] - self.stage_started
+            eta = round(elapsed / completed * (total - completed), 1)
+        self.progress = {
+            'stage': event['stage'],
+            'completed': completed,
+            'total': total,
+            'unit': event['unit'],
+            'eta': eta,
+        }
+        self.notify()
+
+    def to_dict(self):
+        """Describe the job for the status API."""
+        info = {
+            'job_id': self.id,
+            'status': self.status,
+            'original_name': self.original_name,
+            'pages': self.pages,
+        }
+        if self.progress:
+            info['progress'] = self.progress
+        if self.status == 'done':
+            info.update({
+                'success': True,
+                'output_file': self.output_filename,
+                'size': format_file_size(self.size),
+                'download_url': url_for('download_file', filename=self.output_filename),
+            })
+        elif self.status == 'failed':
+            info['error'] = self.error
+        return info
+
+jobs = {}  # job_id -> Job
+batches = {}  # batch_id -> list of Job, for files uploaded together
+uploads = {}  # upload_id -> Upload still receiving chunks; guarded by jobs_lock
+jobs_lock = threading.Lock()
+job_queue = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+scheduler = SlotScheduler(OCR_SLOTS)
+result_cache = ResultCache(RESULT_CACHE_FOLDER, RESULT_CACHE_SIZE)
+result_store = ResultStore(RESULT_FOLDER, RESULT_TTL, RESULT_STORE_SIZE)
+
+metrics = Metrics()
+metrics.describe('ocrmypdf_stage_seconds', 'histogram',
+                 'Time spent in each stage of the OCR pipeline.')
+metrics.describe('ocrmypdf_queue_wait_seconds', 'histogram',
+                 'Time jobs waited in the queue and for worker slots.')
+metrics.describe('ocrmypdf_job_seconds', 'histogram',
+                 'Time taken to process a job, excluding queue wait.')
+metrics.describe('ocrmypdf_jobs_total', 'counter',
+                 'Jobs processed, by OCRmyPDF exit code.')
+metrics.describe('ocrmypdf_pages_processed_total', 'counter',
+                 'Pages in successfully processed jobs.')
+metrics.describe('ocrmypdf_result_cache_hits_total', 'counter',
+                 'Jobs answered from the result cache.')
+metrics.describe('ocrmypdf_coalesced_jobs_total', 'counter',
+                 'Jobs that waited for an identical job instead of running.')
+metrics.describe('ocrmypdf_rejected_jobs_total', 'counter',
+                 'Jobs rejected because the queue was full.')
+metrics.describe('ocrmypdf_queue_depth', 'gauge', 'Jobs waiting in the queue.')
+metrics.describe('ocrmypdf_busy_workers', 'gauge', 'Jobs being processed.')
+metrics.describe('ocrmypdf_worker_slots', 'gauge',
+                 'Worker slots shared by running jobs.')
+metrics.describe('ocrmypdf_worker_slots_in_use', 'gauge',
+                 'Worker slots granted to running jobs.')
+metrics.describe('ocrmypdf_result_store_bytes', 'gauge',
+                 'Bytes held in the result store.')
+metrics.describe('ocrmypdf_result_store_files', 'gauge',
+                 'Files held in the result store.')
+inflight = {}  # cache key -> Job queued or running for that key; guarded by jobs_lock
+
+# Moving average of job run time, used to tell rejected clients when to retry
+average_job_seconds = 30.0
+
+# The OCR pool and its feeder threads are started on first use rather than at
+# import time, because the pool's spawned children re-import this module.
+ocr_pool = None
+ocr_events = None  # progress events published by web_plugin in the OCR pool
+workers_lock = threading.Lock()
+
+# Built once in each OCR pool process by init_ocr_worker() and reused by every job
+worker_plugin_manager = None
+
+def init_ocr_worker(event_queue):
+    """Prepare an OCR pool process so that jobs only pay for the OCR itself.
+
+    Loading the plugins imports the whole pipeline, and asking the external
+    programs for their versions now means the answers are cached before the
+    first job arrives.
+    """
+    global worker_plugin_manager
+    web_plugin.init_worker(event_queue)
+    # Registered by module name, so the plugin is the module init_worker set up
+    worker_plugin_manager = get_plugin_manager(['web_plugin'])
+    for probe in (tesseract.version, ghostscript.version):
+        try:
+            probe()
+        except MissingDependencyError:
+            pass  # Reported to the job that needs the program
+
+def run_ocr(job_id, input_path, output_path, options):
+    """Run OCR inside an OCR pool process and return the exit code.
+
+    ocrmypdf.ocr() holds a process-wide lock, so jobs that should run
+    concurrently must run in separate processes.
+    """
+    web_plugin.current_job = job_id
+    if GS_RENDER_SERVER:
+        # Page workers must be threads of this long-lived process for the
+        # render servers they start to be reused by later jobs
+        options = dict(options, render_server=GS_RENDER_SERVER, use_threads=True)
+    try:
+        return int(ocrmypdf.ocr(
+            input_file=input_path,
+            output_file=output_path,
+            progress_bar=True,
+            plugin_manager=worker_plugin_manager,
+            **options
+        ))
+    finally:
+        web_plugin.current_job = None
+
+def count_pages(path):
+    """Return the number of pages in an uploaded file; images have one."""
+    try:
+        with pikepdf.open(path) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return 1
+
+def process_job(job):
+    """Run one job on the OCR pool and record the outcome."""
+    global average_job_seconds
+    job.slots = scheduler.acquire(job.pages)
+    job.status = 'running'
+    job.started = time.time()
+    job.notify()
+    metrics.observe('ocrmypdf_queue_wait_seconds', job.started - job.created)
+    exit_code = ExitCode.other_error
+    try:
+        options = dict(job.options, jobs=job.slots)
+        exit_code = ExitCode(ocr_pool.submit(
+            run_ocr, job.id, job.input_path, job.output_path, options
+        ).result())
+        job.size = job.output_path.stat().st_size
+        result_store.release(job.output_filename)  # Ready to download
+        job.status = 'done'
+        metrics.inc('ocrmypdf_pages_processed_total', job.pages)
+    except Exception as e:
+        if job.output_path.exists():
+            job.output_path.unlink()
+        job.error = f"OCR processing failed: {str(e)}"
+        job.status = 'failed'
+        exit_code = getattr(e, 'exit_code', ExitCode.other_error)
+    else:
+        # The job succeeded even if its output cannot be cached
+        try:
+            result_cache.put(job.key, job.output_path)
+        except Exception:
+            app.logger.exception('Caching the output of job %s failed', job.id)
+    finally:
+        scheduler.release(job.slots)
+        if job.input_path.exists():
+            job.input_path.unlink()
+        job.finished = time.time()
+        metrics.observe('ocrmypdf_job_seconds', job.finished - job.started)
+        metrics.inc('ocrmypdf_jobs_total', exit_code=exit_code.name)
+        average_job_seconds += 0.2 * (job.finished - job.started - average_job_seconds)
+        with jobs_lock:
+            inflight.pop(job.key, None)
+        for follower in job.followers:
+            if job.status == 'done':
+                finish_from_output(follower, job.output_path)
+            else:
+                follower.error = job.error
+                follower.status = 'failed'
+                follower.finished = time.time()
+                follower.finish()
+        job.finish()
+
+def finish_from_cache(job):
+    """Complete a job from the result cache, or return False if it is not cached."""
+    started = time.time()
+    try:
+        if not result_cache.get(job.key, job.output_path):
+            return False
+        job.size = job.output_path.stat().st_size
+    except OSError:
+        app.logger.exception('Reading the cached output of job %s failed', job.id)
+        return False
+    job.started = started
+    job.status = 'done'
+    job.finished = time.time()
+    job.finish()
+    return True
+
+def finish_from_output(job, output_path):
+    """Complete a job with a copy of an output produced earlier."""
+    job.started = time.time()
+    try:
+        shutil.copyfile(output_path, job.output_path)
+        job.size = job.output_path.stat().st_size
+        job.status = 'done'
+    except OSError as e:
+        job.error = f"OCR processing failed: {str(e)}"
+        job.status = 'failed'
+    job.finished = time.time()
+    job.finish()
+
+def ocr_worker():
+    """Take jobs off the queue and process them, forever."""
+    while True:
+        job = job_queue.get()
+        try:
+            process_job(job)
+        finally:
+            job_queue.task_done()
+
+def start_workers():
+    """Start the OCR process pool and the threads that feed it, once."""
+    global ocr_pool
+    with workers_lock:
+        if ocr_pool is not None:
+            return
+        global ocr_events
+        context = multiprocessing.get_context('spawn')
+        ocr_events = context.Queue()
+        ocr_pool = ProcessPoolExecutor(
+            max_workers=OCR_WORKERS,
+            mp_context=context,
+            initializer=init_ocr_worker,
+            initargs=(ocr_events,)
+        )
+        for _ in range(OCR_WORKERS):
+            threading.Thread(target=ocr_worker, daemon=True).start()
+        threading.Thread(target=progress_listener, daemon=True).start()
+        threading.Thread(target=janitor, daemon=True).start()
+
+def progress_listener():
+    """Apply events from the OCR pool to their jobs and metrics, forever."""
+    while True:
+        event = ocr_events.get()
+        if event['kind'] == 'timing':
+            metrics.observe(
+                'ocrmypdf_stage_seconds', event['seconds'], stage=event['stage']
+            )
+            continue
+        job = get_job(event['job_id'])
+        if job is not None and not job.done.is_set():
+            job.update_progress(event)
+
+def sweep():
+    """Remove expired results, abandoned uploads and old job records."""
+    prune_jobs()
+    cutoff = time.time() - RESULT_TTL
+    with jobs_lock:
+        pending = [job for job in jobs.values() if not job.done.is_set()]
+        abandoned = [upload for upload in uploads.values() if upload.updated < cutoff]
+        for upload in abandoned:
+            del uploads[upload.id]
+    for upload in abandoned:
+        upload.input_path.unlink(missing_ok=True)
+    result_store.sweep(active={job.output_filename for job in pending})
+
+    # Uploads are normally removed when their job finishes; anything older
+    # than a result's lifetime was left behind by a crash
+    pending_inputs = {job.input_path.name for job in pending}
+    with jobs_lock:
+        pending_inputs.update(upload.input_path.name for upload in uploads.values())
+    for path in Path(app.config['UPLOAD_FOLDER']).glob('*_input_*'):
+        try:
+            if path.name not in pending_inputs and path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+def janitor():
+    """Sweep every JANITOR_INTERVAL seconds, forever."""
+    while True:
+        try:
+            sweep()
+        except Exception:
+            app.logger.exception('Sweeping the result store failed')
+        else:
+            stats = result_store.stats()
+            app.logger.info(
+                'Result store holds %s in %d files',
+                format_file_size(stats['bytes_held']), stats['files_held']
+            )
+        time.sleep(JANITOR_INTERVAL)
+
+def prune_jobs():
+    """Forget jobs that finished more than JOB_RETENTION seconds ago."""
+    cutoff = time.time() - JOB_RETENTION
+    with jobs_lock:
+        expired = [job_id for job_id, job in jobs.items()
+                   if job.finished and job.finished < cutoff]
+        for job_id in expired:
+            del jobs[job_id]
+        expired = [batch_id for batch_id, batch in batches.items()
+                   if all(job.finished and job.finished < cutoff for job in batch)]
+        for batch_id in expired:
+            del batches[batch_id]
+
+def retry_after():
+    """Estimate how many seconds it will take for the job queue to drain."""
+    return max(1, ceil(job_queue.qsize() * average_job_seconds / OCR_WORKERS))
+
+def enqueue_job(job):
+    """Queue a job for OCR. Raises queue.Full if the queue is at capacity.
+
+    A job whose output is already cached is completed immediately, and one
+    identical to a job already queued or running waits for that job instead
+    of being processed again.
+    """
+    start_workers()
+    prune_jobs()
+    with jobs_lock:
+        jobs[job.id] = job
+    # Outside jobs_lock, since copying a large output takes a while
+    if finish_from_cache(job):
+        metrics.inc('ocrmypdf_result_cache_hits_total')
+        job.input_path.unlink(missing_ok=True)
+        return
+    with jobs_lock:
+        leader = inflight.get(job.key)
+        if leader is None:
+            try:
+                job_queue.put_nowait(job)
+            except queue.Full:
+                del jobs[job.id]
+                metrics.inc('ocrmypdf_rejected_jobs_total')
+                raise
+            inflight[job.key] = job
+            return
+        leader.followers.append(job)
+        metrics.inc('ocrmypdf_coalesced_jobs_total')
+    # The input is not needed if another job produces the output
+    job.input_path.unlink(missing_ok=True)
+
+def get_batch(batch_id):
+    """Look up the jobs of a batch, or None if it is unknown or has been pruned."""
+    with jobs_lock:
+        return batches.get(batch_id)
+
+def get_job(job_id):
+    """Look up a job by ID, or None if it is unknown or has been pruned."""
+    with jobs_lock:
+        return jobs.get(job_id)
+
+def ocr_options_from_form(form):
+    """Translate the upload form fields to ocrmypdf.ocr() keyword arguments."""
+    force_ocr = 'force_ocr' in form
+    return {
+        'language': [form.get('language', 'eng')],
+        'force_ocr': force_ocr,
+        'deskew': 'deskew' in form,
+        'clean': 'clean' in form,
+        'optimize': int(form.get('optimize', '1')),
+        'skip_text': False if force_ocr else None,
+        'output_type': 'pdf' if 'regular_pdf' in form else 'pdfa',
+    }
+
+def create_job(file):
+    """Save an uploaded file and create the OCR job for it."""
+    # Generate unique filename for temporary input file to prevent conflicts
+    temp_id = str(uuid.uuid4())
+    filename = secure_filename(file.filename)
+    input_path = Path(app.config['UPLOAD_FOLDER']) / f"{temp_id}_input_{filename}"
+
+    # Save uploaded file, hashing it on the way to disk
+    digest = hashlib.sha256()
+    with open(input_path, 'wb') as f:
+        while chunk := file.stream.read(1024 * 1024):
+            digest.update(chunk)
+            f.write(chunk)
+
+    return create_job_for_input(input_path, filename, digest.hexdigest())
+
+def create_job_for_input(input_path, filename, upload_digest):
+    """Create the OCR job for an upload already saved at input_path."""
+    # Generate output filename based on input name
+    output_filename = result_store.reserve(filename)
+
+    options = ocr_options_from_form(request.form)
+    job = Job(input_path, output_filename, filename, options)
+    job.key = cache_key(upload_digest, job.options)
+    job.pages = count_pages(input_path)
+    return job
+
+def discard_job(job):
+    """Remove the files of a job that was never queued."""
+    for path in (job.input_path, job.output_path):
+        if path.exists():
+            path.unlink()
+    result_store.release(job.output_filename)
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def generate_output_filename(original_filename, upload_folder):
+def generate_output_filename(original_filename, upload_folder, reserved=()):
     """Generate output filename based on input, always with _ocr suffix."""
     # Remove extension and add _ocr.pdf
     base_name = Path(original_filename).stem
     output_name = f"{base_name}_ocr.pdf"
-    output_path = Path(upload_folder) / output_name
     
-    # If that exists, add a number
+    # If that exists, or is reserved for a job still waiting in the queue, add
+    # a number
     counter = 2
-    while output_path.exists():
+    while output_name in reserved or (Path(upload_folder) / output_name).exists():
         output_name = f"{base_name}_ocr_{counter}.pdf"
-        output_path = Path(upload_folder) / output_name
         counter += 1
-    
+
     return output_name
 
 @app.route('/')
 def index():
     """Main page with upload form."""
-    return render_template('index.html')
+    return render_template('index.html', batch_max_files=BATCH_MAX_FILES)
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
@@ -67,92 +937,50 @@ def upload_file():
         flash('Invalid file type. Please upload PDF, PNG, JPG, TIFF, BMP, or GIF files.', 'error')
         return redirect(url_for('index'))
     
-    if file:
-        # Generate unique filename for temporary input file to prevent conflicts
-        temp_id = str(uuid.uuid4())
-        filename = secure_filename(file.filename)
-        input_path = Path(app.config['UPLOAD_FOLDER']) / f"{temp_id}_input_{filename}"
-        
-        # Generate output filename based on input name
-        output_filename = generate_output_filename(filename, app.config['UPLOAD_FOLDER'])
-        output_path = Path(app.config['UPLOAD_FOLDER']) / output_filename
-        
-        # Save uploaded file
-        file.save(input_path)
-        
-        # Get OCR options from form
-        language = request.form.get('language', 'eng')
-        force_ocr = 'force_ocr' in request.form
-        deskew = 'deskew' in request.form
-        clean = 'clean' in request.form
-        regular_pdf = 'regular_pdf' in request.form
-        optimize = int(request.form.get('optimize', '1'))
-        
-        try:
-            # Run OCR
-            ocrmypdf.ocr(
-                input_file=input_path,
-                output_file=output_path,
-                language=[language],
-                force_ocr=force_ocr,
-                deskew=deskew,
-                clean=clean,
-                optimize=optimize,
-                skip_text=False if force_ocr else None,
-                output_type='pdf' if regular_pdf else 'pdfa',
-                progress_bar=False
-            )
-            
-            # Clean up input file
-            input_path.unlink()
-            
-            # Get file size for display
-            file_size = output_path.stat().st_size
-            
-            # Redirect to results page with single file
-            file_info = {
-                'output_file': output_filename,
-                'original_name': filename,
-                'size': format_file_size(file_size)
-            }
-            
-            return render_template('results.html', 
-                                 processed_files=[file_info],
-                                 file_ids=output_filename)
-            
-        except Exception as e:
-            # Clean up files on error
-            if input_path.exists():
-                input_path.unlink()
-            if output_path.exists():
-                output_path.unlink()
-            
-            error_msg = f"OCR processing failed: {str(e)}"
-            flash(error_msg, 'error')
-            return redirect(url_for('index'))
+    job = create_job(file)
+    try:
+        enqueue_job(job)
+    except queue.Full:
+        discard_job(job)
+        flash('The server is busy. Please try again later.', 'error')
+        return redirect(url_for('index'))
+
+    # This form is the fallback for browsers without JavaScript, so wait for
+    # the job here; the OCR itself still runs on the shared pool.
+    job.done.wait()
+    if job.status == 'failed':
+        flash(job.error, 'error')
+        return redirect(url_for('index'))
+
+    # Redirect to results page with single file
+    file_info = {
+        'output_file': job.output_filename,
+        'original_name': job.original_name,
+        'size': format_file_size(job.size)
+    }
+
+    return render_template('results.html', 
+                         processed_files=[file_info],
+                         file_ids=job.output_filename)
 
 @app.route('/download/<filename>')
 def download_file(filename):
     """Download processed file."""
-    file_path = Path(app.config['UPLOAD_FOLDER']) / filename
+    file_path = result_store.path(secure_filename(filename))
     
-    if not file_path.exists():
+    if not result_store.ready(file_path.name):
         flash('File not found or has expired', 'error')
         return redirect(url_for('index'))
     
-    try:
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
-        )
-    finally:
-        # Clean up file after download
-        try:
-            file_path.unlink()
-        except:
-            pass  # Ignore cleanup errors
+    # The result stays in the store, so it can be downloaded again until it
+    # expires; the janitor removes it
+    result_store.touch(file_path.name)
+    return send_file(
+        file_path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype='application/pdf'
+    )
 
 @app.route('/api/process', methods=['POST'])
 def api_process():
@@ -164,63 +992,242 @@ def api_process():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type'}), 400
     
-    # Generate unique filename for temporary input file to prevent conflicts
-    temp_id = str(uuid.uuid4())
-    filename = secure_filename(file.filename)
-    input_path = Path(app.config['UPLOAD_FOLDER']) / f"{temp_id}_input_{filename}"
-    
-    # Generate output filename based on input name
-    output_filename = generate_output_filename(filename, app.config['UPLOAD_FOLDER'])
-    output_path = Path(app.config['UPLOAD_FOLDER']) / output_filename
-    
-    # Save uploaded file
-    file.save(input_path)
-    
-    # Get OCR options from form
-    language = request.form.get('language', 'eng')
-    force_ocr = 'force_ocr' in request.form
-    deskew = 'deskew' in request.form
-    clean = 'clean' in request.form
-    regular_pdf = 'regular_pdf' in request.form
-    optimize = int(request.form.get('optimize', '1'))
-    
+    job = create_job(file)
     try:
-        # Run OCR
-        ocrmypdf.ocr(
-            input_file=input_path,
-            output_file=output_path,
-            language=[language],
-            force_ocr=force_ocr,
-            deskew=deskew,
-            clean=clean,
-            optimize=optimize,
-            skip_text=False if force_ocr else None,
-            output_type='pdf' if regular_pdf else 'pdfa',
-            progress_bar=False
-        )
-        
-        # Clean up input file
-        input_path.unlink()
-        
-        # Get file size for display
-        file_size = output_path.stat().st_size
-        
-        return jsonify({
-            'success': True,
-            'output_file': output_filename,
-            'original_name': filename,
-            'size': format_file_size(file_size),
-            'download_url': url_for('download_file', filename=output_filename)
-        })
-        
-    except Exception as e:
-        # Clean up files on error
-        if input_path.exists():
-            input_path.unlink()
-        if output_path.exists():
-            output_path.unlink()
-        
-        return jsonify({'error': str(e)}), 500
+        enqueue_job(job)
+    except queue.Full:
+        discard_job(job)
+        return jsonify({'error': 'Job queue is full'}), 429, {
+            'Retry-After': str(retry_after())
+        }
+
+    return job_response(job)
+
+def job_response(job):
+    """Respond to a request that created job."""
+    # Cached results are ready at once; other jobs are polled for
+    status_url = url_for('api_job_status', job_id=job.id)
+    info = dict(job.to_dict(), status_url=status_url)
+    if job.done.is_set():
+        return jsonify(info)
+    return jsonify(info), 202, {'Location': status_url}
+
+@app.route('/api/uploads', methods=['POST'])
+def api_upload_start():
+    """Start a chunked upload of a file of a given size."""
+    filename = secure_filename(request.form.get('filename', ''))
+    if not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    try:
+        size = int(request.form['size'])
+        chunk_size = int(request.form.get('chunk_size', UPLOAD_CHUNK_SIZE))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'size and chunk_size must be numbers of bytes'}), 400
+    if not 0 < size <= MAX_UPLOAD_SIZE:
+        error = f"size must be between 1 and {MAX_UPLOAD_SIZE} bytes"
+        return jsonify({'error': error}), 400
+    if not 0 < chunk_size <= min(UPLOAD_CHUNK_SIZE, app.config['MAX_CONTENT_LENGTH']):
+        error = f"chunk_size must be at most {UPLOAD_CHUNK_SIZE} bytes"
+        return jsonify({'error': error}), 400
+
+    upload = Upload(filename, size, chunk_size)
+    with jobs_lock:
+        uploads[upload.id] = upload
+    upload_url = url_for('api_upload_status', upload_id=upload.id)
+    return jsonify(dict(upload.to_dict(), upload_url=upload_url)), 201, {
+        'Location': upload_url
+    }
+
+@app.route('/api/uploads/<upload_id>')
+def api_upload_status(upload_id):
+    """Report which chunks of an upload are still missing, to resume it."""
+    with jobs_lock:
+        upload = uploads.get(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    return jsonify(upload.to_dict())
+
+@app.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def api_upload_chunk(upload_id, index):
+    """Store one chunk of an upload; the body is the raw chunk."""
+    with jobs_lock:
+        upload = uploads.get(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    if not 0 <= index < upload.chunks:
+        return jsonify({'error': f"Chunk index must be below {upload.chunks}"}), 400
+    expected_sha256 = request.headers.get('X-Chunk-SHA256')
+    if not expected_sha256:
+        return jsonify({'error': 'X-Chunk-SHA256 header is required'}), 400
+
+    error = upload.write_chunk(index, request.stream, expected_sha256)
+    if error:
+        return jsonify({'error': error}), 400
+    return '', 204
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def api_upload_complete(upload_id):
+    """Queue the OCR job for a fully uploaded file, with OCR options as form fields."""
+    with jobs_lock:
+        upload = uploads.get(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    missing = upload.missing()
+    if missing:
+        return jsonify({'error': 'Upload is incomplete', 'missing': missing}), 409
+
+    with jobs_lock:
+        if uploads.pop(upload_id, None) is None:
+            return jsonify({'error': 'Unknown upload'}), 404
+    digest = hashlib.sha256()
+    with open(upload.input_path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    job = create_job_for_input(upload.input_path, upload.filename, digest.hexdigest())
+    try:
+        enqueue_job(job)
+    except queue.Full:
+        # Keep the uploaded file, so completing can be retried without re-uploading
+        result_store.release(job.output_filename)
+        upload.updated = time.time()
+        with jobs_lock:
+            uploads[upload_id] = upload
+        return jsonify({'error': 'Job queue is full'}), 429, {
+            'Retry-After': str(retry_after())
+        }
+
+    return job_response(job)
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """Queue several files uploaded in one request; they are processed in parallel."""
+    files = [file for file in request.files.getlist('file') if file.filename]
+    if not files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    invalid = [file.filename for file in files if not allowed_file(file.filename)]
+    if invalid:
+        return jsonify({'error': f"Invalid file type: {', '.join(invalid)}"}), 400
+    if len(files) > BATCH_MAX_FILES:
+        error = f"A batch may have at most {BATCH_MAX_FILES} files"
+        return jsonify({'error': error}), 400
+    too_large = [
+        file.filename for file in files
+        if file.stream.seek(0, os.SEEK_END) > app.config['MAX_CONTENT_LENGTH']
+    ]
+    for file in files:
+        file.stream.seek(0)
+    if too_large:
+        return jsonify({'error': f"File too large: {', '.join(too_large)}"}), 413
+
+    batch = []
+    for file in files:
+        job = create_job(file)
+        try:
+            enqueue_job(job)
+        except queue.Full:
+            # Report the file as failed and keep the part of the batch that fit
+            discard_job(job)
+            job.error = 'Job queue is full'
+            job.status = 'failed'
+            job.finished = time.time()
+            job.done.set()
+        batch.append(job)
+
+    if all(job.error == 'Job queue is full' for job in batch):
+        return jsonify({'error': 'Job queue is full'}), 429, {
+            'Retry-After': str(retry_after())
+        }
+
+    batch_id = str(uuid.uuid4())
+    with jobs_lock:
+        batches[batch_id] = batch
+    status_url = url_for('api_batch_status', batch_id=batch_id)
+    return jsonify(dict(batch_to_dict(batch_id, batch), status_url=status_url)), 202, {
+        'Location': status_url
+    }
+
+@app.route('/api/batches/<batch_id>')
+def api_batch_status(batch_id):
+    """Report the status of every file in a batch."""
+    batch = get_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Unknown batch'}), 404
+    return jsonify(batch_to_dict(batch_id, batch))
+
+def batch_to_dict(batch_id, batch):
+    """Describe a batch for the status API."""
+    completed = sum(1 for job in batch if job.done.is_set())
+    return {
+        'batch_id': batch_id,
+        'status': 'done' if completed == len(batch) else 'running',
+        'total': len(batch),
+        'completed': completed,
+        'jobs': [job.to_dict() for job in batch],
+    }
+
+@app.route('/api/jobs/<job_id>/events')
+def api_job_events(job_id):
+    """Stream a job's status and progress as Server-Sent Events until it ends."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def events():
+        while True:
+            version = job.version
+            finished = job.done.is_set()
+            event = job.status if finished else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(job.to_dict())}\n\n"
+            if finished:
+                return
+            while True:
+                with job.changed:
+                    changed = job.changed.wait_for(
+                        lambda: job.version != version, timeout=15
+                    )
+                if changed:
+                    break
+                # Keep proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose metrics in the Prometheus text format."""
+    with jobs_lock:
+        busy = sum(1 for job in jobs.values() if job.status == 'running')
+    store = result_store.stats()
+    text = metrics.render({
+        'ocrmypdf_queue_depth': job_queue.qsize(),
+        'ocrmypdf_busy_workers': busy,
+        'ocrmypdf_worker_slots': scheduler.slots,
+        'ocrmypdf_worker_slots_in_use': scheduler.in_use(),
+        'ocrmypdf_result_store_bytes': store['bytes_held'],
+        'ocrmypdf_result_store_files': store['files_held'],
+    })
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/stats')
+def api_stats():
+    """Report queue depth and how much disk the result store holds."""
+    return jsonify({
+        'queue_depth': job_queue.qsize(),
+        'result_store': result_store.stats(),
+    })
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """Report the status of an OCR job, with a download URL once it is done."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
 
 def format_file_size(bytes):
     """Format file size in human readable format."""
@@ -246,8 +1253,8 @@ def results():
     
     processed_files = []
     for filename in filenames:
-        file_path = Path(app.config['UPLOAD_FOLDER']) / filename
-        if file_path.exists():
+        file_path = result_store.path(secure_filename(filename))
+        if result_store.ready(file_path.name):
             file_size = file_path.stat().st_size
             # Clean up display name by removing _ocr suffix and numbers
             display_name = filename
@@ -282,32 +1289,68 @@ def download_all(filenames):
         flash('No files specified', 'error')
         return redirect(url_for('index'))
     
-    # Create a temporary ZIP file
-    zip_path = Path(app.config['UPLOAD_FOLDER']) / f"ocr_batch_{uuid.uuid4()}.zip"
-    
-    try:
-        with zipfile.ZipFile(zip_path, 'w') as zip_file:
-            for filename in filename_list:
-                filename = filename.strip()
-                if filename:
-                    file_path = Path(app.config['UPLOAD_FOLDER']) / filename
-                    if file_path.exists():
-                        zip_file.write(file_path, filename)
-        
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name="ocr_batch.zip",
-            mimetype='application/zip'
-        )
-    
-    except Exception as e:
-        flash(f'Error creating ZIP file: {str(e)}', 'error')
-        return redirect(url_for('index'))
-    
-    finally:
-        # Clean up ZIP file after a delay (you might want to implement this differently)
-        pass
+    file_paths = []
+    for filename in filename_list:
+        file_path = result_store.path(secure_filename(filename))
+        if result_store.ready(file_path.name):
+            result_store.touch(file_path.name)
+            file_paths.append(file_path)
+
+    return Response(
+        stream_zip(file_paths),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename="ocr_batch.zip"'}
+    )
+
+class ZipStreamBuffer(io.RawIOBase):
+    """Write-only, unseekable file that hands written bytes to a generator.
+
+    zipfile detects that it cannot seek and writes a data descriptor after
+    each entry instead of going back to patch the local header.
+    """
+
+    def __init__(self):
+        """Start with nothing written."""
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        """Report that the buffer can be written to."""
+        return True
+
+    def write(self, data):
+        """Keep data until the next take()."""
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        """Return the number of bytes written so far."""
+        return self.position
+
+    def take(self):
+        """Return and forget everything written since the last call."""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_zip(file_paths, chunk_size=1024 * 1024):
+    """Generate a ZIP archive of file_paths piece by piece.
+
+    PDFs are already compressed, so entries are stored rather than deflated,
+    and nothing is written to disk.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+        for file_path in file_paths:
+            info = zipfile.ZipInfo.from_file(file_path, file_path.name)
+            with open(file_path, 'rb') as src, zip_file.open(info, 'w') as dst:
+                while chunk := src.read(chunk_size):
+                    dst.write(chunk)
+                    yield buffer.take()
+            yield buffer.take()
+    yield buffer.take()
 
 if __name__ == '__main__':
+    start_workers()
     app.run(host='0.0.0.0', port=5000, debug=False)
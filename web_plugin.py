@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""OCRmyPDF plugin used by the web interface's OCR worker processes.
+
+Publishes progress bar updates and stage timings to a queue read by the web
+server, so that clients can follow a job page by page and the server can
+report where time is spent.
+"""
+
+import time
+
+from ocrmypdf import hookimpl
+
+# Set in each OCR worker process by init_worker() and run_ocr()
+events = None
+current_job = None
+
+
+def init_worker(event_queue):
+    """Initialize an OCR worker process with the queue to publish events to."""
+    global events
+    events = event_queue
+
+
+def publish(**event):
+    """Send an event about the current job to the web server."""
+    if events is not None and current_job is not None:
+        events.put(dict(event, job_id=current_job, time=time.time()))
+
+
+class WebProgressBar:
+    """Progress bar that reports each update to the web server."""
+
+    def __init__(self, *, total=None, desc=None, unit=None, disable=False, **kwargs):
+        """Create a progress bar with the arguments OCRmyPDF passes."""
+        self.total = total
+        self.desc = desc
+        self.unit = unit
+        self.completed = 0
+
+    def __enter__(self):
+        """Publish the starting state of the progress bar."""
+        self.publish()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Leave exceptions to propagate."""
+        return False
+
+    def update(self, n=1, *, completed=None):
+        """Advance by n, or to completed if given, and publish the new state."""
+        if completed is not None:
+            self.completed = completed
+        else:
+            self.completed += n
+        self.publish()
+
+    def publish(self):
+        """Send the state of the progress bar to the web server."""
+        publish(
+            kind='progress',
+            stage=self.desc,
+            completed=self.completed,
+            total=self.total,
+            unit=self.unit,
+        )
+
+
+@hookimpl
+def get_progressbar_class():
+    """Return the progress bar class that reports to the web server."""
+    return WebProgressBar
+
+
+@hookimpl
+def report_stage_timing(stage, seconds, pageno):
+    """Send the time taken by a stage to the web server for its metrics."""
+    publish(kind='timing', stage=stage, seconds=seconds)